@@ -0,0 +1,151 @@
+"""
+Copyright 2021 Akamai Technologies, Inc. All Rights Reserved.
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+
+import heapq
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+__all__=['ActivationScheduler', 'DONE_STATUSES']
+
+#Activation statuses after which nothing changes any more
+DONE_STATUSES = ['ACTIVE', 'INACTIVE', 'DEACTIVATED', 'FAILED', 'ABORTED']
+
+root_logger = logging.getLogger()
+
+
+class ActivationScheduler(object):
+    """
+    Submits many activations and waits for all of them. Submissions and
+    status polls run on one bounded thread pool, and a single loop decides
+    which activation is due for its next poll. The poll interval of an
+    activation doubles every time its status did not change, up to
+    maxPollInterval, and drops back to pollInterval when it does change.
+
+    Activations are dicts with papiObject, propertyDetails, version, network,
+    emails and notes. The scheduler adds activationId, status, message and
+    elapsed.
+    """
+
+    def __init__(self, session, workers=8, pollInterval=30, maxPollInterval=300, timeout=3600):
+        self.session = session
+        self.workers = max(1, workers)
+        self.pollInterval = pollInterval
+        self.maxPollInterval = max(pollInterval, maxPollInterval)
+        self.timeout = timeout
+
+    def submit(self, activation):
+        """
+        Function to start an activation, warnings are acknowledged by activateConfiguration
+        """
+        propertyDetails = activation['propertyDetails']
+        activation['started'] = time.time()
+        try:
+            response = activation['papiObject'].activateConfiguration(self.session, activation['version'], activation['network'],
+                                                                    activation['emails'], activation['notes'],
+                                                                    propertyDetails['propertyId'], propertyDetails['contractId'],
+                                                                    propertyDetails['groupId'])
+        except Exception as e:
+            self.finish(activation, 'FAILED', repr(e))
+            return activation
+        if response.status_code == 201:
+            activation['activationId'] = re.search('/activations/([^/?]+)', response.json()['activationLink']).group(1)
+            activation['status'] = 'PENDING'
+            activation['message'] = ''
+            return activation
+        try:
+            detail = response.json().get('detail', response.json().get('title', ''))
+        except ValueError:
+            detail = response.text
+        if response.status_code == 422 and 'already activated' in detail:
+            self.finish(activation, 'ACTIVE', 'Version already active')
+        else:
+            self.finish(activation, 'FAILED', str(response.status_code) + ' ' + detail)
+        return activation
+
+    def poll(self, activation):
+        """
+        Function to refresh the status of a pending activation
+
+        Returns
+        -------
+        changed : <bool> whether the status changed since the last poll
+        """
+        propertyDetails = activation['propertyDetails']
+        try:
+            response = activation['papiObject'].getActivation(self.session, propertyDetails['propertyId'], activation['activationId'],
+                                                              propertyDetails['contractId'], propertyDetails['groupId'])
+        except Exception as e:
+            root_logger.debug('Unable to poll activation ' + activation['activationId'] + ': ' + repr(e))
+            return False
+        if response.status_code != 200:
+            root_logger.debug('Unable to poll activation ' + activation['activationId'] + ': ' + str(response.status_code))
+            return False
+        status = response.json()['activations']['items'][0]['status']
+        if status == activation['status']:
+            return False
+        root_logger.info(propertyDetails['propertyName'] + ' v' + str(activation['version']) + ' ' + activation['network'] + ': ' + status)
+        if status in DONE_STATUSES:
+            self.finish(activation, status, '')
+        else:
+            activation['status'] = status
+        return True
+
+    def finish(self, activation, status, message):
+        activation['status'] = status
+        activation['message'] = message
+        activation['elapsed'] = time.time() - activation.get('started', time.time())
+
+    def run(self, activations):
+        """
+        Function to submit activations and poll them until they are done or time out
+
+        Parameters
+        ----------
+        activations : <List>
+            Activations to run
+
+        Returns
+        -------
+        activations : <List> the same activations, with their final status
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(self.submit, activations))
+
+            deadline = time.time() + self.timeout
+            #(next poll time, position, interval) of every pending activation
+            queue = [(time.time() + self.pollInterval, position, self.pollInterval)
+                     for position, activation in enumerate(activations) if activation['status'] not in DONE_STATUSES]
+            heapq.heapify(queue)
+            while queue:
+                wait = min(queue[0][0], deadline) - time.time()
+                if wait > 0:
+                    time.sleep(wait)
+                if time.time() >= deadline:
+                    break
+                due = []
+                while queue and queue[0][0] <= time.time():
+                    due.append(heapq.heappop(queue))
+                changed = list(executor.map(self.poll, [activations[position] for _, position, _ in due]))
+                for (_, position, interval), hasChanged in zip(due, changed):
+                    if activations[position]['status'] in DONE_STATUSES:
+                        continue
+                    interval = self.pollInterval if hasChanged else min(interval * 2, self.maxPollInterval)
+                    heapq.heappush(queue, (time.time() + interval, position, interval))
+
+            for _, position, _ in queue:
+                self.finish(activations[position], 'TIMEOUT', 'Last status ' + activations[position]['status'])
+        return activations
@@ -0,0 +1,223 @@
+'''
+// Good luck with this code. This leverages akamai OPEN API.
+// In case you need
+// explanation contact the initiators.
+Initiators: vbhat@akamai.com and aetsai@akamai.com
+'''
+
+import json
+import requests
+from akamai.edgegrid import EdgeGridAuth, EdgeRc
+from PapiWrapper import PapiWrapper
+from RuleNode import toPlain
+import jsonbackend
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+__all__=['AsyncPapiWrapper', 'AsyncResponse']
+
+
+class AsyncResponse(object):
+    """Fully read response, exposing the parts of requests.Response the callers use"""
+
+    def __init__(self, status_code, headers, content, url):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return jsonbackend.loads(self.content)
+
+
+class AsyncPapiWrapper(object):
+    """
+    asyncio counterparts of the PapiWrapper operations, so that many requests
+    can be in flight at once. Use it as an async context manager:
+
+        async with AsyncPapiWrapper.fromEdgerc('~/.edgerc', 'papi') as papiObject:
+            responses = await asyncio.gather(*[papiObject.searchProperty(propertyName=name) for name in names])
+
+    Every request is signed with the same EdgeGridAuth used by the requests
+    session in RuleUpdater.
+    """
+
+    headers = {
+        "Content-Type": "application/json"
+    }
+
+    def __init__(self, access_hostname, auth, account_switch_key='', maxConnections=100):
+        if aiohttp is None:
+            raise ImportError('aiohttp is needed for AsyncPapiWrapper, install it using: pip3 install aiohttp')
+        self.access_hostname = access_hostname
+        self.auth = auth
+        self.maxConnections = maxConnections
+        #URL forming (account switch key handling) is shared with PapiWrapper
+        self.papiObject = PapiWrapper(access_hostname, account_switch_key)
+        self.session = None
+
+    @classmethod
+    def fromEdgerc(cls, edgerc_file, section='papi', account_switch_key='', maxConnections=100):
+        """
+        Function to create a client from an edgerc file
+
+        Parameters
+        ----------
+        edgerc_file : <string>
+            Location of the credentials file
+        section : <string>
+            Section of the credentials file
+
+        Returns
+        -------
+        papiObject : AsyncPapiWrapper
+            (AsyncPapiWrapper) Client, not yet opened
+        """
+        edgerc = EdgeRc(edgerc_file)
+        return cls(edgerc.get(section, 'host'), EdgeGridAuth.from_edgerc(edgerc, section),
+                   account_switch_key, maxConnections)
+
+    async def open(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.maxConnections)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *excInfo):
+        await self.close()
+
+    async def request(self, method, url, data=None, headers=None):
+        """
+        Function to sign and send a request
+
+        Parameters
+        ----------
+        method : <string>
+            HTTP method
+        url : <string>
+            Complete URL including the query string
+        data : <string>
+            Request body
+
+        Returns
+        -------
+        response : AsyncResponse
+            (AsyncResponse) Object with all response details.
+        """
+        await self.open()
+        #EdgeGrid signs a prepared request, it only adds the Authorization header
+        prepared = requests.Request(method, url, data=data, headers=headers).prepare()
+        self.auth(prepared)
+        async with self.session.request(method, prepared.url, data=prepared.body,
+                                        headers=dict(prepared.headers)) as response:
+            content = await response.read()
+            return AsyncResponse(response.status, response.headers, content, str(response.url))
+
+    def formUrl(self, path):
+        return self.papiObject.formUrl(self.papiObject.baseUrl + path)
+
+    async def searchProperty(self,propertyName='optional',hostname='optional',edgeHostname='optional'):
+        """
+        Function to fetch property ID, see PapiWrapper.searchProperty
+        """
+        if propertyName != 'optional':
+            searchData = {'propertyName': propertyName}
+        elif hostname != 'optional':
+            searchData = {'hostname': hostname}
+        if edgeHostname != 'optional':
+            searchData = {'edgeHostname': edgeHostname}
+
+        searchUrl = self.formUrl('/papi/v0/search/find-by-value')
+        return await self.request('POST', searchUrl, data=json.dumps(searchData), headers=self.headers)
+
+    async def getVersion(self,activeOn,propertyId,contractId,groupId):
+        """
+        Function to get the latest or staging or production version, see PapiWrapper.getVersion
+        """
+        versionPath = '/papi/v0/properties/' + propertyId + '/versions/latest?contractId=' + contractId + '&groupId=' + groupId
+        if activeOn in ('STAGING', 'PRODUCTION'):
+            versionPath = versionPath + '&activatedOn=' + activeOn
+        return await self.request('GET', self.formUrl(versionPath))
+
+    async def listVersions(self,propertyId,contractId,groupId):
+        """
+        Function to list all versions of a property, see PapiWrapper.listVersions
+        """
+        versionPath = '/papi/v1/properties/' + propertyId + '/versions/?contractId=' + contractId + '&groupId=' + groupId
+        return await self.request('GET', self.formUrl(versionPath))
+
+    async def getPropertyRules(self,propertyId,version,contractId,groupId):
+        """
+        Function to download rules from a property, see PapiWrapper.getPropertyRules
+        """
+        rulesPath = '/papi/v0/properties/' + propertyId + '/versions/' + str(version) + '/rules/?contractId=' + contractId + '&groupId=' + groupId
+        return await self.request('GET', self.formUrl(rulesPath))
+
+    async def createVersion(self,baseVersion,propertyId,contractId,groupId):
+        """
+        Function to create or checkout a version of property, see PapiWrapper.createVersion
+        """
+        createVersionPath = '/papi/v0/properties/' + propertyId + '/versions/?contractId=' + contractId + '&groupId=' + groupId
+        newVersionData = json.dumps({'createFromVersion': int(baseVersion)})
+        return await self.request('POST', self.formUrl(createVersionPath), data=newVersionData, headers=self.headers)
+
+    async def uploadRules(self,updatedData,version,propertyId,contractId,groupId):
+        """
+        Function to upload rules to a property, see PapiWrapper.uploadRules
+        """
+        updatePath = '/papi/v0/properties/' + propertyId + '/versions/' + str(version) + '/rules/?contractId=' + contractId + '&groupId=' + groupId
+        #Rule trees may hold RuleNode objects, encoded bytes are sent as they are
+        if not isinstance(updatedData, bytes):
+            updatedData = jsonbackend.dumpBytes(updatedData, default=toPlain)
+        return await self.request('PUT', self.formUrl(updatePath), data=updatedData, headers=self.headers)
+
+    async def activateConfiguration(self,version,network,emailList,notes,propertyId,contractId,groupId):
+        """
+        Function to activate a configuration or property. Activation warnings
+        are acknowledged automatically, see PapiWrapper.activateConfiguration
+        """
+        activationDetails = {
+            'propertyVersion': int(version),
+            'network': network.upper(),
+            'note': notes,
+            'notifyEmails': emailList
+        }
+        actUrl = self.formUrl('/papi/v0/properties/' + propertyId + '/activations/?contractId=' + contractId + '&groupId=' + groupId)
+        activationResponse = await self.request('POST', actUrl, data=json.dumps(activationDetails), headers=self.headers)
+        if activationResponse.status_code == 400:
+            try:
+                warnings = activationResponse.json()['warnings']
+            except (KeyError, ValueError):
+                return activationResponse
+            activationDetails['acknowledgeWarnings'] = [eachWarning['messageId'] for eachWarning in warnings]
+            activationResponse = await self.request('POST', actUrl, data=json.dumps(activationDetails), headers=self.headers)
+        return activationResponse
+
+    async def listHostnames(self,propertyId,version,contractId,groupId):
+        """
+        Function to fetch all hostnames of a property version, see PapiWrapper.listHostnames
+        """
+        hostnamePath = '/papi/v1/properties/' + propertyId + '/versions/' + str(version) + '/hostnames' + '?contractId=' + contractId + '&groupId=' + groupId
+        return await self.request('GET', self.formUrl(hostnamePath))
+
+    async def listEdgeHostnames(self,contractId,groupId):
+        """
+        Function to fetch all edgehostnames, see PapiWrapper.listEdgeHostnames
+        """
+        edgehostnamePath = '/papi/v0/edgehostnames/?contractId=' + contractId + '&groupId=' + groupId
+        return await self.request('GET', self.formUrl(edgehostnamePath))
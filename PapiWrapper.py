@@ -5,11 +5,165 @@
 Initiators: vbhat@akamai.com and aetsai@akamai.com
 '''
 
+import functools
 import json
+import random
+import time
+import requests
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from RuleNode import toPlain
+import jsonbackend
+from RateLimiter import RateLimiter
+
+
+__all__=['PapiWrapper', 'BackoffRetry', 'RateLimitedAdapter', 'createSession', 'addRequestHook', 'removeRequestHook']
+
+#Statuses retried automatically. 429 is retried for every method as the
+#request was not processed, 5xx only for idempotent methods (not POST).
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+
+class BackoffRetry(Retry):
+    """
+    Retry policy with exponential backoff and jitter. A Retry-After header
+    sent with 429/503 takes precedence over the computed backoff.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if status_code == 429 and self.total:
+            return True
+        return super(BackoffRetry, self).is_retry(method, status_code, has_retry_after)
+
+    def get_backoff_time(self):
+        consecutiveErrors = len(self.history)
+        if consecutiveErrors == 0:
+            return 0
+        backoff = min(getattr(self, 'backoff_max', 120), self.backoff_factor * (2 ** (consecutiveErrors - 1)))
+        #Jitter spreads out the retries of parallel workers hitting the same limit
+        return random.uniform(backoff / 2, backoff)
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that takes a slot from a RateLimiter before every request
+    """
+
+    def __init__(self, rateLimiter=None, **kwargs):
+        self.rateLimiter = rateLimiter
+        super(RateLimitedAdapter, self).__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if self.rateLimiter is not None:
+            self.rateLimiter.acquire()
+        return super(RateLimitedAdapter, self).send(request, **kwargs)
+
+
+def createSession(auth, poolSize=10, maxRetries=5, backoffFactor=1, rateLimit=0):
+    """
+    Function to create a requests session that can be shared across threads
+
+    Parameters
+    ----------
+    auth : <EdgeGridAuth>
+        EdgeGrid authentication to sign every request with
+    poolSize : <int>
+        Number of keep-alive connections kept open, use the number of worker threads
+    maxRetries : <int>
+        Retries of 429/5xx responses and connection errors, 0 disables retries
+    backoffFactor : <float>
+        Base of the exponential backoff in seconds
+    rateLimit : <float>
+        Requests per second across all threads using the session, 0 for no limit
+
+    Returns
+    -------
+    session : <requests.Session>
+        Session with pooled connections and retry policy mounted
+    """
+    retry = BackoffRetry(total=maxRetries, backoff_factor=backoffFactor,
+                         status_forcelist=RETRY_STATUSES, raise_on_status=False)
+    rateLimiter = RateLimiter(rateLimit) if rateLimit else None
+    adapter = RateLimitedAdapter(rateLimiter, pool_connections=poolSize, pool_maxsize=poolSize, max_retries=retry)
+    session = requests.Session()
+    session.auth = auth
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+#Functions called with a record of every PapiWrapper call, see addRequestHook
+requestHooks = []
+
+
+def addRequestHook(hook):
+    """
+    Function to register a function called after every PapiWrapper call
+
+    Parameters
+    ----------
+    hook : <function>
+        Called, on the thread that made the call, with a dict of endpoint (the
+        PapiWrapper method), method and path of the (last) request, status
+        (None when the call raised), seconds, requestBytes, responseBytes
+        (None for a streamed body without Content-Length), retries (of 429/5xx
+        and connection errors), started (epoch seconds) and error
+    """
+    if hook not in requestHooks:
+        requestHooks.append(hook)
+
+
+def removeRequestHook(hook):
+    if hook in requestHooks:
+        requestHooks.remove(hook)
+
+
+def requestRecord(endpoint, response, started, seconds, error=None):
+    record = {'endpoint': endpoint, 'method': None, 'path': None, 'status': None, 'seconds': seconds,
+              'requestBytes': 0, 'responseBytes': None, 'retries': 0, 'started': started, 'error': error}
+    if not isinstance(response, requests.Response):
+        return record
+    record['status'] = response.status_code
+    if response.request is not None:
+        record['method'] = response.request.method
+        record['path'] = urlparse(response.request.url).path
+        body = response.request.body
+        record['requestBytes'] = len(body.encode('utf-8') if isinstance(body, str) else body or b'')
+    if response.headers.get('Content-Length'):
+        record['responseBytes'] = int(response.headers['Content-Length'])
+    elif response._content_consumed:
+        record['responseBytes'] = len(response.content or b'')
+    retries = getattr(response.raw, 'retries', None)
+    if retries is not None:
+        record['retries'] = len(retries.history)
+    return record
+
+
+def instrumented(function):
+    """
+    Decorator reporting every call of a PapiWrapper method to the request hooks
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not requestHooks:
+            return function(*args, **kwargs)
+        started = time.time()
+        start = time.perf_counter()
+        try:
+            response = function(*args, **kwargs)
+        except Exception as e:
+            record = requestRecord(function.__name__, None, started, time.perf_counter() - start, repr(e))
+            for eachHook in list(requestHooks):
+                eachHook(record)
+            raise
+        record = requestRecord(function.__name__, response, started, time.perf_counter() - start)
+        for eachHook in list(requestHooks):
+            eachHook(record)
+        return response
+    return wrapper
 
 
-__all__=['PapWrapper']
-
 class PapiWrapper(object):
     """All basic operations that can be performed using PAPI """
 
@@ -17,9 +171,19 @@ class PapiWrapper(object):
         "Content-Type": "application/json"
     }
 
-    def __init__(self, access_hostname, account_switch_key):
+    def __init__(self, access_hostname, account_switch_key=''):
         self.access_hostname = access_hostname
+        #The host may carry a scheme, e.g. http://127.0.0.1:8080 for a local mock PAPI server
+        if '://' in access_hostname:
+            self.baseUrl = access_hostname.rstrip('/')
+        else:
+            self.baseUrl = 'https://' + access_hostname
+        if account_switch_key:
+            self.account_switch_key = '?accountSwitchKey=' + account_switch_key
+        else:
+            self.account_switch_key = ''
        
+    @instrumented
     def getContracts(self,session):
         """
         Function to fetch all contracts
@@ -34,13 +198,14 @@ class PapiWrapper(object):
         contractsResponse : contractsResponse
             (contractsResponse) Object with all details
         """
-        contractsUrl = 'https://' + self.access_hostname + '/papi/v0/contracts/'
+        contractsUrl = self.baseUrl + '/papi/v0/contracts/'
         contractsUrl = self.formUrl(contractsUrl)
 
         contractsResponse = session.get(contractsUrl)
         return contractsResponse
 
 
+    @instrumented
     def getGroups(self,session):
         """
         Function to fetch all the groups under the contract
@@ -56,12 +221,13 @@ class PapiWrapper(object):
             (groupResponse) Object with all response details.
         """
 
-        groupUrl = 'https://' + self.access_hostname + '/papi/v0/groups/'
+        groupUrl = self.baseUrl + '/papi/v0/groups/'
         groupUrl = self.formUrl(groupUrl)
 
         groupResponse = session.get(groupUrl)
         return groupResponse
 
+    @instrumented
     def searchProperty(self,session,propertyName='optional',hostname='optional',edgeHostname='optional'):
         """
         Function to fetch property ID
@@ -77,7 +243,7 @@ class PapiWrapper(object):
             (searchResponse) Object with all response details.
         """
 
-        searchUrl = 'https://' + self.access_hostname + '/papi/v0/search/find-by-value'
+        searchUrl = self.baseUrl + '/papi/v0/search/find-by-value'
         searchUrl = self.formUrl(searchUrl)
 
         if propertyName != 'optional':
@@ -98,6 +264,7 @@ class PapiWrapper(object):
         searchResponse = session.post(searchUrl, data=searchData,headers=self.headers)
         return searchResponse
 
+    @instrumented
     def getAllProperties(self,session,contractId,groupId):
         """
         Function to fetch list of all properties under the group
@@ -112,13 +279,14 @@ class PapiWrapper(object):
         allProperties : <dict>
             A dictionarty containing name, propertyId, contractId and groupId of all properties under the customer account
         """
-        url = 'https://' + self.access_hostname + '/papi/v0/properties/?contractId=' + contractId +'&groupId=' + groupId
+        url = self.baseUrl + '/papi/v0/properties/?contractId=' + contractId +'&groupId=' + groupId
         url = self.formUrl(url)
 
         propertiesResponse = session.get(url)
         return propertiesResponse
 
-    def getPropertyRules(self,session,propertyId,version, contractId, groupId):
+    @instrumented
+    def getPropertyRules(self,session,propertyId,version, contractId, groupId, etag='optional', stream=False):
         """
         Function to download rules from a property
 
@@ -130,6 +298,10 @@ class PapiWrapper(object):
             Property or configuration name
         version : <int>
             Property orconfiguration version number
+        etag : <string>
+            etag of the rules already held, the server answers 304 without body if unchanged
+        stream : <bool>
+            Do not read the body, it is read incrementally from rulesResponse.raw
 
         Returns
         -------
@@ -137,15 +309,16 @@ class PapiWrapper(object):
             (rulesResponse) Object with all response details.
         """
 
-        rulesUrl = 'https://' + self.access_hostname  + '/papi/v0/properties/' + propertyId +'/versions/'+str(version)+'/rules/?contractId='+ contractId +'&groupId='+ groupId
+        rulesUrl = self.baseUrl + '/papi/v0/properties/' + propertyId +'/versions/'+str(version)+'/rules/?contractId='+ contractId +'&groupId='+ groupId
         rulesUrl = self.formUrl(rulesUrl)
 
-        rulesResponse = session.get(rulesUrl)
+        rulesResponse = session.get(rulesUrl, headers=self.conditionalHeaders(etag), stream=stream)
         return rulesResponse
 
 
 
-    def createVersion(self,session,baseVersion, propertyId, contractId, groupId):
+    @instrumented
+    def createVersion(self,session,baseVersion, propertyId, contractId, groupId, property_name='optional'):
         """
         Function to create or checkout a version of property
 
@@ -169,13 +342,14 @@ class PapiWrapper(object):
             "createFromVersion": %s
         }
         """ % (baseVersion)
-        createVersionUrl = 'https://' + self.access_hostname + '/papi/v0/properties/' + propertyId + '/versions/?contractId=' + contractId + '&groupId=' + groupId
+        createVersionUrl = self.baseUrl + '/papi/v0/properties/' + propertyId + '/versions/?contractId=' + contractId + '&groupId=' + groupId
         createVersionUrl = self.formUrl(createVersionUrl)
         
         createVersionResponse = session.post(createVersionUrl, data=newVersionData,headers=self.headers)
         return createVersionResponse
 
-    def getVersion(self,session,activeOn,propertyId,contractId,groupId):
+    @instrumented
+    def getVersion(self,session,activeOn,propertyId,contractId,groupId,property_name='optional'):
         """
         Function to get the latest or staging or production version
 
@@ -195,18 +369,43 @@ class PapiWrapper(object):
         """
 
         if activeOn == "LATEST":
-            VersionUrl = 'https://' + self.access_hostname + '/papi/v0/properties/' + propertyId + '/versions/latest?contractId=' + contractId +'&groupId=' + groupId
+            VersionUrl = self.baseUrl + '/papi/v0/properties/' + propertyId + '/versions/latest?contractId=' + contractId +'&groupId=' + groupId
         elif activeOn == "STAGING":
-            VersionUrl = 'https://' + self.access_hostname + '/papi/v0/properties/' + propertyId + '/versions/latest?contractId=' + contractId +'&groupId=' + groupId + '&activatedOn=STAGING'
+            VersionUrl = self.baseUrl + '/papi/v0/properties/' + propertyId + '/versions/latest?contractId=' + contractId +'&groupId=' + groupId + '&activatedOn=STAGING'
         elif activeOn == "PRODUCTION":
-            VersionUrl = 'https://' + self.access_hostname + '/papi/v0/properties/' + propertyId + '/versions/latest?contractId=' + contractId +'&groupId=' + groupId + '&activatedOn=PRODUCTION'
+            VersionUrl = self.baseUrl + '/papi/v0/properties/' + propertyId + '/versions/latest?contractId=' + contractId +'&groupId=' + groupId + '&activatedOn=PRODUCTION'
+
+        VersionUrl = self.formUrl(VersionUrl)
+
+        VersionResponse = session.get(VersionUrl)
+        return VersionResponse
+
+    @instrumented
+    def getVersionDetail(self,session,propertyId,version,contractId,groupId):
+        """
+        Function to get the details (etag, activation status) of one property version
+
+        Parameters
+        ----------
+        session : <string>
+            An EdgeGrid Auth akamai session object
+        version : <int>
+            Property or configuration version number
+
+        Returns
+        -------
+        VersionResponse : VersionResponse
+            (VersionResponse) Object with all response details.
+        """
 
+        VersionUrl = self.baseUrl + '/papi/v0/properties/' + propertyId + '/versions/' + str(version) + '?contractId=' + contractId +'&groupId=' + groupId
         VersionUrl = self.formUrl(VersionUrl)
 
         VersionResponse = session.get(VersionUrl)
         return VersionResponse
 
-    def listVersions(self,session,propertyId,contractId,groupId):
+    @instrumented
+    def listVersions(self,session,propertyId,contractId,groupId,property_name='optional',etag='optional'):
         """
         Function to list all versions of a property
 
@@ -216,6 +415,8 @@ class PapiWrapper(object):
             An EdgeGrid Auth akamai session object
         property_name: <string>
             Property or configuration name
+        etag : <string>
+            etag of the version list already held, the server answers 304 without body if unchanged
 
         Returns
         -------
@@ -223,13 +424,14 @@ class PapiWrapper(object):
             (VersionResponse) Object with all response details.
         """
 
-        VersionUrl = 'https://' + self.access_hostname + '/papi/v1/properties/' + propertyId + '/versions/?contractId=' + contractId +'&groupId=' + groupId
+        VersionUrl = self.baseUrl + '/papi/v1/properties/' + propertyId + '/versions/?contractId=' + contractId +'&groupId=' + groupId
         VersionUrl = self.formUrl(VersionUrl)
 
-        VersionResponse = session.get(VersionUrl)
+        VersionResponse = session.get(VersionUrl, headers=self.conditionalHeaders(etag))
         return VersionResponse
 
-    def uploadRules(self,session,updatedData,version,propertyId,contractId,groupId):
+    @instrumented
+    def uploadRules(self,session,updatedData,version,propertyId,contractId,groupId,property_name='optional'):
         """
         Function to upload rules to a property
 
@@ -237,8 +439,8 @@ class PapiWrapper(object):
         ----------
         session : <string>
             An EdgeGrid Auth akamai session object
-        updatedData : <json>
-            Complete JSON rules dataset to be uploaded
+        updatedData : <json> or <bytes>
+            Complete JSON rules dataset to be uploaded, or the dataset already encoded
         property_name: <string>
             Property or configuration name
 
@@ -248,14 +450,52 @@ class PapiWrapper(object):
             (updateResponse) Object with all response details.
         """
 
-        updateurl = 'https://' + self.access_hostname  + '/papi/v0/properties/'+ propertyId + "/versions/" + str(version) + '/rules/' + '?contractId=' + contractId +'&groupId=' + groupId
+        updateurl = self.baseUrl + '/papi/v0/properties/'+ propertyId + "/versions/" + str(version) + '/rules/' + '?contractId=' + contractId +'&groupId=' + groupId
         updateurl = self.formUrl(updateurl)
 
-        updatedData = json.dumps(updatedData)
+        if not isinstance(updatedData, bytes):
+            updatedData = jsonbackend.dumpBytes(updatedData, default=toPlain)
         updateResponse = session.put(updateurl,data=updatedData,headers=self.headers)
         return updateResponse
 
-    def activateConfiguration(self,session,version,network,emailList,notes,propertyId,contractId,groupId,ignoreWarnings='optional'):
+    @instrumented
+    def patchRules(self,session,patch,version,propertyId,contractId,groupId,etag='optional'):
+        """
+        Function to apply a JSON Patch (RFC 6902) to the rules of a property
+
+        Parameters
+        ----------
+        session : <string>
+            An EdgeGrid Auth akamai session object
+        patch : <List> or <bytes>
+            JSON Patch operations, paths relative to the rules document (e.g. /rules/children/0), or the patch already encoded
+        version : <int>
+            Property or configuration version number
+        etag : <string>
+            etag of the rules the patch was computed against, the server answers 412 if they changed meanwhile
+
+        Returns
+        -------
+        patchResponse : patchResponse
+            (patchResponse) Object with all response details.
+        """
+
+        patchUrl = self.baseUrl + '/papi/v0/properties/'+ propertyId + "/versions/" + str(version) + '/rules/' + '?contractId=' + contractId +'&groupId=' + groupId
+        patchUrl = self.formUrl(patchUrl)
+
+        mime_header = {
+            "Content-Type": "application/json-patch+json"
+        }
+        if etag != 'optional' and etag:
+            mime_header['If-Match'] = self.conditionalHeaders(etag)['If-None-Match']
+
+        if not isinstance(patch, bytes):
+            patch = jsonbackend.dumpBytes(patch, default=toPlain)
+        patchResponse = session.patch(patchUrl,data=patch,headers=mime_header)
+        return patchResponse
+
+    @instrumented
+    def activateConfiguration(self,session,version,network,emailList,notes,propertyId,contractId,groupId,ignoreWarnings='optional',property_name='optional'):
         """
         Function to activate a configuration or property
 
@@ -277,7 +517,9 @@ class PapiWrapper(object):
         Returns
         -------
         activationResponse : activationResponse
-            (activationResponse) Object with all response details.
+            (activationResponse) Object with all response details, the
+            outcome is its status_code. Nothing is stored on the object, so
+            it can be shared by threads activating different properties.
         """
         emails = json.dumps(emailList)
         activationDetails = """
@@ -289,9 +531,9 @@ class PapiWrapper(object):
             } """ % (version,network.upper(),notes,emails)
 
         if ignoreWarnings == 'optional':
-            actUrl  = 'https://' + self.access_hostname + '/papi/v0/properties/'+ propertyId + '/activations/?contractId=' + contractId +'&groupId=' + groupId
+            actUrl  = self.baseUrl + '/papi/v0/properties/'+ propertyId + '/activations/?contractId=' + contractId +'&groupId=' + groupId
         else:
-            actUrl  = 'https://' + self.access_hostname + '/papi/v0/properties/'+ propertyId + '/activations/?contractId=' + contractId +'&groupId=' + groupId + '&acknowledgeAllWarnings=true'
+            actUrl  = self.baseUrl + '/papi/v0/properties/'+ propertyId + '/activations/?contractId=' + contractId +'&groupId=' + groupId + '&acknowledgeAllWarnings=true'
 
         actUrl = self.formUrl(actUrl)
 
@@ -318,22 +560,42 @@ class PapiWrapper(object):
                 if updatedactivationResponse.status_code == 201:
                     print("Here is the activation link, that can be used to track\n")
                     #print(updatedactivationResponse.json()['activationLink'])
-                else:
-                    self.final_response = "FAILURE"
-                    #print(updatedactivationResponse.json())
                 return updatedactivationResponse
             elif activationResponse.status_code == 422 and activationResponse.json()['detail'].find('version already activated'):
                 print("Property version already activated")
-                self.final_response = "SUCCESS"
             elif activationResponse.status_code == 404 and activationResponse.json()['detail'].find('unable to locate'):
                 print("The system was unable to locate the requested version of configuration")
-                self.final_response = "FAILURE"
             return activationResponse
         except KeyError:
-            self.final_response = "FAILURE"
             print("Looks like there is some error in configuration. Unable to activate configuration at this moment\n")
             return activationResponse
 
+    @instrumented
+    def getActivation(self,session,propertyId,activationId,contractId,groupId):
+        """
+        Function to fetch the status of an activation
+
+        Parameters
+        ----------
+        session : <string>
+            An EdgeGrid Auth akamai session object
+        propertyId : <string>
+            Property ID
+        activationId : <string>
+            Activation ID, the last part of the activationLink returned on activation
+
+        Returns
+        -------
+        activationResponse : activationResponse
+            (activationResponse) Object with all response details.
+        """
+        activationUrl = self.baseUrl + '/papi/v1/properties/' + propertyId + '/activations/' + activationId + '?contractId=' + contractId + '&groupId=' + groupId
+        activationUrl = self.formUrl(activationUrl)
+
+        activationResponse = session.get(activationUrl)
+        return activationResponse
+
+    @instrumented
     def cloneConfig(self,session,property_name,new_property_name,version):
         """
         Function to Clone a configuration
@@ -356,7 +618,7 @@ class PapiWrapper(object):
         """
 
         self.getPropertyInfo(session, property_name)
-        versionUrl = 'https://' + self.access_hostname  + '/papi/v0/properties/'+ propertyId + "/versions/" + '?contractId=' + contractId +'&groupId=' + groupId
+        versionUrl = self.baseUrl + '/papi/v0/properties/'+ propertyId + "/versions/" + '?contractId=' + contractId +'&groupId=' + groupId
         versionUrl = self.formUrl(versionUrl)
 
         productId = ''
@@ -381,12 +643,13 @@ class PapiWrapper(object):
         }
         """ % (productId,new_property_name,propertyId,version,versionEtag)
 
-        cloneUrl = 'https://' + self.access_hostname  + '/papi/v0/properties/?contractId=' + contractId +'&groupId=' + groupId
+        cloneUrl = self.baseUrl + '/papi/v0/properties/?contractId=' + contractId +'&groupId=' + groupId
         cloneUrl = self.formUrl(cloneUrl)
 
         cloneResponse = session.post(cloneUrl, data=cloneData, headers=self.headers)
         return cloneResponse
 
+    @instrumented
     def createConfig(self,session,new_property_name,productId,contractId,groupId):
         """
         Function to create a configuration
@@ -410,12 +673,13 @@ class PapiWrapper(object):
         }
         """ % (productId,new_property_name)
 
-        createUrl = 'https://' + self.access_hostname  + '/papi/v0/properties/?contractId=' + contractId +'&groupId=' + groupId
+        createUrl = self.baseUrl + '/papi/v0/properties/?contractId=' + contractId +'&groupId=' + groupId
         createUrl = self.formUrl(createUrl)
 
         createResponse = session.post(createUrl, data=createData, headers=self.headers)
         return createResponse
 
+    @instrumented
     def deleteProperty(self, session, propertyId, contractId, groupId):
         """
         Function to delete a property
@@ -433,12 +697,13 @@ class PapiWrapper(object):
             (deleteResponse) Object with all response details.
         """
 
-        deleteurl = 'https://' + self.access_hostname  + '/papi/v0/properties/'+ propertyId + '?contractId=' + contractId +'&groupId=' + groupId
+        deleteurl = self.baseUrl + '/papi/v0/properties/'+ propertyId + '?contractId=' + contractId +'&groupId=' + groupId
         deleteurl = self.formUrl(deleteurl)
 
         deleteResponse = session.delete(deleteurl)
         return deleteResponse
 
+    @instrumented
     def listProducts(self,session,contractId):
         """
         Function to fetch all products
@@ -452,13 +717,14 @@ class PapiWrapper(object):
         -------
         Nothing: It rather prints the data
         """
-        productsUrl = 'https://' + self.access_hostname + '/papi/v0/products/?contractId=' + contractId
+        productsUrl = self.baseUrl + '/papi/v0/products/?contractId=' + contractId
         productsUrl = self.formUrl(productsUrl)
 
         productsResponse = session.get(productsUrl)
         return productsResponse
 
 
+    @instrumented
     def listRuleFormats(self,session):
         """
         Function to Get a list of available rule formats
@@ -473,13 +739,14 @@ class PapiWrapper(object):
         ruleFomratResponse : ruleFomratResponse
             (ruleFomratResponse) Object with all response details.
         """
-        ruleFomratUrl = 'https://' + self.access_hostname + '/papi/v0/rule-formats'
+        ruleFomratUrl = self.baseUrl + '/papi/v0/rule-formats'
         ruleFomratUrl = self.formUrl(ruleFomratUrl)
 
         ruleFomratResponse = session.get(ruleFomratUrl)
         return ruleFomratResponse
 
-    def getRuleTree(self,session,propertyId,contractId,groupId,version,latestTimeStamp='latest'):
+    @instrumented
+    def getRuleTree(self,session,propertyId,contractId,groupId,version,latestTimeStamp='latest',etag='optional'):
         """
         Function to get the entire rule tree for a property version
 
@@ -498,13 +765,15 @@ class PapiWrapper(object):
         mime_header = {
             "Accept": AcceptValue
         }
+        mime_header.update(self.conditionalHeaders(etag))
         
-        ruleTreeUrl = 'https://' + self.access_hostname + '/papi/v0/properties/' + propertyId + '/versions/' + version + '/rules/?contractId=' + contractId + '&groupId=' + groupId
+        ruleTreeUrl = self.baseUrl + '/papi/v0/properties/' + propertyId + '/versions/' + version + '/rules/?contractId=' + contractId + '&groupId=' + groupId
         ruleTreeUrl = self.formUrl(ruleTreeUrl)
 
         ruleTreeResponse = session.get(ruleTreeUrl,headers=mime_header)
         return ruleTreeResponse
 
+    @instrumented
     def updateRuleTree(self,session,propertyId,contractId,groupId,version):
         """
         Function to update the entire rule tree for a property version to
@@ -523,12 +792,13 @@ class PapiWrapper(object):
             "Content-Type": "application/vnd.akamai.papirules.v2016-11-15+json"
         }
         
-        updateruleTreeUrl = 'https://' + self.access_hostname + '/papi/v0/properties/' + propertyId + '/versions/' + version + '/rules/?contractId=' + contractId + '&groupId=' + groupId
+        updateruleTreeUrl = self.baseUrl + '/papi/v0/properties/' + propertyId + '/versions/' + version + '/rules/?contractId=' + contractId + '&groupId=' + groupId
         updateruleTreeUrl = self.formUrl(updateruleTreeUrl)
 
         updateruleTreeResponse = session.put(updateruleTreeUrl,headers=mime_header)
         return updateruleTreeResponse
 
+    @instrumented
     def createEdgeHostname(self,session,hostname,productId,contractId,groupId):
         """
         Function to update hostname of property
@@ -554,12 +824,13 @@ class PapiWrapper(object):
             "ipVersionBehavior": "IPV4"
         }
         """ % (productId,hostname)
-        createEdgeHostnameUrl = 'https://' + self.access_hostname + '/papi/v0/edgehostnames/?contractId=' + contractId + '&groupId=' + groupId
+        createEdgeHostnameUrl = self.baseUrl + '/papi/v0/edgehostnames/?contractId=' + contractId + '&groupId=' + groupId
         createEdgeHostnameUrl = self.formUrl(createEdgeHostnameUrl)
 
         createEdgeHostnameResponse = session.post(createEdgeHostnameUrl,data=hostnameData,headers=self.headers)
         return createEdgeHostnameResponse
 
+    @instrumented
     def updateHostname(self,session,hostname,edgeHostnameId,version,propertyId,contractId,groupId):
         """
         Function to update hostname of property
@@ -588,12 +859,13 @@ class PapiWrapper(object):
         ]
         """ % (hostname,edgeHostnameId)
 
-        updateHostnameUrl = 'https://' + self.access_hostname + '/papi/v0/properties/' + propertyId + '/versions/' + str(version) + '/hostnames/?contractId=' + contractId + '&groupId=' + groupId + '&validateHostnames=false'
+        updateHostnameUrl = self.baseUrl + '/papi/v0/properties/' + propertyId + '/versions/' + str(version) + '/hostnames/?contractId=' + contractId + '&groupId=' + groupId + '&validateHostnames=false'
         updateHostnameUrl = self.formUrl(updateHostnameUrl)
 
         updateHostnameResponse = session.put(updateHostnameUrl,data=hostnameData,headers=self.headers)
         return updateHostnameResponse
 
+    @instrumented
     def verifyCreds(self,session):
         """
         Function to check credentials
@@ -608,12 +880,13 @@ class PapiWrapper(object):
         credsResponse : credsResponse
             (credsResponse) Object with all response details.
         """
-        credsUrl = 'https://' + self.access_hostname + '/-/client-api/active-grants/implicit'
+        credsUrl = self.baseUrl + '/-/client-api/active-grants/implicit'
         credsUrl = self.formUrl(credsUrl)
 
         credsResponse = session.get(credsUrl)
         return credsResponse
 
+    @instrumented
     def listEdgeHostnames(self,session,contractId,groupId):
         """
         Function to fetch all edgehostnames
@@ -634,12 +907,13 @@ class PapiWrapper(object):
             #update code to fetch group and contract info
             pass
         else:
-            edgehostnameUrl = 'https://' + self.access_hostname + '/papi/v0/edgehostnames/?contractId=' + contractId + '&groupId=' + groupId
+            edgehostnameUrl = self.baseUrl + '/papi/v0/edgehostnames/?contractId=' + contractId + '&groupId=' + groupId
             edgehostnameUrl = self.formUrl(edgehostnameUrl)
 
             edgehostnameResponse = session.get(edgehostnameUrl)
         return edgehostnameResponse
 
+    @instrumented
     def listProperties(self,session,contractId,groupId):
         """
         Function to fetch all properties
@@ -660,13 +934,14 @@ class PapiWrapper(object):
             #update code to fetch group and contract info
             pass
         else:
-            propertiesListUrl = 'https://' + self.access_hostname + '/papi/v1/properties?contractId=' + contractId + '&groupId=' + groupId
+            propertiesListUrl = self.baseUrl + '/papi/v1/properties?contractId=' + contractId + '&groupId=' + groupId
             propertiesListUrl = self.formUrl(propertiesListUrl)
 
             propertiesListResponse = session.get(propertiesListUrl)
         return propertiesListResponse
 
 
+    @instrumented
     def listHostnames(self,session,propertyId,version,contractId,groupId):
         """
         Function to fetch all properties
@@ -684,23 +959,31 @@ class PapiWrapper(object):
         hostNameList : hostName List object
         """
 
-        hostnameListUrl = 'https://' + self.access_hostname + '/papi/v1/properties/' + propertyId + '/versions/' + str(version) + '/hostnames'+ '?contractId=' + contractId + '&groupId=' + groupId
+        hostnameListUrl = self.baseUrl + '/papi/v1/properties/' + propertyId + '/versions/' + str(version) + '/hostnames'+ '?contractId=' + contractId + '&groupId=' + groupId
         hostnameListUrl = self.formUrl(hostnameListUrl)
 
         hostnameListResponse = session.get(hostnameListUrl)
         return hostnameListResponse
 
+    def conditionalHeaders(self, etag):
+        """
+        Function to form the If-None-Match header of a conditional GET
+        """
+        if etag == 'optional' or not etag:
+            return {}
+        #etags are sent quoted, as the server returns them in the ETag header
+        if not etag.startswith('"') and not etag.startswith('W/'):
+            etag = '"' + etag + '"'
+        return {'If-None-Match': etag}
+
     def formUrl(self, url):
         """
-        Function to form URL
+        Function to form URL. It does not modify the object, so one
+        PapiWrapper can be shared across threads.
         """
         #This is to ensure accountSwitchKey works for internal users
         if '?' in url:
-            self.account_switch_key = self.account_switch_key.translate(self.account_switch_key.maketrans('?','&'))
-            url = url + self.account_switch_key
+            return url + self.account_switch_key.replace('?', '&')
         else:
             #Replace & with ? if there is no query string in URL
-            self.account_switch_key = self.account_switch_key.translate(self.account_switch_key.maketrans('&','?'))
-            url = url + self.account_switch_key    
-
-        return url        
\ No newline at end of file
+            return url + self.account_switch_key.replace('&', '?')
@@ -0,0 +1,264 @@
+"""
+Copyright 2021 Akamai Technologies, Inc. All Rights Reserved.
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+
+"""
+Compact in-memory representation of PAPI rule trees, for holding many trees
+at once (account-wide analysis). Rules, behaviors and criteria are __slots__
+objects instead of dicts, names and option keys are interned so all trees
+share one copy of them, and the children of a rule are kept as compact JSON
+text until they are first accessed. Nodes behave like the dicts they replace
+(rule['name'], rule.get('children', []), rule.setdefault(...)), so RuleTree
+and the helper functions work on them unchanged.
+"""
+
+import json
+import sys
+from collections.abc import MutableMapping
+
+
+__all__=['RuleNode', 'FeatureNode', 'toPlain', 'dumps']
+
+MISSING = object()
+#Key orders are shared between nodes, nearly all rules use a handful of them
+keyOrders = {}
+
+
+def sharedKeyOrder(keys):
+    keys = tuple(keys)
+    return keyOrders.setdefault(keys, keys)
+
+
+def internKeys(value):
+    """
+    Function to intern the keys (and short string values) of an options object
+    """
+    if isinstance(value, dict):
+        return {sys.intern(key): internKeys(eachValue) for key, eachValue in value.items()}
+    if isinstance(value, list):
+        return [internKeys(eachValue) for eachValue in value]
+    if isinstance(value, str) and len(value) <= 32:
+        return sys.intern(value)
+    return value
+
+
+class CompactNode(MutableMapping):
+    """
+    Dict-like access over the slots listed in fields plus an extra dict for
+    the keys that are rarely present. keyOrder keeps the order of the keys as
+    received, so serializing gives back the same document.
+    """
+
+    __slots__ = ()
+    fields = ()
+
+    def __getitem__(self, key):
+        if key in self.fields:
+            value = getattr(self, key)
+            if value is MISSING:
+                raise KeyError(key)
+            return value
+        if self.extra is None:
+            raise KeyError(key)
+        return self.extra[key]
+
+    def __setitem__(self, key, value):
+        if key in self.fields:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[sys.intern(key)] = value
+        if key not in self.keyOrder:
+            self.keyOrder = sharedKeyOrder(self.keyOrder + (key,))
+
+    def __delitem__(self, key):
+        if key not in self.keyOrder:
+            raise KeyError(key)
+        if key in self.fields:
+            setattr(self, key, MISSING)
+        else:
+            del self.extra[key]
+            if not self.extra:
+                self.extra = None
+        self.keyOrder = sharedKeyOrder(eachKey for eachKey in self.keyOrder if eachKey != key)
+
+    def __iter__(self):
+        return iter(self.keyOrder)
+
+    def __len__(self):
+        return len(self.keyOrder)
+
+    def __contains__(self, key):
+        return key in self.keyOrder
+
+    def __repr__(self):
+        return type(self).__name__ + '(' + repr(self['name'] if 'name' in self else None) + ')'
+
+    def setFrom(self, source):
+        self.keyOrder = sharedKeyOrder(sys.intern(key) for key in source)
+        for key in self.fields:
+            setattr(self, key, MISSING)
+        self.extra = None
+        for key, value in source.items():
+            if key == 'name' and isinstance(value, str):
+                value = sys.intern(value)
+            if key in self.fields:
+                setattr(self, key, value)
+            else:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[sys.intern(key)] = value
+
+
+class FeatureNode(CompactNode):
+    """
+    A behavior or criterion of a rule: name, options and any other keys
+    (uuid, templateUuid, locked ...)
+    """
+
+    __slots__ = ('name', 'options', 'extra', 'keyOrder')
+    fields = ('name', 'options')
+
+    def __init__(self, feature):
+        self.setFrom(feature)
+        if self.options is not MISSING:
+            self.options = internKeys(self.options)
+
+
+class RuleNode(CompactNode):
+    """
+    A rule whose children are parsed on first access
+    """
+
+    __slots__ = ('name', 'behaviors', 'criteria', 'options', 'childNodes', 'childrenJson', 'extra', 'keyOrder')
+    fields = ('name', 'behaviors', 'criteria', 'options')
+
+    def __init__(self, rule):
+        children = rule.get('children', MISSING)
+        self.setFrom({key: value for key, value in rule.items() if key != 'children'})
+        #Keep 'children' at its original position
+        self.keyOrder = sharedKeyOrder(sys.intern(key) for key in rule)
+        if self.behaviors is not MISSING:
+            self.behaviors = [FeatureNode(eachBehavior) for eachBehavior in self.behaviors]
+        if self.criteria is not MISSING:
+            self.criteria = [FeatureNode(eachCriteria) for eachCriteria in self.criteria]
+        if self.options is not MISSING:
+            self.options = internKeys(self.options)
+        self.childNodes = None
+        self.childrenJson = None
+        if children is MISSING:
+            self.childNodes = MISSING
+        elif children:
+            self.childrenJson = json.dumps(children, separators=(',', ':'))
+        else:
+            self.childNodes = []
+
+    @classmethod
+    def fromJson(cls, text):
+        """
+        Function to build the compact tree from the JSON text of a rule
+
+        Parameters
+        ----------
+        text : <string> or <bytes>
+            JSON of a rule, e.g. the "rules" object of a rules response
+
+        Returns
+        -------
+        rule : <RuleNode>
+        """
+        return cls(json.loads(text))
+
+    def isLoaded(self):
+        return self.childrenJson is None
+
+    def loadChildren(self):
+        if self.childrenJson is not None:
+            self.childNodes = [RuleNode(eachChild) for eachChild in json.loads(self.childrenJson)]
+            self.childrenJson = None
+        return self.childNodes
+
+    def __getitem__(self, key):
+        if key == 'children':
+            children = self.loadChildren()
+            if children is MISSING:
+                raise KeyError(key)
+            return children
+        return super(RuleNode, self).__getitem__(key)
+
+    def __setitem__(self, key, value):
+        if key == 'children':
+            self.childNodes = value
+            self.childrenJson = None
+            if key not in self.keyOrder:
+                self.keyOrder = sharedKeyOrder(self.keyOrder + (key,))
+            return
+        super(RuleNode, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        if key == 'children':
+            if key not in self.keyOrder:
+                raise KeyError(key)
+            self.childNodes = MISSING
+            self.childrenJson = None
+            self.keyOrder = sharedKeyOrder(eachKey for eachKey in self.keyOrder if eachKey != key)
+            return
+        super(RuleNode, self).__delitem__(key)
+
+    def toJson(self):
+        """
+        Function to serialize the rule back to PAPI JSON. Children that were
+        never accessed are written out as kept, without parsing them.
+
+        Returns
+        -------
+        json : <string>
+        """
+        parts = []
+        for key in self.keyOrder:
+            if key == 'children' and self.childrenJson is not None:
+                value = self.childrenJson
+            elif key == 'children':
+                value = '[' + ','.join(eachChild.toJson() if isinstance(eachChild, RuleNode) else dumps(eachChild)
+                                       for eachChild in self.childNodes) + ']'
+            else:
+                value = dumps(self[key])
+            parts.append(json.dumps(key) + ':' + value)
+        return '{' + ','.join(parts) + '}'
+
+    def toDict(self):
+        """
+        Function to convert the rule into plain dicts and lists
+        """
+        return json.loads(self.toJson())
+
+
+def dumps(value):
+    """
+    Function to serialize a document that may hold nodes, compactly
+    """
+    return json.dumps(value, default=toPlain, separators=(',', ':'))
+
+
+def toPlain(value):
+    """
+    Function to use as json.dumps(..., default=toPlain), so documents holding
+    nodes serialize like the plain rules did
+    """
+    if isinstance(value, RuleNode) and not value.isLoaded():
+        #The encoder can not splice text, hand it the parsed rule instead
+        return value.toDict()
+    if isinstance(value, CompactNode):
+        return {key: value[key] for key in value.keyOrder}
+    raise TypeError('Object of type ' + type(value).__name__ + ' is not JSON serializable')
@@ -0,0 +1,285 @@
+"""
+Copyright 2021 Akamai Technologies, Inc. All Rights Reserved.
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+
+from rulehash import hashSubtree
+
+
+__all__=['RuleTree']
+
+
+class RuleTree(object):
+    """
+    Index over a PAPI rule tree, built in one iterative pass. The rules stay
+    the plain dicts of the rules JSON; the index maps rule names, case-folded
+    names, name paths and behavior names to them and keeps a parent link per
+    rule. Each index entry is a dict of id(rule) to rule, in document order,
+    so a rule is added or removed in constant time. Lookups are constant time,
+    edits only touch the affected sibling list and the index entries of the
+    rules that move. There is no recursion, so the depth of the tree is not
+    limited. The Merkle hash of a rule (rulehash) is kept once computed and
+    dropped, along with those of its ancestors, by every edit made through the
+    tree.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.parents = {}
+        self.paths = {}
+        self.byName = {}
+        self.byFoldedName = {}
+        self.byPath = {}
+        self.byBehavior = {}
+        #id(children list) to (list, {id(rule): position}), rebuilt when found out of date
+        self.positions = {}
+        #id(rule) to the hash of the rule with its children, only for rules hashed since their last edit
+        self.hashes = {}
+        self.addToIndex(rules, None)
+
+    def __len__(self):
+        return len(self.parents)
+
+    def __iter__(self):
+        """
+        Iterates over all rules in document (pre-)order
+        """
+        stack = [self.rules]
+        while stack:
+            rule = stack.pop()
+            yield rule
+            stack.extend(reversed(rule.get('children', [])))
+
+    def addToIndex(self, rule, parent):
+        stack = [(rule, parent)]
+        while stack:
+            rule, parent = stack.pop()
+            path = (self.paths[id(parent)] if parent is not None else ()) + (rule['name'],)
+            self.parents[id(rule)] = parent
+            self.paths[id(rule)] = path
+            self.byName.setdefault(rule['name'], {})[id(rule)] = rule
+            self.byFoldedName.setdefault(rule['name'].casefold(), {})[id(rule)] = rule
+            self.byPath.setdefault(path, {})[id(rule)] = rule
+            for eachBehavior in rule.get('behaviors', []):
+                self.byBehavior.setdefault(eachBehavior['name'], {})[id(rule)] = rule
+            #Reversed, so that rules are indexed in document order
+            for eachChild in reversed(rule.get('children', [])):
+                stack.append((eachChild, rule))
+
+    def removeFromIndex(self, rule):
+        stack = [rule]
+        while stack:
+            rule = stack.pop()
+            path = self.paths.pop(id(rule))
+            del self.parents[id(rule)]
+            self.hashes.pop(id(rule), None)
+            self.discard(self.byName, rule['name'], rule)
+            self.discard(self.byFoldedName, rule['name'].casefold(), rule)
+            self.discard(self.byPath, path, rule)
+            for eachBehavior in rule.get('behaviors', []):
+                self.discard(self.byBehavior, eachBehavior['name'], rule)
+            stack.extend(rule.get('children', []))
+
+    @staticmethod
+    def discard(index, key, rule):
+        rules = index.get(key)
+        if rules is None:
+            return
+        rules.pop(id(rule), None)
+        if not rules:
+            del index[key]
+
+    def find(self, ruleName, ignoreCase=False):
+        """
+        Function to find rules by name
+
+        Parameters
+        ----------
+        ruleName : <string>
+            Name of the rule
+        ignoreCase : <bool>
+            Compare names case-insensitively
+
+        Returns
+        -------
+        rules : <List> of matching rules
+        """
+        if ignoreCase:
+            return list(self.byFoldedName.get(ruleName.casefold(), {}).values())
+        return list(self.byName.get(ruleName, {}).values())
+
+    def getByPath(self, path):
+        """
+        Function to find rules by their path of names, e.g. ('default', 'Performance', 'Compressible Objects')
+
+        Returns
+        -------
+        rules : <List> of rules at that path, more than one if siblings share a name
+        """
+        return list(self.byPath.get(tuple(path), {}).values())
+
+    def findByBehavior(self, behaviorName):
+        """
+        Function to find the rules containing a behavior
+
+        Returns
+        -------
+        rules : <List> of rules, each listed once
+        """
+        return list(self.byBehavior.get(behaviorName, {}).values())
+
+    def parentOf(self, rule):
+        return self.parents[id(rule)]
+
+    def pathOf(self, rule):
+        return self.paths[id(rule)]
+
+    def siblingsOf(self, rule):
+        parent = self.parentOf(rule)
+        if parent is None:
+            raise ValueError('The default rule has no siblings')
+        return parent['children']
+
+    def positionOf(self, rule, rules):
+        """
+        Function to find the position of rule in a list of siblings. Positions
+        are kept per list and checked on use, a list edited since (here or by
+        the caller) has its positions taken again.
+        """
+        cached = self.positions.get(id(rules))
+        if cached is not None and cached[0] is rules:
+            position = cached[1].get(id(rule))
+            if position is not None and position < len(rules) and rules[position] is rule:
+                return position
+        positions = {id(eachRule): position for position, eachRule in enumerate(rules)}
+        self.positions[id(rules)] = (rules, positions)
+        if id(rule) not in positions:
+            raise ValueError('Rule ' + rule['name'] + ' is not in the list')
+        return positions[id(rule)]
+
+    def pointerOf(self, rule):
+        """
+        Function to get the JSON pointer of a rule relative to the rules
+        object, e.g. /children/0/children/2
+
+        Returns
+        -------
+        pointer : <string>
+        """
+        positions = []
+        parent = self.parentOf(rule)
+        while parent is not None:
+            positions.append(self.positionOf(rule, parent['children']))
+            rule, parent = parent, self.parentOf(parent)
+        return ''.join('/children/' + str(position) for position in reversed(positions))
+
+    def hashOf(self, rule):
+        """
+        Function to get the Merkle hash of a rule with its children. Only the
+        rules not hashed since they were last edited are serialized, so after
+        an edit only the path from the edited rule up is hashed again.
+
+        Returns
+        -------
+        hash : <string> hex digest
+        """
+        return hashSubtree(rule, self.hashes)
+
+    def dropHashes(self, rule):
+        """
+        Function to forget the hashes covering rule, after it was edited.
+        Edits made through the tree call it, edits made directly on the rules
+        have to call it themselves.
+        """
+        #The hash of every ancestor covers the rule as well
+        while rule is not None:
+            self.hashes.pop(id(rule), None)
+            rule = self.parents.get(id(rule))
+
+    def insertAt(self, parent, position, newRule):
+        parent.setdefault('children', []).insert(position, newRule)
+        self.dropHashes(parent)
+        self.addToIndex(newRule, parent)
+
+    def insertBefore(self, rule, newRule):
+        """
+        Function to insert newRule as the sibling just before rule
+        """
+        siblings = self.siblingsOf(rule)
+        self.insertAt(self.parentOf(rule), self.positionOf(rule, siblings), newRule)
+
+    def insertAfter(self, rule, newRule):
+        """
+        Function to insert newRule as the sibling just after rule
+        """
+        siblings = self.siblingsOf(rule)
+        self.insertAt(self.parentOf(rule), self.positionOf(rule, siblings) + 1, newRule)
+
+    def append(self, parent, newRule):
+        """
+        Function to add newRule as the last child of parent
+        """
+        self.insertAt(parent, len(parent.setdefault('children', [])), newRule)
+
+    def replace(self, rule, newRule):
+        """
+        Function to replace rule (and its children) with newRule
+        """
+        parent = self.parentOf(rule)
+        if parent is None:
+            self.removeFromIndex(rule)
+            self.rules = newRule
+            self.addToIndex(newRule, None)
+            return
+        siblings = parent['children']
+        position = self.positionOf(rule, siblings)
+        self.removeFromIndex(rule)
+        siblings[position] = newRule
+        self.dropHashes(parent)
+        self.addToIndex(newRule, parent)
+
+    def delete(self, rule):
+        """
+        Function to delete rule and its children
+        """
+        siblings = self.siblingsOf(rule)
+        del siblings[self.positionOf(rule, siblings)]
+        self.dropHashes(self.parentOf(rule))
+        self.removeFromIndex(rule)
+
+    def addBehavior(self, rule, behavior):
+        """
+        Function to append a behavior to rule
+        """
+        rule.setdefault('behaviors', []).append(behavior)
+        self.dropHashes(rule)
+        self.byBehavior.setdefault(behavior['name'], {})[id(rule)] = rule
+
+    def deleteBehavior(self, behaviorName, rule=None):
+        """
+        Function to delete a behavior from rule, or from every rule when rule is None
+
+        Returns
+        -------
+        count : <int> number of behaviors deleted
+        """
+        rules = [rule] if rule is not None else self.findByBehavior(behaviorName)
+        count = 0
+        for eachRule in rules:
+            behaviors = eachRule.get('behaviors', [])
+            remaining = [eachBehavior for eachBehavior in behaviors if eachBehavior['name'] != behaviorName]
+            count += len(behaviors) - len(remaining)
+            eachRule['behaviors'] = remaining
+            if len(remaining) != len(behaviors):
+                self.dropHashes(eachRule)
+            self.discard(self.byBehavior, behaviorName, eachRule)
+        return count
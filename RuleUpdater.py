@@ -18,18 +18,41 @@ In case you need quick explanation contact the initiators.
 Initiators: vbhat@akamai.com, aetsai@akamai.com, mkilmer@akamai.com
 """
 
+import io
+import itertools
 import json
 import sys
 from akamai.edgegrid import EdgeGridAuth, EdgeRc
-from PapiWrapper import PapiWrapper
+from PapiWrapper import PapiWrapper, createSession, addRequestHook, removeRequestHook
+from cache import MetadataCache, RuleTreeCache, PROPERTY_TTL, VERSION_TTL
+from inventory import Inventory, INVENTORY_FILE
+from ruleindex import RuleIndex
+from metrics import MetricsSummary, TraceWriter
+from profiler import CommandProfiler
 import argparse
 import configparser
 import requests
 import os
 import logging
 import helper
+import rulepatch
+import rulestream
+import rulequery
+import rulediff
+import jsonbackend
+from RuleTree import RuleTree
+from VersionResolver import VersionResolver
+from ActivationScheduler import ActivationScheduler
+from RuleNode import RuleNode, toPlain
 import re
 import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+try:
+    import yaml
+except ImportError:
+    yaml = None
 
 
 PACKAGE_VERSION = "1.0.8"
@@ -55,7 +78,7 @@ root_logger.addHandler(console_handler)
 root_logger.setLevel(logging.INFO)
 
 
-def init_config(edgerc_file, section):
+def init_config(edgerc_file, section, pool_size=10, max_retries=5):
     if not edgerc_file:
         if not os.getenv("AKAMAI_EDGERC"):
             edgerc_file = os.path.join(os.path.expanduser("~"), '.edgerc')
@@ -77,8 +100,8 @@ def init_config(edgerc_file, section):
         edgerc = EdgeRc(edgerc_file)
         base_url = edgerc.get(section, 'host')
 
-        session = requests.Session()
-        session.auth = EdgeGridAuth.from_edgerc(edgerc, section)
+        session = createSession(EdgeGridAuth.from_edgerc(edgerc, section),
+                                poolSize=pool_size, maxRetries=max_retries)
 
         return base_url, session
     except configparser.NoSectionError:
@@ -91,6 +114,346 @@ def init_config(edgerc_file, section):
         exit(1)
 
 
+def get_session(args):
+    """
+    Returns the (access_hostname, session) pair for a command. Commands run
+    from a batch share the session created by the batch command.
+    """
+    if getattr(args, 'session', None) is not None:
+        return args.access_hostname, args.session
+    return init_config(args.edgerc, args.section, max_retries=args.max_retries)
+
+
+#Batch, search and activate workers ask for the shared objects below at the same time, each is created once
+shared_objects_lock = threading.Lock()
+metadata_cache = None
+
+
+def get_metadata_cache(args):
+    global metadata_cache
+    with shared_objects_lock:
+        if metadata_cache is None:
+            metadata_cache = MetadataCache(get_cache_dir(), enabled=not getattr(args, 'no_cache', False))
+    return metadata_cache
+
+
+rule_cache = None
+
+
+def get_rule_cache(args):
+    global rule_cache
+    with shared_objects_lock:
+        if rule_cache is None:
+            rule_cache = RuleTreeCache(get_cache_dir(), enabled=not getattr(args, 'no_cache', False))
+    return rule_cache
+
+
+rule_index = None
+
+
+def get_rule_index(args):
+    global rule_index
+    with shared_objects_lock:
+        if rule_index is None:
+            rule_index = RuleIndex(get_cache_dir())
+    return rule_index
+
+
+inventory = None
+
+
+def get_inventory(args):
+    global inventory
+    with shared_objects_lock:
+        if inventory is None:
+            inventory = Inventory(get_inventory_file())
+    return inventory
+
+
+def find_property(papiObject, session, args):
+    """
+    Returns the propertyId, contractId and groupId of args.property. They are
+    looked up in the inventory of papi.py -setup when there is one, otherwise
+    cached, so searchProperty is only called on the first run.
+    """
+    if not getattr(args, 'no_cache', False) and get_inventory(args).isPopulated(args.account_key):
+        propertyDetails = get_inventory(args).findProperty(args.property)
+        if propertyDetails is not None:
+            root_logger.debug('Using inventory property details of ' + args.property)
+            return propertyDetails
+
+    cache = get_metadata_cache(args)
+    cacheKey = MetadataCache.propertyKey(args.account_key, args.property)
+    propertyDetails = cache.get(cacheKey)
+    if propertyDetails is not None:
+        root_logger.debug('Using cached property details of ' + args.property)
+        return propertyDetails
+
+    propertyResponse = papiObject.searchProperty(session,propertyName=args.property)
+    try:
+        searchItem = propertyResponse.json()['versions']['items'][0]
+    except (KeyError, IndexError, ValueError):
+        root_logger.info('Property details were not found. Double check property name\n')
+        exit()
+    propertyDetails = {
+        'propertyName': searchItem['propertyName'],
+        'propertyId': searchItem['propertyId'],
+        'contractId': searchItem['contractId'],
+        'groupId': searchItem['groupId']
+    }
+    cache.set(cacheKey, propertyDetails, PROPERTY_TTL)
+    return propertyDetails
+
+
+version_resolvers_lock = threading.Lock()
+
+
+def get_version_resolver(papiObject, session, args, propertyDetails, maxAge=VERSION_TTL):
+    """
+    Returns the VersionResolver of a property. It is built from one
+    listVersions response and kept for the rest of the command, or for the
+    whole run when the command is part of a batch.
+    """
+    with version_resolvers_lock:
+        if getattr(args, 'version_resolvers', None) is None:
+            args.version_resolvers = {}
+        resolver = args.version_resolvers.get(propertyDetails['propertyId'])
+    if resolver is not None:
+        return resolver
+    versionsJson = fetch_versions(papiObject, session, args, propertyDetails, maxAge)
+    if versionsJson is None:
+        exit()
+    resolver = VersionResolver(versionsJson)
+    with version_resolvers_lock:
+        args.version_resolvers[propertyDetails['propertyId']] = resolver
+    return resolver
+
+
+def lookup_version(papiObject, session, args, propertyDetails, activeOn):
+    """
+    Returns the LATEST, STAGING or PRODUCTION version number of a property
+    """
+    version = get_version_resolver(papiObject, session, args, propertyDetails).resolve(activeOn)
+    if version is None:
+        if activeOn.upper() in ('STAGING', 'PRODUCTION'):
+            root_logger.info('No version is active in ' + activeOn.lower())
+        else:
+            root_logger.info('Unable to find the version details\n')
+        exit()
+    return version
+
+
+def invalidate_versions(args, propertyDetails):
+    """
+    Drops the cached version list of a property, called after a new version is created
+    """
+    with version_resolvers_lock:
+        if getattr(args, 'version_resolvers', None) is not None:
+            args.version_resolvers.pop(propertyDetails['propertyId'], None)
+    get_metadata_cache(args).invalidate(MetadataCache.versionsKey(args.account_key, propertyDetails['propertyId']))
+
+
+def known_locked(args, propertyDetails, version):
+    """
+    Whether the version list already fetched by this command shows the version as activated
+    """
+    resolvers = getattr(args, 'version_resolvers', None) or {}
+    resolver = resolvers.get(propertyDetails['propertyId'])
+    return resolver is not None and resolver.isLocked(version)
+
+
+def response_etag(response, responseJson):
+    """
+    etag of a PAPI response, from the ETag header or else from the body
+    """
+    if response.headers.get('ETag'):
+        return response.headers['ETag']
+    if responseJson.get('etag'):
+        return '"' + responseJson['etag'] + '"'
+    return None
+
+
+def fetch_rules(papiObject, session, args, propertyDetails, version, locked=False, original=False, compact=False):
+    """
+    Returns the rules of a property version as a dict, or None when they can
+    not be fetched. Trees of activated versions are served from the local rule
+    tree cache directly. For other versions the cached tree's etag is sent
+    with If-None-Match, and the cached tree is used when the server answers 304.
+    Pass locked=True when the version is known to be activated. With
+    original=True a pair (rules, untouched copy of the rules) is returned, the
+    copy is what upload_rules computes the JSON Patch against. With
+    compact=True the rules are returned as RuleNode objects, for read-only
+    use of many trees at once.
+    """
+    content, rulesJson = fetch_rules_content(papiObject, session, args, propertyDetails, version, locked)
+    if content is None:
+        return (None, None) if original else None
+    if rulesJson is None:
+        return parse_rules(content, original, compact)
+    if original:
+        return rulesJson, jsonbackend.loads(content)
+    if compact:
+        rulesJson['rules'] = RuleNode(rulesJson['rules'])
+    return rulesJson
+
+
+def fetch_rules_content(papiObject, session, args, propertyDetails, version, locked=False):
+    """
+    Returns the (content, rulesJson) pair of a property version as fetch_rules
+    gets it, content is the rules response body or None when it can not be
+    fetched. rulesJson is the parsed body when it had to be parsed for its
+    etag, None otherwise.
+    """
+    cache = get_rule_cache(args)
+    propertyId = propertyDetails['propertyId']
+    locked = locked or known_locked(args, propertyDetails, version)
+    entry = cache.lookup(propertyId, version)
+    if entry is not None and entry['locked']:
+        content = cache.get(propertyId, version)
+        if content is not None:
+            root_logger.debug('Using cached rules of ' + propertyId + ' v' + str(version))
+            return content, None
+        entry = None
+
+    etag = entry['etag'] if entry is not None else 'optional'
+    rulesResponse = papiObject.getPropertyRules(session, propertyId, version, propertyDetails['contractId'], propertyDetails['groupId'], etag=etag)
+    if rulesResponse.status_code == 304:
+        content = cache.get(propertyId, version, entry['etag'])
+        if content is not None:
+            root_logger.debug('Rules of ' + propertyId + ' v' + str(version) + ' not modified, using cached rules')
+            if locked:
+                cache.put(propertyId, version, entry['etag'], content, locked)
+            return content, None
+        #Evicted in the meantime, fetch the full tree
+        rulesResponse = papiObject.getPropertyRules(session, propertyId, version, propertyDetails['contractId'], propertyDetails['groupId'])
+
+    if rulesResponse.status_code != 200:
+        root_logger.info('Unable to fetch property rules. Reason is: \n\n' + rulesResponse.text)
+        return None, None
+    rulesJson = None
+    etag = rulesResponse.headers.get('ETag')
+    if etag is None:
+        rulesJson = jsonbackend.loads(rulesResponse.content)
+        etag = response_etag(rulesResponse, rulesJson)
+    if etag is not None:
+        cache.put(propertyId, version, etag, rulesResponse.content, locked)
+    return rulesResponse.content, rulesJson
+
+
+def stream_rules(papiObject, session, args, propertyDetails, version):
+    """
+    Returns the rules response of a property version as a file like object to
+    be parsed incrementally, or None when the rules can not be fetched. Cached
+    trees are used as in fetch_rules, a downloaded body is not read up front
+    and therefore not cached.
+    """
+    cache = get_rule_cache(args)
+    propertyId = propertyDetails['propertyId']
+    entry = cache.lookup(propertyId, version)
+    if entry is not None and entry['locked']:
+        content = cache.get(propertyId, version)
+        if content is not None:
+            return io.BytesIO(content)
+        entry = None
+
+    etag = entry['etag'] if entry is not None else 'optional'
+    rulesResponse = papiObject.getPropertyRules(session, propertyId, version, propertyDetails['contractId'], propertyDetails['groupId'], etag=etag, stream=True)
+    if rulesResponse.status_code == 304:
+        content = cache.get(propertyId, version, entry['etag'])
+        if content is not None:
+            return io.BytesIO(content)
+        rulesResponse = papiObject.getPropertyRules(session, propertyId, version, propertyDetails['contractId'], propertyDetails['groupId'], stream=True)
+
+    if rulesResponse.status_code != 200:
+        root_logger.info('Unable to fetch property rules. Reason is: \n\n' + rulesResponse.text)
+        return None
+    #Let urllib3 undo any gzip transfer encoding while the body is read
+    rulesResponse.raw.decode_content = True
+    return rulesResponse.raw
+
+
+def parse_rules(content, original, compact=False):
+    #Parsing twice is cheaper than a deep copy of the tree
+    if original:
+        return jsonbackend.loads(content), jsonbackend.loads(content)
+    rulesJson = jsonbackend.loads(content)
+    if compact:
+        rulesJson['rules'] = RuleNode(rulesJson['rules'])
+    return rulesJson
+
+
+def fetch_versions(papiObject, session, args, propertyDetails, maxAge=0):
+    """
+    Returns the version list of a property as a dict, or None when it can not
+    be fetched. The list is kept in the metadata cache with its etag. A cached
+    list younger than maxAge seconds is used as is, an older one is
+    revalidated with If-None-Match.
+    """
+    cache = get_metadata_cache(args)
+    cacheKey = MetadataCache.versionsKey(args.account_key, propertyDetails['propertyId'])
+    cached = cache.get(cacheKey)
+    if cached is not None and time.time() - cached.get('fetched', 0) < maxAge:
+        root_logger.debug('Using cached versions of ' + propertyDetails['propertyId'])
+        return cached['versions']
+    etag = cached['etag'] if cached is not None else 'optional'
+    versionsResponse = papiObject.listVersions(session, property_name=args.property, propertyId=propertyDetails['propertyId'],
+                                               contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'], etag=etag)
+    if versionsResponse.status_code == 304 and cached is not None:
+        root_logger.debug('Versions of ' + propertyDetails['propertyId'] + ' not modified, using cached list')
+        cached['fetched'] = time.time()
+        cache.set(cacheKey, cached, PROPERTY_TTL)
+        return cached['versions']
+    if versionsResponse.status_code != 200:
+        root_logger.info('Unable to fetch versions of the property')
+        root_logger.info(versionsResponse.text)
+        return None
+    versionsJson = versionsResponse.json()
+    etag = response_etag(versionsResponse, versionsJson)
+    if etag is not None:
+        cache.set(cacheKey, {'etag': etag, 'versions': versionsJson, 'fetched': time.time()}, PROPERTY_TTL)
+    return versionsJson
+
+
+def upload_rules(papiObject, session, args, propertyDetails, version, completePropertyJson, originalPropertyJson=None):
+    """
+    Uploads the rules of a property version and drops its now stale cached tree.
+    When the rules as fetched are passed in originalPropertyJson, only the JSON
+    Patch between the two is sent with PATCH, unless the patch would be larger
+    than the complete rules, in which case they are sent with PUT as before.
+    """
+    uploadRulesResponse = None
+    putData = completePropertyJson
+    if originalPropertyJson is not None:
+        source = {'rules': originalPropertyJson['rules']}
+        target = {'rules': completePropertyJson['rules']}
+        #comments is only part of the patch where a document has it, a replace of a missing member is rejected
+        for eachDocument, eachWrapper in [(originalPropertyJson, source), (completePropertyJson, target)]:
+            if 'comments' in eachDocument:
+                eachWrapper['comments'] = eachDocument['comments']
+        patch = rulepatch.makePatch(source, target)
+        patchData = jsonbackend.dumpBytes(patch, default=toPlain)
+        #Encoded once, the same bytes are uploaded if PUT is used
+        putData = jsonbackend.dumpBytes(completePropertyJson, default=toPlain)
+        patchSize = len(patchData)
+        putSize = len(putData)
+        if patchSize < putSize:
+            root_logger.debug('Patching rules with ' + str(len(patch)) + ' operations (' + str(patchSize) + ' instead of ' + str(putSize) + ' bytes)')
+            #The etag only guards against concurrent edits of the version the rules were fetched from
+            etag = 'optional'
+            if str(originalPropertyJson.get('propertyVersion')) == str(version):
+                etag = originalPropertyJson.get('etag', 'optional')
+            uploadRulesResponse = papiObject.patchRules(session, patchData, version, propertyDetails['propertyId'],
+                                                        propertyDetails['contractId'], propertyDetails['groupId'], etag=etag)
+            if uploadRulesResponse.status_code in [405, 415, 501]:
+                root_logger.debug('PATCH is not supported, uploading the complete rules')
+                uploadRulesResponse = None
+    if uploadRulesResponse is None:
+        uploadRulesResponse = papiObject.uploadRules(session=session, updatedData=putData, property_name=args.property, version=version,
+                                                     propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
+    get_rule_cache(args).invalidate(propertyDetails['propertyId'], version)
+    return uploadRulesResponse
+
+
 def cli():
     prog = get_prog_name()
     if len(sys.argv) == 1:
@@ -121,12 +484,12 @@ def cli():
 
     actions["downloadRule"] = create_sub_command(
         subparsers,
-        "download-rule",
+        "downloadRule",
         "Download a specific rule in a configuration into json format",
-        [{"name": "filename", "help": "Filename to be used to save the rule in json format under samplerules folder"}],
+        [{"name": "outputFilename", "help": "Filename to be used to save the rule in json format under samplerules folder"}],
         [{"name": "property", "help": "Property name"},
          {"name": "version", "help": "version number or the text 'LATEST/PRODUCTION/STAGING' "},
-         {"name": "rule-name", "help": "Rule Name to find"}])
+         {"name": "ruleName", "help": "Rule Name to find"}])
 
     actions["addRule"] = create_sub_command(
         subparsers, "addRule", "Add a raw json rule to an existing configuration (before or after and existing rule)",
@@ -193,6 +556,48 @@ def cli():
          {"name": "version", "help": "Please enter the version to use/create from using --version."},
          {"name": "behaviorName", "help": "Name of the behavior to be deleted."}])
 
+    actions["applyChanges"] = create_sub_command(
+        subparsers, "applyChanges",
+        "Apply a list of rule/behavior operations with a single new version and upload",
+        [{"name": "comment", "help": "Version notes to be saved, by default the notes of all operations are combined"}],
+        [{"name": "property", "help": "Property name"},
+         {"name": "version", "help": "version number or the text 'LATEST/PRODUCTION/STAGING' on OR from which the changes are made"},
+         {"name": "changeset", "help": "YAML or JSON file listing the operations to apply in order"},
+         {"name": "checkoutNewVersion", "help": "Please enter whether to create a new version or use existing version using -checkoutNewVersion YES/NO."}])
+
+    actions["batch"] = create_sub_command(
+        subparsers, "batch",
+        "Apply the operations listed in a manifest to many properties in parallel",
+        [{"name": "workers", "help": "Number of properties processed in parallel (default 8)", "type": int, "default": 8}],
+        [{"name": "manifest", "help": "YAML or JSON file listing property, operation and rule file of each edit"}])
+
+    actions["diff"] = create_sub_command(
+        subparsers, "diff",
+        "Show the rules, behaviors and criteria changed between two versions of a property",
+        [],
+        [{"name": "property", "help": "Property name"},
+         {"name": "fromVersion", "help": "Old version number or the text 'LATEST/PRODUCTION/STAGING'"},
+         {"name": "toVersion", "help": "New version number or the text 'LATEST/PRODUCTION/STAGING'"}])
+
+    actions["search"] = create_sub_command(
+        subparsers, "search",
+        "Search the rules of every property in the inventory of papi.py -setup",
+        [{"name": "version", "help": "LATEST (default), STAGING or PRODUCTION version of each property", "default": "LATEST"},
+         {"name": "workers", "help": "Number of rule trees fetched in parallel (default 8)", "type": int, "default": 8},
+         {"name": "indexOnly", "help": "Answer from the rule index alone, without checking for newer rule trees"}],
+        [{"name": "query", "help": "Query such as 'behavior:origin.hostname=*.example.com and not rule:default', see rulequery.py"}])
+
+    actions["activate"] = create_sub_command(
+        subparsers, "activate",
+        "Activate the property versions listed in a manifest and wait until all activations complete",
+        [{"name": "network", "help": "STAGING or PRODUCTION, for entries that do not name a network"},
+         {"name": "email", "help": "Comma separated notification emails, for entries that do not list any"},
+         {"name": "notes", "help": "Activation notes, for entries that have none", "default": ""},
+         {"name": "workers", "help": "Number of activations submitted and polled in parallel (default 8)", "type": int, "default": 8},
+         {"name": "pollInterval", "help": "Seconds before the first status poll of an activation (default 30)", "type": int, "default": 30},
+         {"name": "timeout", "help": "Seconds to wait for all activations to complete (default 3600)", "type": int, "default": 3600}],
+        [{"name": "manifest", "help": "YAML or JSON file listing property, version and optionally network, email and notes of each activation"}])
+
     args = parser.parse_args()
 
     if len(sys.argv) <= 1:
@@ -214,7 +619,59 @@ def cli():
     if args.debug:
         root_logger.setLevel(logging.DEBUG)
 
-    return getattr(sys.modules[__name__], args.command.replace("-", "_"))(args)
+    return run_command(args)
+
+
+def run_command(args):
+    """
+    Runs the command of args, reporting its PAPI calls when --metrics or
+    --trace is given
+    """
+    command = getattr(sys.modules[__name__], args.command.replace("-", "_"))
+    hooks = []
+    summary = None
+    if args.metrics:
+        summary = MetricsSummary()
+        hooks.append(summary)
+    if args.trace:
+        hooks.append(TraceWriter(args.trace))
+    for eachHook in hooks:
+        addRequestHook(eachHook)
+    profiler = None
+    if args.profile:
+        profiler = CommandProfiler(profile_phases(), defaultPhase='transform')
+        profiler.start()
+    start = time.time()
+    try:
+        return command(args)
+    finally:
+        wallSeconds = time.time() - start
+        if profiler is not None:
+            profiler.stop()
+            profileFiles = profiler.write(os.path.join('logs', 'profile-' + args.command + '-' + time.strftime('%Y%m%d-%H%M%S')))
+            root_logger.info('\nProfile written to: ' + ', '.join(profileFiles))
+        for eachHook in hooks:
+            removeRequestHook(eachHook)
+            if isinstance(eachHook, TraceWriter):
+                eachHook.close()
+        if summary is not None:
+            root_logger.info('\nPAPI calls of ' + args.command + ' (%.2fs)' % wallSeconds)
+            for eachLine in summary.table(wallSeconds):
+                root_logger.info(eachLine)
+
+
+def profile_phases():
+    """
+    Returns the functions making up each phase of a --profile report, the rest
+    of a command (rule tree edits, JSON encoding, output) is the transform phase
+    """
+    return {
+        'resolve': [find_property, get_version_resolver, lookup_version, fetch_versions, VersionResolver,
+                    PapiWrapper.searchProperty, PapiWrapper.getVersion, PapiWrapper.getVersionDetail, PapiWrapper.listVersions],
+        'fetch': [fetch_rules, fetch_rules_content, stream_rules, parse_rules, rulestream, PapiWrapper.getPropertyRules],
+        'upload': [upload_rules, create_version, PapiWrapper.uploadRules, PapiWrapper.patchRules, PapiWrapper.createVersion,
+                   PapiWrapper.activateConfiguration, PapiWrapper.getActivation]
+    }
 
 
 def create_sub_command(
@@ -240,7 +697,7 @@ def create_sub_command(
             name = arg["name"]
             del arg["name"]
             if name == 'insertAfter' or name == 'insertBefore' or name == 'insertLast' \
-            or name == 'addVariables':
+            or name == 'addVariables' or name == 'indexOnly':
                 optional.add_argument(
                     "--" + name,
                     required=False,
@@ -273,41 +730,51 @@ def create_sub_command(
         help="Account Switch Key",
         default="")
 
+    optional.add_argument(
+        "--no-cache",
+        help="Do not use the locally cached property details and rule trees",
+        action="store_true")
+
+    optional.add_argument(
+        "--max-retries",
+        help="Retries with exponential backoff on 429/5xx responses (default 5, 0 disables)",
+        type=int,
+        default=5)
+
+    optional.add_argument(
+        "--metrics",
+        help="Print the calls, time, retries and bytes per PAPI endpoint at the end",
+        action="store_true")
+
+    optional.add_argument(
+        "--trace",
+        help="Append a JSON line per PAPI call to this file")
+
+    optional.add_argument(
+        "--profile",
+        help="Profile CPU and memory, by phase, into the logs directory",
+        action="store_true")
+
     return action
 
 
 def downloadRule(args):
-    access_hostname, session = init_config(args.edgerc, args.section)
+    access_hostname, session = get_session(args)
     papiObject = PapiWrapper(access_hostname, args.account_key)
 
     #Find the property details (IDs)
-    propertyResponse = papiObject.searchProperty(session,propertyName=args.property)
-    if propertyResponse.status_code == 200:
-        try:
-            propertyDetails = propertyResponse.json()['versions']['items'][0]
-        except:
-            root_logger.info('Property details were not found. Double check property name\n')
-            exit()                
-    else:
-       root_logger.info('Property details were not found. Double check property name\n')
+    propertyDetails = find_property(papiObject, session, args)
 
     #Fetch the latest version if need be
     if args.version.upper() == 'latest'.upper() or args.version.upper() == 'production'.upper() or args.version.upper() == 'staging'.upper():
         root_logger.info('Fetching ' + args.version.upper() +' version.')
-        versionResponse = papiObject.getVersion(session, activeOn=args.version.upper(), propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
-        if versionResponse.status_code == 200:
-            version = versionResponse.json()['versions']['items'][0]['propertyVersion']
-            root_logger.info('Latest version is: v' + str(version) + '\n')
-        else:
-            root_logger.info('Unable to find the version details\n')
-            root_logger.info(json.dumps(versionResponse.json(), indent=4))    
-            exit()          
+        version = lookup_version(papiObject, session, args, propertyDetails, args.version.upper())
+        root_logger.info('Latest version is: v' + str(version) + '\n')
     else:
         version = args.version
         #Validate the version number entered using -version
         root_logger.info('Fetching version ' + args.version + ' ...')
-        versionResponse = papiObject.getVersion(session, activeOn='LATEST', propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
-        latestversion = versionResponse.json()['versions']['items'][0]['propertyVersion']
+        latestversion = lookup_version(papiObject, session, args, propertyDetails, 'LATEST')
         if int(args.version) > int(latestversion):
             root_logger.info('Please check the version number. The latest version is: ' + str(latestversion) + '\n')
             exit()
@@ -329,27 +796,37 @@ def downloadRule(args):
         filename = args.property + '_v' + str(version) + '_' + args.ruleName + '.json'
     #Replace special characters from filename with _, sometimes rulenames have special chars
     filename = filename.translate ({ord(c): "_" for c in " !@#$%^&*()[]{};:,/<>?\|`~-=_+"})
-    propertyContent = papiObject.getPropertyRulesfromPropertyId(session, propertyDetails['propertyId'], version, propertyDetails['contractId'], propertyDetails['groupId'])
-    if propertyContent.status_code == 200:
-        jsonRuleAndCount = helper.getRule([propertyContent.json()['rules']], args.ruleName)
-        if jsonRuleAndCount['ruleCount'] > 1:
-            root_logger.info('\nMultiple Rules named: "' + args.ruleName + '" exist, please check configuration\n')
+    if rulestream.streamingSupported():
+        #Parse the rules as they arrive and keep only the matching rules
+        rulesStream = stream_rules(papiObject, session, args, propertyDetails, version)
+        if rulesStream is None:
+            root_logger.info('Unable to fecth property rules.')
             exit()
-        elif jsonRuleAndCount['ruleCount'] == 1:
-            root_logger.info('Found rule...')
-            with open(os.path.join('samplerules',filename),'w') as rulesFileHandler:
-                rulesFileHandler.write(json.dumps(jsonRuleAndCount['ruleContent'], indent=4))
-                root_logger.info('Rule file is saved in: ' + os.path.join('samplerules',filename))
-        else:
-            root_logger.info('Rule: ' + args.ruleName + ' is not found. Please check configuration.')
+        #Two matches are enough to know the name is ambiguous
+        matchingRules = list(itertools.islice(rulestream.findRules(rulesStream, args.ruleName), 2))
+        rulesStream.close()
+        jsonRuleAndCount = {'ruleCount': len(matchingRules), 'ruleContent': matchingRules[0] if matchingRules else {}}
+    else:
+        propertyContent = fetch_rules(papiObject, session, args, propertyDetails, version)
+        if propertyContent is None:
+            root_logger.info('Unable to fecth property rules.')
             exit()
+        jsonRuleAndCount = helper.getRule([propertyContent['rules']], args.ruleName)
+    if jsonRuleAndCount['ruleCount'] > 1:
+        root_logger.info('\nMultiple Rules named: "' + args.ruleName + '" exist, please check configuration\n')
+        exit()
+    elif jsonRuleAndCount['ruleCount'] == 1:
+        root_logger.info('Found rule...')
+        with open(os.path.join('samplerules',filename),'w') as rulesFileHandler:
+            rulesFileHandler.write(jsonbackend.dumps(jsonRuleAndCount['ruleContent'], pretty=True))
+            root_logger.info('Rule file is saved in: ' + os.path.join('samplerules',filename))
     else:
-        root_logger.info('Unable to fecth property rules.')
+        root_logger.info('Rule: ' + args.ruleName + ' is not found. Please check configuration.')
         exit()
 
 def addRule(args):
     root_logger.info('Processing: ' + args.property)
-    access_hostname, session = init_config(args.edgerc, args.section)
+    access_hostname, session = get_session(args)
     papiObject = PapiWrapper(access_hostname, args.account_key)
 
     #Check for existence of file
@@ -390,26 +867,16 @@ def addRule(args):
     version = args.version
     
     #Find the property details (IDs)
-    propertyResponse = papiObject.searchProperty(session,propertyName=args.property)
-    if propertyResponse.status_code == 200:
-        try:
-            propertyDetails = propertyResponse.json()['versions']['items'][0]
-        except:
-            root_logger.info('Property details were not found. Double check property name\n')
-            exit()                
-    else:
-       root_logger.info('Property details were not found. Double check property name\n') 
+    propertyDetails = find_property(papiObject, session, args)
 
     #Fetch the latest version if need be
     root_logger.info('Fetching version ' + str(version) + ' ...')
     if version.upper() == 'latest'.upper() or version.upper() == 'production'.upper() or version.upper() == 'staging'.upper():
-        versionResponse = papiObject.getVersion(session, property_name=args.property, activeOn=version.upper(), propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
-        version = versionResponse.json()['versions']['items'][0]['propertyVersion']
+        version = lookup_version(papiObject, session, args, propertyDetails, version.upper())
         root_logger.info('Version is: v' + str(version) + '\n')
     else:
         #Validate the version number entered using -fromVersion
-        versionResponse = papiObject.getVersion(session, property_name=args.property, activeOn='LATEST', propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
-        latestversion = versionResponse.json()['versions']['items'][0]['propertyVersion']
+        latestversion = lookup_version(papiObject, session, args, propertyDetails, 'LATEST')
         if int(version) > int(latestversion):
             root_logger.info('Please check the version number. The highest/latest version is: ' + str(latestversion) + '\n')
             exit()
@@ -419,9 +886,9 @@ def addRule(args):
     #Let us now move towards rules
     #All rules are saved in samplerules folder, filename is configurable
     root_logger.info('Fetching existing property rules...')
-    propertyContent = papiObject.getPropertyRulesfromPropertyId(session, propertyDetails['propertyId'], version, propertyDetails['contractId'], propertyDetails['groupId'])
-    if propertyContent.status_code == 200:
-        completePropertyJson = propertyContent.json()
+    propertyContent, originalContent = fetch_rules(papiObject, session, args, propertyDetails, version, original=True)
+    if propertyContent is not None:
+        completePropertyJson = propertyContent
         with open(os.path.join(args.fromFile),'r') as rulesFileHandler:
             newRuleSet = json.loads(rulesFileHandler.read())
 
@@ -460,6 +927,7 @@ def addRule(args):
                     versionResponse = papiObject.createVersion(session, baseVersion=version, property_name=args.property, \
                                         propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
                     if versionResponse.status_code == 201:
+                        invalidate_versions(args, propertyDetails)
                         #Extract the version number
                         matchPattern = re.compile('/papi/v0/properties/prp_.*/versions/(.*)(\?.*)')
                         version = matchPattern.match(versionResponse.json()['versionLink']).group(1)
@@ -469,8 +937,7 @@ def addRule(args):
                         exit()
                     #Make a call to update the rules
                     root_logger.info('\nNow trying to upload the new ruleset...')
-                    uploadRulesResponse = papiObject.uploadRules(session=session, updatedData=json.loads(json.dumps(completePropertyJson)),\
-                    property_name=args.property, version=version, propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
+                    uploadRulesResponse = upload_rules(papiObject, session, args, propertyDetails, version, completePropertyJson, originalContent)
                     if uploadRulesResponse.status_code == 200:
                         root_logger.info('\nSuccess! Comments: "' + finalComment + '"\n')
                     else:
@@ -478,6 +945,7 @@ def addRule(args):
                         exit()                        
             else:
                 root_logger.info('\nError: Found ' + str(updatedCompleteRuleSet['occurances']) + ' occurrences of the rule: "' + args.ruleName + '"' + '. Please check configuration. Exiting...')
+                exit()
         else:
             root_logger.info('\nUnable to find rule: "' + args.ruleName + '" in this property.')
             root_logger.info('Check the -rulename value or run -getDetail to list existing rules for this property.')
@@ -490,103 +958,51 @@ def replaceRule(args):
     addRule(args)
 
 def getDetail(args):
-    access_hostname, session = init_config(args.edgerc, args.section)
+    access_hostname, session = get_session(args)
     papiObject = PapiWrapper(access_hostname, args.account_key)
 
     #Find the property details (IDs)
-    propertyResponse = papiObject.searchProperty(session,propertyName=args.property)
-    if propertyResponse.status_code == 200:
-        try:
-            propertyDetails = propertyResponse.json()['versions']['items'][0]
-        except:
-            root_logger.info('Property details were not found. Double check property name\n')
-            exit()                
-    else:
-       root_logger.info('Property details were not found. Double check property name\n')    
+    propertyDetails = find_property(papiObject, session, args)
 
     root_logger.info('Fetching property versions...\n')
-    versionsResponse = papiObject.listVersions(session, property_name=args.property, propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
-    if versionsResponse.status_code == 200:
-        root_logger.info('Current Property Details:')
-        root_logger.info('----------------------------------')
-        #root_logger.info(json.dumps(versionsResponse.json(), indent=4))
-        latestVersion = 0
-        stagingVersion = 0
-        productionVersion = 0
-        stagingNote = ''
-        productionNote = ''
-        latestNote = ''
-        for everyVersionDetail in versionsResponse.json()['versions']['items']:
-            #First update the value of latest version
-            if everyVersionDetail['propertyVersion'] > latestVersion:
-                latestVersion = everyVersionDetail['propertyVersion']
-            if everyVersionDetail['stagingStatus'] == 'ACTIVE':
-                stagingVersion = everyVersionDetail['propertyVersion']
-                if 'note' in everyVersionDetail:
-                    stagingNote = everyVersionDetail['note']
-            if everyVersionDetail['productionStatus'] == 'ACTIVE':
-                productionVersion = everyVersionDetail['propertyVersion']
-                if 'note' in everyVersionDetail:
-                    productionNote = everyVersionDetail['note']
-        root_logger.info('Version ' + str(latestVersion) + ' is latest')
-        if stagingVersion != 0:
-            root_logger.info('Version ' + str(stagingVersion) + ' is live in staging')
-        if stagingVersion == 0:
-            root_logger.info('No version is active in staging')
-        if productionVersion != 0:
-            root_logger.info('Version ' + str(productionVersion) + ' is live in production')
-        if productionVersion == 0:
-            root_logger.info('No version is active in production')
-        #root_logger.info('Version ' + str(latestVersion) + ' is the latest version')
-
-        #comment this out for now? root_logger.info('\nLast 10 versions...\n')
-        root_logger.info('\nVersion Details (Version : Description)')
-        root_logger.info('----------------------------------')
-
-        if args.fromVersion:
-            for everyVersionDetail in versionsResponse.json()['versions']['items']:
-                if int(everyVersionDetail['propertyVersion']) >= int(args.fromVersion):
-                    if 'note' in everyVersionDetail:
-                        root_logger.info('v' + str(everyVersionDetail['propertyVersion']) + ' : ' + everyVersionDetail['note'])
-                    else:
-                        root_logger.info('v' + str(everyVersionDetail['propertyVersion']) + ' : ')
+    #Always revalidated, this command is used to check what changed
+    resolver = get_version_resolver(papiObject, session, args, propertyDetails, maxAge=0)
+    root_logger.info('Current Property Details:')
+    root_logger.info('----------------------------------')
+    root_logger.info('Version ' + str(resolver.latest) + ' is latest')
+    for network in ['STAGING', 'PRODUCTION']:
+        activeVersion = resolver.activeVersion(network)
+        if activeVersion is not None:
+            root_logger.info('Version ' + str(activeVersion) + ' is live in ' + network.lower())
         else:
-            for everyVersionDetail in versionsResponse.json()['versions']['items'][:10]:
-                if 'note' in everyVersionDetail:
-                    root_logger.info('v' + str(everyVersionDetail['propertyVersion']) + ' : ' + everyVersionDetail['note'])
-                else:
-                    root_logger.info('v' + str(everyVersionDetail['propertyVersion']) + ' : ')
+            root_logger.info('No version is active in ' + network.lower())
+
+    root_logger.info('\nVersion Details (Version : Description)')
+    root_logger.info('----------------------------------')
+
+    if args.fromVersion:
+        notes = resolver.notesSince(args.fromVersion)
     else:
-        root_logger.info('Unable to fetch versions of the property')
-        root_logger.info(json.dumps(versionsResponse.json(), indent=4))
-        exit()        
+        notes = [(int(eachItem['propertyVersion']), eachItem.get('note', '')) for eachItem in resolver.items[:10]]
+    for version, note in notes:
+        root_logger.info('v' + str(version) + ' : ' + note)
 
 def listRules(args):
-    access_hostname, session = init_config(args.edgerc, args.section)
+    access_hostname, session = get_session(args)
     papiObject = PapiWrapper(access_hostname, args.account_key)
 
     #Find the property details (IDs)
-    propertyResponse = papiObject.searchProperty(session,propertyName=args.property)
-    if propertyResponse.status_code == 200:
-        try:
-            propertyDetails = propertyResponse.json()['versions']['items'][0]
-        except:
-            root_logger.info('Property details were not found. Double check property name\n')
-            exit()                
-    else:
-       root_logger.info('Property details were not found. Double check property name\n') 
+    propertyDetails = find_property(papiObject, session, args)
 
     #Fetch the latest version if need be
     root_logger.info('Fetching version ' + args.version + ' ...')
     if args.version.upper() == 'latest'.upper():
-        versionResponse = papiObject.getVersion(session, property_name=args.property, activeOn=args.version.upper(), propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
-        version = versionResponse.json()['versions']['items'][0]['propertyVersion']
+        version = lookup_version(papiObject, session, args, propertyDetails, args.version.upper())
         root_logger.info('Latest version is: v' + str(version) + '\n')
     else:
         version = args.version
         #Validate the version number entered using -version
-        versionResponse = papiObject.getVersion(session, property_name=args.property, activeOn='LATEST', propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
-        latestversion = versionResponse.json()['versions']['items'][0]['propertyVersion']
+        latestversion = lookup_version(papiObject, session, args, propertyDetails, 'LATEST')
         if int(args.version) > int(latestversion):
             root_logger.info('Please check the version number. The highest/latest version is: ' + str(latestversion) + '\n')
             exit()
@@ -594,9 +1010,9 @@ def listRules(args):
             root_logger.info('Found version...\n')
 
     root_logger.info('Fetching property rules...\n')
-    propertyContent = papiObject.getPropertyRulesfromPropertyId(session, propertyDetails['propertyId'], version, propertyDetails['contractId'], propertyDetails['groupId'])
-    if propertyContent.status_code == 200:
-        rules = helper.getAllRules([propertyContent.json()['rules']], allruleNames=[])
+    propertyContent = fetch_rules(papiObject, session, args, propertyDetails, version, compact=True)
+    if propertyContent is not None:
+        rules = helper.getAllRules([propertyContent['rules']], allruleNames=[])
         root_logger.info('Rules are:')
         root_logger.info('---------')
         for eachRuleName in rules:
@@ -606,7 +1022,7 @@ def listRules(args):
         exit()
 
 def addBehavior(args):
-    access_hostname, session = init_config(args.edgerc, args.section)
+    access_hostname, session = get_session(args)
     papiObject = PapiWrapper(access_hostname, args.account_key)
 
     if not args.property:
@@ -640,15 +1056,7 @@ def addBehavior(args):
     version = args.version
     
     #Find the property details (IDs)
-    propertyResponse = papiObject.searchProperty(session,propertyName=args.property)
-    if propertyResponse.status_code == 200:
-        try:
-            propertyDetails = propertyResponse.json()['versions']['items'][0]
-        except:
-            root_logger.info('Property details were not found. Double check property name\n')
-            exit()                
-    else:
-       root_logger.info('Property details were not found. Double check property name\n') 
+    propertyDetails = find_property(papiObject, session, args)
 
 
     if args.checkoutNewVersion.upper() == 'YES':
@@ -656,40 +1064,28 @@ def addBehavior(args):
         if args.version.upper() == 'PRODUCTION' or args.version.upper() == 'STAGING' \
         or args.version.upper() == 'LATEST':
             root_logger.info('Fetching and verifying ' + version + ' version...')
-            versionResponse = papiObject.getVersion(session, property_name=args.property, activeOn=version.upper(), propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
-            if versionResponse.status_code == 200:
-                version = versionResponse.json()['versions']['items'][0]['propertyVersion']
-                root_logger.info(args.version + ' version is: v' + str(version) + '\n')
-            else:
-                root_logger.info('Unable to get version details. There is some issue, contact developer')
-                exit()
+            version = lookup_version(papiObject, session, args, propertyDetails, version.upper())
+            root_logger.info(args.version + ' version is: v' + str(version) + '\n')
     elif isinstance(version, int):
         #Validate the version number entered using -version
-        versionResponse = papiObject.getVersion(session, property_name=args.property, activeOn='LATEST', propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
-        if versionResponse.status_code == 200:
-            latestversion = versionResponse.json()['versions']['items'][0]['propertyVersion']
-            if int(version) > int(latestversion):
-                root_logger.info('Please check the version number. The highest/latest version is: ' + str(latestversion) + '\n')
-                exit()
-            else:
-                root_logger.info('Entered version is valid.\n')
-        else:
-            root_logger.info('Unable to get version details. There is some issue, contact developer')
+        latestversion = lookup_version(papiObject, session, args, propertyDetails, 'LATEST')
+        if int(version) > int(latestversion):
+            root_logger.info('Please check the version number. The highest/latest version is: ' + str(latestversion) + '\n')
             exit()
+        else:
+            root_logger.info('Entered version is valid.\n')
 
 
     #Update the version number based on input 
     if args.version.upper() == 'LATEST':
-        versionResponse = papiObject.getVersion(session, property_name=args.property, activeOn='LATEST', propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
-        if versionResponse.status_code == 200:
-            version = versionResponse.json()['versions']['items'][0]['propertyVersion']
+        version = lookup_version(papiObject, session, args, propertyDetails, 'LATEST')
 
     #Let us now move towards rules
     #All rules are saved in samplerules folder, filename is configurable
     root_logger.info('Fetching existing property rules...')
-    propertyContent = papiObject.getPropertyRulesfromPropertyId(session, propertyDetails['propertyId'], version, propertyDetails['contractId'], propertyDetails['groupId'])
-    if propertyContent.status_code == 200:
-        completePropertyJson = propertyContent.json()
+    propertyContent, originalContent = fetch_rules(papiObject, session, args, propertyDetails, version, original=True)
+    if propertyContent is not None:
+        completePropertyJson = propertyContent
         #print(json.dumps(completePropertyJson, indent=4))
         with open(os.path.join(args.fromFile),'r') as rulesFileHandler:
             behavior = json.loads(rulesFileHandler.read())
@@ -710,14 +1106,14 @@ def addBehavior(args):
             versionResponse = papiObject.createVersion(session, baseVersion=version, property_name=args.property, \
                     propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
             if versionResponse.status_code == 201:
+                invalidate_versions(args, propertyDetails)
                 #Extract the version number
                 matchPattern = re.compile('/papi/v0/properties/prp_.*/versions/(.*)(\?.*)')
                 newVersion = matchPattern.match(versionResponse.json()['versionLink']).group(1)
                 root_logger.info('Successfully created new property version: v' + str(newVersion))
                 #Make a call to update the rules
                 root_logger.info('\nNow trying to upload the new ruleset...')
-                uploadRulesResponse = papiObject.uploadRules(session=session, updatedData=json.loads(json.dumps(completePropertyJson)),\
-                 property_name=args.property, version=newVersion, propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
+                uploadRulesResponse = upload_rules(papiObject, session, args, propertyDetails, newVersion, completePropertyJson, originalContent)
                 if uploadRulesResponse.status_code == 200:
                     root_logger.info('\nSuccess! \n')
                 else:
@@ -730,8 +1126,7 @@ def addBehavior(args):
             #No Need to create a new version
             #Make a call to update the rules
             root_logger.info('\nNow trying to upload the new ruleset to version : ' + str(version))
-            uploadRulesResponse = papiObject.uploadRules(session=session, updatedData=json.loads(json.dumps(completePropertyJson)),\
-             property_name=args.property, version=version, propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
+            uploadRulesResponse = upload_rules(papiObject, session, args, propertyDetails, version, completePropertyJson, originalContent)
             if uploadRulesResponse.status_code == 200:
                 root_logger.info('\nSuccess! \n')
             else:
@@ -739,44 +1134,27 @@ def addBehavior(args):
                 exit()
     else:
         root_logger.info('Unable to fetch property rules.')
-        print(json.dumps(propertyContent.json(), indent=4))
         exit()    
 
 def deleteBehavior(args):
     print('\n*****************************')
     print('Processing: ' + args.property)
-    access_hostname, session = init_config(args.edgerc, args.section)
+    access_hostname, session = get_session(args)
     papiObject = PapiWrapper(access_hostname, args.account_key)
 
     #Find the property details (IDs)
-    propertyResponse = papiObject.searchProperty(session,propertyName=args.property)
-    if propertyResponse.status_code == 200:
-        try:
-            propertyDetails = propertyResponse.json()['versions']['items'][0]
-        except:
-            root_logger.info('Property details were not found. Double check property name\n')
-            exit()                
-    else:
-       root_logger.info('Property details were not found. Double check property name\n') 
-       exit()
-
-    #Make a call to update the rules
-    versionResponse = papiObject.getVersion(session, property_name=args.property, activeOn='LATEST', propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
-    #print(json.dumps(versionResponse.json(), indent=4))
-    latestversion = versionResponse.json()['versions']['items'][0]['propertyVersion']
+    propertyDetails = find_property(papiObject, session, args)
 
     #Fetch the latest version if need be
     root_logger.info('Fetching version ' + args.version + ' ...')
     if args.version.upper() == 'PRODUCTION' or args.version.upper() == 'STAGING' \
     or args.version.upper() == 'LATEST':
-        versionResponse = papiObject.getVersion(session, property_name=args.property, activeOn=args.version.upper(), propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
-        version = versionResponse.json()['versions']['items'][0]['propertyVersion']
+        version = lookup_version(papiObject, session, args, propertyDetails, args.version.upper())
         root_logger.info('Latest version is: v' + str(version) + '\n')
     else:
         version = args.version
         #Validate the version number entered using -version
-        versionResponse = papiObject.getVersion(session, property_name=args.property, activeOn='LATEST', propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
-        latestversion = versionResponse.json()['versions']['items'][0]['propertyVersion']
+        latestversion = lookup_version(papiObject, session, args, propertyDetails, 'LATEST')
         if int(args.version) > int(latestversion):
             root_logger.info('Please check the version number. The highest/latest version is: ' + str(latestversion) + '\n')
             exit()
@@ -784,19 +1162,21 @@ def deleteBehavior(args):
             root_logger.info('Found version...\n')
 
     root_logger.info('Fetching property rules...\n')
-    propertyContent = papiObject.getPropertyRulesfromPropertyId(session, propertyDetails['propertyId'], version, propertyDetails['contractId'], propertyDetails['groupId'])
+    propertyContent, originalContent = fetch_rules(papiObject, session, args, propertyDetails, version, original=True)
     
     behavior = {}
     behavior['name'] = args.behaviorName
 
 
-    if propertyContent.status_code == 200:
-        rules = helper.deleteBehavior([propertyContent.json()['rules']], behavior)
+    if propertyContent is not None:
+        rules = helper.deleteBehavior([propertyContent['rules']], behavior)
 
         #Let us now create a version
         root_logger.info('Trying to create a new version of this property based on version ' + str(version))
-        versionResponse = papiObject.createVersion(session, baseVersion=version, property_name=args.property)
+        versionResponse = papiObject.createVersion(session, baseVersion=version, property_name=args.property, \
+                    propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
         if versionResponse.status_code == 201:
+            invalidate_versions(args, propertyDetails)
             #Extract the version number
             matchPattern = re.compile('/papi/v0/properties/prp_.*/versions/(.*)(\?.*)')
             newVersion = matchPattern.match(versionResponse.json()['versionLink']).group(1)
@@ -807,8 +1187,7 @@ def deleteBehavior(args):
             ruleData = {}
             ruleData['rules'] = rules[0]
             ruleData['comments'] = 'Created from v' + str(version) + '. Removing ' + args.behaviorName
-            uploadRulesResponse = papiObject.uploadRules(session=session, updatedData=json.loads(json.dumps(ruleData)),\
-             property_name=args.property, version=newVersion, propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
+            uploadRulesResponse = upload_rules(papiObject, session, args, propertyDetails, newVersion, ruleData, originalContent)
             if uploadRulesResponse.status_code == 200:
                 root_logger.info('\nSuccess!n')
             else:
@@ -816,7 +1195,7 @@ def deleteBehavior(args):
                 exit()
 
 def deleteRule(args):
-    access_hostname, session = init_config(args.edgerc, args.section)
+    access_hostname, session = get_session(args)
     papiObject = PapiWrapper(access_hostname, args.account_key)
 
     if not args.property:
@@ -838,15 +1217,7 @@ def deleteRule(args):
     version = args.version
     
     #Find the property details (IDs)
-    propertyResponse = papiObject.searchProperty(session,propertyName=args.property)
-    if propertyResponse.status_code == 200:
-        try:
-            propertyDetails = propertyResponse.json()['versions']['items'][0]
-        except:
-            root_logger.info('Property details were not found. Double check property name\n')
-            exit()                
-    else:
-       root_logger.info('Property details were not found. Double check property name\n') 
+    propertyDetails = find_property(papiObject, session, args)
 
 
     if args.checkoutNewVersion.upper() == 'YES':
@@ -854,33 +1225,23 @@ def deleteRule(args):
         if args.version.upper() == 'PRODUCTION' or args.version.upper() == 'STAGING' \
         or args.version.upper() == 'LATEST':
             root_logger.info('Fetching and verifying ' + version + ' version...')
-            versionResponse = papiObject.getVersion(session, property_name=args.property, activeOn=version.upper(), propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
-            if versionResponse.status_code == 200:
-                version = versionResponse.json()['versions']['items'][0]['propertyVersion']
-                root_logger.info(args.version + ' version is: v' + str(version) + '\n')
-            else:
-                root_logger.info('Unable to get version details. There is some issue, contact developer')
-                exit()
+            version = lookup_version(papiObject, session, args, propertyDetails, version.upper())
+            root_logger.info(args.version + ' version is: v' + str(version) + '\n')
     else:
         #Validate the version number entered using -version
-        versionResponse = papiObject.getVersion(session, property_name=args.property, activeOn='LATEST', propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
-        if versionResponse.status_code == 200:
-            latestversion = versionResponse.json()['versions']['items'][0]['propertyVersion']
-            if int(version) > int(latestversion):
-                root_logger.info('Please check the version number. The highest/latest version is: ' + str(latestversion) + '\n')
-                exit()
-            else:
-                root_logger.info('Entered version is valid.\n')
-        else:
-            root_logger.info('Unable to get version details. There is some issue, contact developer')
+        latestversion = lookup_version(papiObject, session, args, propertyDetails, 'LATEST')
+        if int(version) > int(latestversion):
+            root_logger.info('Please check the version number. The highest/latest version is: ' + str(latestversion) + '\n')
             exit()
+        else:
+            root_logger.info('Entered version is valid.\n')
 
     #Let us now move towards rules
     #All rules are saved in samplerules folder, filename is configurable
     root_logger.info('Fetching existing property rules...')
-    propertyContent = papiObject.getPropertyRulesfromPropertyId(session, propertyDetails['propertyId'], version, propertyDetails['contractId'], propertyDetails['groupId'])
-    if propertyContent.status_code == 200:
-        completePropertyJson = propertyContent.json()
+    propertyContent, originalContent = fetch_rules(papiObject, session, args, propertyDetails, version, original=True)
+    if propertyContent is not None:
+        completePropertyJson = propertyContent
 
         root_logger.info('Trying to delete the rule: ' + str(args.ruleName))
         updatedCompleteRuleSet = helper.deleteRules([completePropertyJson['rules']], args.ruleName)
@@ -892,16 +1253,17 @@ def deleteRule(args):
         if args.checkoutNewVersion.upper() == 'YES':
             #Let us now create a version
             root_logger.info('Trying to create a new version of this property based on version ' + str(version))
-            versionResponse = papiObject.createVersion(session, baseVersion=version, property_name=args.property)
+            versionResponse = papiObject.createVersion(session, baseVersion=version, property_name=args.property, \
+                    propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
             if versionResponse.status_code == 201:
+                invalidate_versions(args, propertyDetails)
                 #Extract the version number
                 matchPattern = re.compile('/papi/v0/properties/prp_.*/versions/(.*)(\?.*)')
                 newVersion = matchPattern.match(versionResponse.json()['versionLink']).group(1)
                 root_logger.info('Successfully created new property version: v' + str(newVersion))
                 #Make a call to update the rules
                 root_logger.info('\nNow trying to upload the new ruleset...')
-                uploadRulesResponse = papiObject.uploadRules(session=session, updatedData=json.loads(json.dumps(completePropertyJson)),\
-                 property_name=args.property, version=newVersion, propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
+                uploadRulesResponse = upload_rules(papiObject, session, args, propertyDetails, newVersion, completePropertyJson, originalContent)
                 if uploadRulesResponse.status_code == 200:
                     root_logger.info('\nSuccess! \n')
                 else:
@@ -914,8 +1276,7 @@ def deleteRule(args):
             #No Need to create a new version
             #Make a call to update the rules
             root_logger.info('\nNow trying to upload the new ruleset to version : ' + str(version))
-            uploadRulesResponse = papiObject.uploadRules(session=session, updatedData=json.loads(json.dumps(completePropertyJson)),\
-             property_name=args.property, version=version, propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
+            uploadRulesResponse = upload_rules(papiObject, session, args, propertyDetails, version, completePropertyJson, originalContent)
             if uploadRulesResponse.status_code == 200:
                 root_logger.info('\nSuccess! \n')
             else:
@@ -923,9 +1284,522 @@ def deleteRule(args):
                 exit()
     else:
         root_logger.info('Unable to fetch property rules.')
-        print(json.dumps(propertyContent.json(), indent=4))
         exit()    
 
+def find_single_rule(ruleTree, ruleName):
+    """
+    Returns the only rule named ruleName, exits when there is none or more than one
+    """
+    matchingRules = ruleTree.find(ruleName)
+    if len(matchingRules) == 0:
+        root_logger.info('\nUnable to find rule: "' + str(ruleName) + '" in this property.')
+        exit()
+    if len(matchingRules) > 1:
+        root_logger.info('\nError: Found ' + str(len(matchingRules)) + ' occurrences of the rule: "' + ruleName + '"' + '. Please check configuration. Exiting...')
+        exit()
+    return matchingRules[0]
+
+
+def read_json_file(filename):
+    try:
+        with open(filename, 'r') as jsonFileHandler:
+            return json.loads(jsonFileHandler.read())
+    except FileNotFoundError:
+        root_logger.info('\nEntered filename does not exist: ' + str(filename))
+        exit()
+
+
+def apply_operation(ruleTree, completePropertyJson, operation):
+    """
+    Applies one changeset operation to the in-memory rule tree and returns the
+    note describing it. Exits when the operation can not be applied.
+    """
+    name = operation.get('operation')
+    ruleName = operation.get('ruleName')
+    if name == 'addRule':
+        newRule = read_json_file(operation.get('fromFile'))
+        if operation.get('insertLast'):
+            ruleTree.append(ruleTree.rules, newRule)
+            return 'Added rule ' + newRule['name'] + ' at the end'
+        referenceRule = find_single_rule(ruleTree, ruleName)
+        if operation.get('insertBefore'):
+            ruleTree.insertBefore(referenceRule, newRule)
+            return 'Added rule ' + newRule['name'] + ' before ' + ruleName + ' rule'
+        if operation.get('insertAfter'):
+            ruleTree.insertAfter(referenceRule, newRule)
+            return 'Added rule ' + newRule['name'] + ' after ' + ruleName + ' rule'
+        root_logger.info('\naddRule operations need one of insertAfter, insertBefore or insertLast')
+        exit()
+    elif name == 'replaceRule':
+        newRule = read_json_file(operation.get('fromFile'))
+        ruleTree.replace(find_single_rule(ruleTree, ruleName), newRule)
+        return 'Replaced existing rule "' + ruleName + '" with rule from: ' + operation.get('fromFile')
+    elif name == 'deleteRule':
+        ruleTree.delete(find_single_rule(ruleTree, ruleName))
+        return 'Deleted rule ' + ruleName
+    elif name == 'addBehavior':
+        behavior = read_json_file(operation.get('fromFile'))
+        ruleTree.addBehavior(find_single_rule(ruleTree, ruleName), behavior)
+        return 'Added behavior ' + behavior['name'] + ' to ' + ruleName + ' rule'
+    elif name == 'deleteBehavior':
+        behaviorName = operation.get('behaviorName')
+        if ruleName:
+            count = ruleTree.deleteBehavior(behaviorName, find_single_rule(ruleTree, ruleName))
+        else:
+            count = ruleTree.deleteBehavior(behaviorName)
+        if count == 0:
+            root_logger.info('\nUnable to find behavior: "' + str(behaviorName) + '" in this property.')
+            exit()
+        return 'Removed ' + behaviorName
+    elif name == 'addVariables':
+        newVariables = read_json_file(operation.get('variableFile'))
+        helper.addVariables(completePropertyJson['rules'].setdefault('variables', []), newVariables)
+        return 'Added variables from ' + operation.get('variableFile')
+    root_logger.info('\nUnknown operation in changeset: ' + str(name))
+    exit()
+
+
+def create_version(papiObject, session, args, propertyDetails, version):
+    """
+    Creates a new version from version and returns its number, exits on failure
+    """
+    root_logger.info('Trying to create a new version of this property based on version ' + str(version))
+    versionResponse = papiObject.createVersion(session, baseVersion=version, property_name=args.property, \
+            propertyId=propertyDetails['propertyId'], contractId=propertyDetails['contractId'], groupId=propertyDetails['groupId'])
+    if versionResponse.status_code != 201:
+        root_logger.info('Unable to create a new version.')
+        exit()
+    invalidate_versions(args, propertyDetails)
+    matchPattern = re.compile('/papi/v0/properties/prp_.*/versions/(.*)(\?.*)')
+    newVersion = matchPattern.match(versionResponse.json()['versionLink']).group(1)
+    root_logger.info('Successfully created new property version: v' + str(newVersion))
+    return newVersion
+
+
+def applyChanges(args):
+    root_logger.info('Processing: ' + args.property)
+    access_hostname, session = get_session(args)
+    papiObject = PapiWrapper(access_hostname, args.account_key)
+
+    operations = getattr(args, 'operations', None)
+    if operations is None and args.changeset:
+        operations = load_document(args.changeset)
+    if not operations:
+        root_logger.info('\nNo operations found in changeset.')
+        exit()
+
+    #Find the property details (IDs)
+    propertyDetails = find_property(papiObject, session, args)
+
+    version = args.version
+    if version.upper() in ('LATEST', 'STAGING', 'PRODUCTION'):
+        version = lookup_version(papiObject, session, args, propertyDetails, version.upper())
+        root_logger.info(args.version + ' version is: v' + str(version) + '\n')
+    else:
+        latestversion = lookup_version(papiObject, session, args, propertyDetails, 'LATEST')
+        if int(version) > int(latestversion):
+            root_logger.info('Please check the version number. The highest/latest version is: ' + str(latestversion) + '\n')
+            exit()
+
+    #One fetch, all operations applied in memory, then one version and one upload
+    root_logger.info('Fetching existing property rules...')
+    completePropertyJson, originalPropertyJson = fetch_rules(papiObject, session, args, propertyDetails, version, original=True)
+    if completePropertyJson is None:
+        exit()
+    ruleTree = RuleTree(completePropertyJson['rules'])
+    notes = []
+    for everyOperation in operations:
+        note = apply_operation(ruleTree, completePropertyJson, everyOperation)
+        root_logger.info(note)
+        notes.append(note)
+    completePropertyJson['rules'] = ruleTree.rules
+
+    if args.comment:
+        finalComment = args.comment
+    else:
+        finalComment = 'Created from v' + str(version) + ': ' + '; '.join(notes)
+    completePropertyJson['comments'] = finalComment
+
+    if args.checkoutNewVersion.upper() == 'YES':
+        version = create_version(papiObject, session, args, propertyDetails, version)
+    root_logger.info('\nNow trying to upload the new ruleset to version : ' + str(version))
+    uploadRulesResponse = upload_rules(papiObject, session, args, propertyDetails, version, completePropertyJson, originalPropertyJson)
+    if uploadRulesResponse.status_code == 200:
+        root_logger.info('\nSuccess! Comments: "' + finalComment + '"\n')
+    else:
+        root_logger.info('Unable to update rules in property. Reason is: \n\n' + json.dumps(uploadRulesResponse.json(), indent=4))
+        exit()
+
+
+BATCH_OPERATIONS = ['addRule', 'replaceRule', 'deleteRule', 'addBehavior', 'deleteBehavior', 'applyChanges']
+#Manifest keys handed to the commands as-is and the ones used as on/off flags
+BATCH_ARGUMENTS = ['property', 'version', 'fromVersion', 'fromFile', 'ruleName', 'comment',
+                   'checkoutNewVersion', 'behaviorName', 'variableFile', 'changeset']
+BATCH_FLAGS = ['insertAfter', 'insertBefore', 'insertLast', 'addVariables']
+
+
+class BatchMessageHandler(logging.Handler):
+    """
+    Remembers the last message logged by each worker thread, so that the
+    batch summary can say why a property failed.
+    """
+    def __init__(self):
+        logging.Handler.__init__(self, level=logging.INFO)
+        self.lastMessage = {}
+
+    def emit(self, record):
+        message = record.getMessage().strip()
+        if message:
+            self.lastMessage[threading.get_ident()] = message.splitlines()[-1]
+
+
+def load_document(filename):
+    """
+    Reads a JSON file, or a YAML file when PyYAML is installed
+    """
+    with open(filename, 'r') as documentFileHandler:
+        content = documentFileHandler.read()
+    if filename.lower().endswith('.json'):
+        return json.loads(content)
+    elif yaml is not None:
+        return yaml.safe_load(content)
+    else:
+        root_logger.info('PyYAML is needed to read ' + filename + ', install it using: pip3 install pyyaml')
+        exit(1)
+
+
+def load_manifest(manifest_file):
+    """
+    Reads a batch manifest. It is either a list of entries or a mapping with
+    the entries under 'properties' and optional 'defaults' applied to each.
+    """
+    manifest = load_document(manifest_file)
+
+    defaults = {}
+    if isinstance(manifest, dict):
+        defaults = manifest.get('defaults', {})
+        manifest = manifest.get('properties', [])
+
+    entries = []
+    for eachEntry in manifest:
+        entry = dict(defaults)
+        entry.update(eachEntry)
+        entries.append(entry)
+    return entries
+
+
+def batch_args(args, entry, access_hostname, session, versionResolvers=None):
+    """
+    Builds the argparse namespace a single command expects from a manifest entry
+    """
+    batchArgs = argparse.Namespace(command=entry.get('operation'), edgerc=args.edgerc,
+                                   section=args.section, debug=args.debug, max_retries=args.max_retries, no_cache=args.no_cache,
+                                   account_key=entry.get('account-key', args.account_key),
+                                   access_hostname=access_hostname, session=session,
+                                   version_resolvers=versionResolvers)
+    for name in BATCH_ARGUMENTS:
+        value = entry.get(name)
+        #YAML reads YES/NO as booleans and versions as numbers, commands expect text
+        if isinstance(value, bool):
+            value = 'YES' if value else 'NO'
+        elif value is not None:
+            value = str(value)
+        setattr(batchArgs, name, value)
+    for name in BATCH_FLAGS:
+        setattr(batchArgs, name, bool(entry.get(name, False)))
+    #applyChanges entries may list their operations inline instead of in a changeset file
+    batchArgs.operations = entry.get('operations')
+    #replaceRule is documented with fromVersion, the commands read version
+    if batchArgs.version is None:
+        batchArgs.version = batchArgs.fromVersion
+    if batchArgs.fromVersion is None:
+        batchArgs.fromVersion = batchArgs.version
+    return batchArgs
+
+
+def run_batch_entry(batchArgs, messageHandler):
+    """
+    Runs one manifest entry and returns its (status, message)
+    """
+    messageHandler.lastMessage.pop(threading.get_ident(), None)
+    if batchArgs.command not in BATCH_OPERATIONS:
+        return 'FAILED', 'Unknown operation: ' + str(batchArgs.command)
+    if not batchArgs.property:
+        return 'FAILED', 'No property name in manifest entry'
+    try:
+        getattr(sys.modules[__name__], batchArgs.command)(batchArgs)
+        status = 'SUCCESS'
+    except SystemExit:
+        #Commands log the reason and exit() on every error
+        status = 'FAILED'
+    except Exception as e:
+        root_logger.debug('Batch entry failed', exc_info=True)
+        return 'FAILED', repr(e)
+    return status, messageHandler.lastMessage.get(threading.get_ident(), '')
+
+
+def run_batch_entries(batchArgsList, messageHandler):
+    """
+    Runs the manifest entries of one property in order and returns their (status, message)
+    """
+    return [run_batch_entry(eachArgs, messageHandler) for eachArgs in batchArgsList]
+
+
+def batch(args):
+    entries = load_manifest(args.manifest)
+    if len(entries) == 0:
+        root_logger.info('No entries found in manifest: ' + args.manifest)
+        return 0
+    workers = max(1, args.workers)
+
+    #One authenticated session for all workers, its pool sized to the workers
+    access_hostname, session = init_config(args.edgerc, args.section, pool_size=workers,
+                                           max_retries=args.max_retries)
+
+    #Version lists are fetched once per property for the whole run
+    versionResolvers = {}
+    messageHandler = BatchMessageHandler()
+    root_logger.addHandler(messageHandler)
+    root_logger.info('Processing ' + str(len(entries)) + ' entries with ' + str(workers) + ' workers\n')
+    try:
+        #Entries of one property run in manifest order on one worker, each edits the version the previous one left
+        groups = {}
+        for position, eachEntry in enumerate(entries):
+            key = (eachEntry.get('account-key', args.account_key), eachEntry.get('property'))
+            groups.setdefault(key, []).append(position)
+        results = [None] * len(entries)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [(positions, executor.submit(run_batch_entries, [batch_args(args, entries[position], access_hostname, session, versionResolvers)
+                                                                       for position in positions], messageHandler))
+                       for positions in groups.values()]
+            for positions, future in futures:
+                for position, result in zip(positions, future.result()):
+                    results[position] = result
+    finally:
+        root_logger.removeHandler(messageHandler)
+
+    root_logger.info('\nBatch Results')
+    root_logger.info('----------------------------------')
+    failures = 0
+    for eachEntry, (status, message) in zip(entries, results):
+        if status != 'SUCCESS':
+            failures += 1
+        root_logger.info('%-40s %-15s %-8s %s' % (eachEntry.get('property'), eachEntry.get('operation'), status, message))
+    root_logger.info('\n' + str(len(entries) - failures) + ' of ' + str(len(entries)) + ' entries succeeded')
+    return 1 if failures else 0
+
+def diff(args):
+    access_hostname, session = get_session(args)
+    papiObject = PapiWrapper(access_hostname, args.account_key)
+
+    #Find the property details (IDs)
+    propertyDetails = find_property(papiObject, session, args)
+    resolver = get_version_resolver(papiObject, session, args, propertyDetails)
+    versions = []
+    for eachVersion in (args.fromVersion, args.toVersion):
+        version = resolver.resolve(eachVersion)
+        if version is None:
+            root_logger.info('Unable to find version ' + eachVersion)
+            return 1
+        versions.append(version)
+
+    #Both trees are fetched at once, activated versions come from the rule tree cache
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(fetch_rules, papiObject, session, args, propertyDetails, version) for version in versions]
+        rulesJsons = [future.result() for future in futures]
+    if rulesJsons[0] is None or rulesJsons[1] is None:
+        return 1
+
+    changes = rulediff.diffRules(rulesJsons[0]['rules'], rulesJsons[1]['rules'])
+    root_logger.info('Changes from v' + str(versions[0]) + ' to v' + str(versions[1]) + ' of ' + args.property + ':\n')
+    for eachLine in rulediff.formatChanges(changes):
+        root_logger.info(eachLine)
+    if not changes:
+        root_logger.info('No changes')
+    return 0
+
+
+#Inventory field holding the version searched for each --version of search
+SEARCH_VERSIONS = {'LATEST': 'latestVersion', 'STAGING': 'stagingVersion', 'PRODUCTION': 'productionVersion'}
+
+
+def search_property(papiObject, session, args, propertyItem, query):
+    """
+    Returns the paths of the matching rules of one property, or None when its
+    rules can not be fetched. Trees are looked up in the rule index, a tree
+    is only read and indexed the first time it is seen.
+    """
+    version = propertyItem.get(SEARCH_VERSIONS[args.version.upper()])
+    if not version:
+        return []
+    propertyId = propertyItem['propertyId']
+    if args.no_cache:
+        rulesJson = fetch_rules(papiObject, session, args, propertyItem, version, compact=True)
+        if rulesJson is None:
+            return None
+        matches = rulequery.compileQuery(args.query)
+        return [' --> '.join(path) for path, _ in rulequery.searchRules(rulesJson['rules'], matches)]
+
+    index = get_rule_index(args)
+    if args.indexOnly:
+        treeHash = index.versionTree(propertyId, version)
+        if treeHash is None:
+            root_logger.info(propertyItem['propertyName'] + ' v' + str(version) + ' is not indexed yet')
+            return None
+        return index.search(query, treeHash)
+
+    #Activated versions never change, their indexed trees are used without a call
+    locked = version in (propertyItem.get('stagingVersion'), propertyItem.get('productionVersion'))
+    entry = get_rule_cache(args).lookup(propertyId, version)
+    if locked and entry is not None and entry['locked'] and index.hasTree(entry['hash']):
+        treeHash = entry['hash']
+    else:
+        content, _ = fetch_rules_content(papiObject, session, args, propertyItem, version, locked=locked)
+        if content is None:
+            return None
+        treeHash = RuleTreeCache.contentHash(content)
+        index.addTree(treeHash, content)
+    index.setVersion(propertyId, version, propertyItem['propertyName'], treeHash)
+    return index.search(query, treeHash)
+
+
+def search(args):
+    if args.version.upper() not in SEARCH_VERSIONS:
+        root_logger.info('Version must be LATEST, STAGING or PRODUCTION')
+        return 1
+    try:
+        query = rulequery.parseQuery(args.query)
+    except ValueError as e:
+        root_logger.info(str(e))
+        return 1
+    if not get_inventory(args).isPopulated(args.account_key):
+        root_logger.info('No inventory found, run python3 papi.py -setup first')
+        return 1
+    properties = get_inventory(args).listProperties()
+    workers = max(1, args.workers)
+    access_hostname, session = init_config(args.edgerc, args.section, pool_size=workers,
+                                           max_retries=args.max_retries)
+    papiObject = PapiWrapper(access_hostname, args.account_key)
+
+    root_logger.info('Searching ' + str(len(properties)) + ' properties with ' + str(workers) + ' workers\n')
+    hits = 0
+    matchingProperties = 0
+    failures = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(search_property, papiObject, session, args, eachProperty, query): eachProperty
+                   for eachProperty in properties}
+        #Hits are printed as soon as a property is searched
+        for future in as_completed(futures):
+            propertyItem = futures[future]
+            try:
+                paths = future.result()
+            except Exception as e:
+                root_logger.debug('Search of ' + propertyItem['propertyName'] + ' failed', exc_info=True)
+                root_logger.info('Unable to search ' + propertyItem['propertyName'] + ': ' + repr(e))
+                paths = None
+            if paths is None:
+                failures.append(propertyItem['propertyName'])
+                continue
+            if paths:
+                matchingProperties += 1
+                hits += len(paths)
+            version = propertyItem.get(SEARCH_VERSIONS[args.version.upper()])
+            for eachPath in paths:
+                root_logger.info(propertyItem['propertyName'] + ' v' + str(version) + ': ' + eachPath)
+
+    if not args.no_cache and not args.indexOnly:
+        #Forget the trees the rule tree cache has evicted
+        get_rule_index(args).prune(get_rule_cache(args).contentHashes())
+    root_logger.info('\n' + str(hits) + ' matching rules in ' + str(matchingProperties) + ' of ' + str(len(properties)) + ' properties')
+    if failures:
+        root_logger.info('Unable to search ' + str(len(failures)) + ' properties: ' + ', '.join(sorted(failures)))
+        return 1
+    return 0
+
+
+#Network names accepted in activate manifests, as papi.py -activate accepts them
+ACTIVATION_NETWORKS = {'STAGING': 'STAGING', 'PROD': 'PRODUCTION', 'PRODUCTION': 'PRODUCTION'}
+
+
+def prepare_activation(args, entry, access_hostname, session, versionResolvers, messageHandler):
+    """
+    Finds the property and version of an activate manifest entry. Returns the
+    activation for the scheduler, FAILED when they can not be found.
+    """
+    messageHandler.lastMessage.pop(threading.get_ident(), None)
+    entryArgs = batch_args(args, entry, access_hostname, session, versionResolvers)
+    emails = entry.get('email', args.email) or ''
+    if not isinstance(emails, list):
+        emails = emails.split(',')
+    activation = {'property': entryArgs.property, 'version': entryArgs.version, 'status': 'NEW', 'message': '',
+                  'network': ACTIVATION_NETWORKS.get(str(entry.get('network', args.network)).upper()),
+                  'emails': [eachEmail.strip() for eachEmail in emails if eachEmail.strip()],
+                  'notes': str(entry.get('notes', args.notes) or '')}
+    if not entryArgs.property or not entryArgs.version:
+        activation.update(status='FAILED', message='No property name or version in manifest entry')
+    elif activation['network'] is None:
+        activation.update(status='FAILED', message='Network must be STAGING or PRODUCTION')
+    elif len(activation['emails']) == 0:
+        activation.update(status='FAILED', message='No notification email')
+    if activation['status'] == 'FAILED':
+        return activation
+
+    try:
+        papiObject = PapiWrapper(access_hostname, entryArgs.account_key)
+        propertyDetails = find_property(papiObject, session, entryArgs)
+        if entryArgs.version.upper() in ('LATEST', 'STAGING', 'PRODUCTION'):
+            version = lookup_version(papiObject, session, entryArgs, propertyDetails, entryArgs.version.upper())
+        else:
+            version = int(entryArgs.version)
+            if not get_version_resolver(papiObject, session, entryArgs, propertyDetails).exists(version):
+                root_logger.info('Version ' + str(version) + ' does not exist')
+                exit()
+    except SystemExit:
+        activation.update(status='FAILED', message=messageHandler.lastMessage.get(threading.get_ident(), ''))
+        return activation
+    except ValueError:
+        activation.update(status='FAILED', message='Invalid version: ' + entryArgs.version)
+        return activation
+    activation.update(papiObject=papiObject, propertyDetails=propertyDetails, version=version)
+    return activation
+
+
+def activate(args):
+    entries = load_manifest(args.manifest)
+    if len(entries) == 0:
+        root_logger.info('No entries found in manifest: ' + args.manifest)
+        return 0
+    workers = max(1, args.workers)
+    access_hostname, session = init_config(args.edgerc, args.section, pool_size=workers,
+                                           max_retries=args.max_retries)
+
+    versionResolvers = {}
+    messageHandler = BatchMessageHandler()
+    root_logger.addHandler(messageHandler)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            activations = list(executor.map(lambda eachEntry: prepare_activation(args, eachEntry, access_hostname, session,
+                                                                                 versionResolvers, messageHandler), entries))
+    finally:
+        root_logger.removeHandler(messageHandler)
+
+    pending = [eachActivation for eachActivation in activations if eachActivation['status'] == 'NEW']
+    root_logger.info('\nActivating ' + str(len(pending)) + ' property versions with ' + str(workers) + ' workers\n')
+    ActivationScheduler(session, workers=workers, pollInterval=args.pollInterval,
+                        timeout=args.timeout).run(pending)
+
+    root_logger.info('\nActivation Results')
+    root_logger.info('----------------------------------')
+    failures = 0
+    for eachActivation in activations:
+        if eachActivation['status'] != 'ACTIVE':
+            failures += 1
+        elapsed = '%dm%02ds' % divmod(int(eachActivation.get('elapsed', 0)), 60)
+        root_logger.info('%-40s v%-5s %-10s %-10s %-8s %s' % (eachActivation['property'], eachActivation['version'], eachActivation['network'] or '-',
+                                                             eachActivation['status'], elapsed, eachActivation['message']))
+    root_logger.info('\n' + str(len(activations) - failures) + ' of ' + str(len(activations)) + ' activations completed')
+    return 1 if failures else 0
+
 def get_prog_name():
     prog = os.path.basename(sys.argv[0])
     if os.getenv("AKAMAI_CLI"):
@@ -939,6 +1813,13 @@ def get_cache_dir():
 
     return os.curdir
 
+
+def get_inventory_file():
+    if os.getenv("RULEUPDATER_INVENTORY"):
+        return os.getenv("RULEUPDATER_INVENTORY")
+
+    return INVENTORY_FILE
+
 # Final or common Successful exit
 if __name__ == '__main__':
     try:
@@ -0,0 +1,91 @@
+"""
+Copyright 2021 Akamai Technologies, Inc. All Rights Reserved.
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+
+
+__all__=['VersionResolver']
+
+NETWORKS = ['STAGING', 'PRODUCTION']
+
+
+class VersionResolver(object):
+    """
+    Answers the version questions of a command (LATEST, STAGING, PRODUCTION,
+    does version N exist, is it activated, notes since vN) from one
+    listVersions response of a property, instead of a getVersion call each.
+    """
+
+    def __init__(self, versionsJson):
+        self.items = versionsJson['versions']['items']
+        self.byVersion = {}
+        self.active = {}
+        for eachItem in self.items:
+            version = int(eachItem['propertyVersion'])
+            self.byVersion[version] = eachItem
+            for network in NETWORKS:
+                if eachItem.get(network.lower() + 'Status') == 'ACTIVE':
+                    self.active[network] = version
+        self.latest = max(self.byVersion) if self.byVersion else None
+
+    def resolve(self, version):
+        """
+        Function to turn a version argument into a version number
+
+        Parameters
+        ----------
+        version : <string> or <int>
+            LATEST, STAGING, PRODUCTION (any case) or a version number
+
+        Returns
+        -------
+        version : <int> or None when there is no such version (or nothing is active on the network)
+        """
+        alias = str(version).upper()
+        if alias == 'LATEST':
+            return self.latest
+        if alias in NETWORKS:
+            return self.active.get(alias)
+        try:
+            version = int(version)
+        except ValueError:
+            return None
+        return version if version in self.byVersion else None
+
+    def exists(self, version):
+        return self.resolve(version) is not None
+
+    def activeVersion(self, network):
+        return self.active.get(network.upper())
+
+    def item(self, version):
+        return self.byVersion.get(int(version))
+
+    def isLocked(self, version):
+        """
+        Function to check whether a version was ever activated, its rules can then no longer change
+        """
+        item = self.item(version)
+        if item is None:
+            return False
+        return any(item.get(network.lower() + 'Status', 'INACTIVE') != 'INACTIVE' for network in NETWORKS)
+
+    def notesSince(self, version):
+        """
+        Function to list the notes of version and all later versions
+
+        Returns
+        -------
+        notes : <List> of (version, note) in the order of the listVersions response (newest first)
+        """
+        return [(int(eachItem['propertyVersion']), eachItem.get('note', '')) for eachItem in self.items
+                if int(eachItem['propertyVersion']) >= int(version)]
@@ -0,0 +1,206 @@
+"""
+Copyright 2021 Akamai Technologies, Inc. All Rights Reserved.
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+
+"""
+End-to-end benchmark of RuleUpdater commands against the local mock PAPI
+(benchmarks/mockpapi.py). Each command runs as its own process, as it would
+from the shell, in a scratch directory with its own .edgerc and cache. Every
+command of the scenario is run on every property, then one batch run edits
+all properties at once. Reported are p50/p99 latency per command, and the
+requests, requests/sec, bytes transferred and statuses seen by the server.
+python3 benchmarks/endtoend.py --properties 20 --latency 0.05 --output endtoend.json
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mockpapi import MockPapi, startServer
+
+
+RULEUPDATER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'RuleUpdater.py')
+
+EDGERC = """[papi]
+client_secret = mock-secret
+host = {host}
+access_token = akab-mock-access-token
+client_token = akab-mock-client-token
+"""
+
+BEHAVIOR = {'name': 'allowPost', 'options': {'enabled': True, 'allowWithoutContentLength': False}}
+RULE = {'name': 'Benchmark rule', 'children': [], 'behaviors': [{'name': 'gzipResponse', 'options': {'behavior': 'ALWAYS'}}],
+        'criteria': [], 'criteriaMustSatisfy': 'all', 'options': {}}
+
+#Commands run on every property, in this order, {property} is filled in
+SCENARIO = [
+    ('getDetail', ['getDetail', '--property', '{property}']),
+    ('listRules', ['listRules', '--property', '{property}', '--version', 'LATEST']),
+    ('downloadRule', ['downloadRule', '--property', '{property}', '--version', 'LATEST', '--ruleName', 'Rule 1.1']),
+    ('addBehavior', ['addBehavior', '--property', '{property}', '--version', 'LATEST', '--fromFile', 'samplerules/behavior.json',
+                     '--ruleName', 'Rule 1.2', '--comment', 'Benchmark', '--checkoutNewVersion', 'YES']),
+    ('addRule', ['addRule', '--property', '{property}', '--version', 'LATEST', '--fromFile', 'samplerules/rule.json',
+                 '--insertAfter', '--ruleName', 'Rule 1.3', '--comment', 'Benchmark', '--checkoutNewVersion', 'YES']),
+    ('diff', ['diff', '--property', '{property}', '--fromVersion', '1', '--toVersion', 'LATEST']),
+]
+
+
+def percentile(values, share):
+    """
+    Function to take a nearest-rank percentile, share between 0 and 1
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    #The rank is ceil(share * n), rounded first so that e.g. 0.07 * 100 is not taken as 7.000000000000001
+    rank = int(math.ceil(round(share * len(values), 9)))
+    return values[min(len(values) - 1, max(0, rank - 1))]
+
+
+def runCommand(workDir, argv, extraArgs, environment):
+    """
+    Function to run one RuleUpdater command
+
+    Returns
+    -------
+    (seconds, returncode, output)
+    """
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, RULEUPDATER] + argv + extraArgs, cwd=workDir, env=environment,
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    return time.perf_counter() - start, process.returncode, process.stdout.decode('utf-8', 'replace')
+
+
+def prepareWorkDir(workDir, host):
+    with open(os.path.join(workDir, '.edgerc'), 'w') as edgercHandler:
+        edgercHandler.write(EDGERC.format(host=host))
+    os.makedirs(os.path.join(workDir, 'samplerules'), exist_ok=True)
+    with open(os.path.join(workDir, 'samplerules', 'behavior.json'), 'w') as behaviorHandler:
+        json.dump(BEHAVIOR, behaviorHandler)
+    with open(os.path.join(workDir, 'samplerules', 'rule.json'), 'w') as ruleHandler:
+        json.dump(RULE, ruleHandler)
+
+
+def summarize(latencies):
+    return {
+        'runs': len(latencies),
+        'p50Seconds': percentile(latencies, 0.50),
+        'p99Seconds': percentile(latencies, 0.99),
+        'maxSeconds': max(latencies) if latencies else None,
+        'totalSeconds': sum(latencies)
+    }
+
+
+def serverReport(stats):
+    elapsed = max(stats['elapsed'], 1e-9)
+    report = dict(stats)
+    report['requestsPerSecond'] = stats['requests'] / elapsed
+    return report
+
+
+def printStage(name, commandStats, stats):
+    print('\n' + name)
+    print('%-14s %6s %9s %9s %9s' % ('command', 'runs', 'p50 ms', 'p99 ms', 'max ms'))
+    for eachCommand, eachSummary in commandStats.items():
+        print('%-14s %6d %9.1f %9.1f %9.1f' % (eachCommand, eachSummary['runs'], eachSummary['p50Seconds'] * 1000,
+                                              eachSummary['p99Seconds'] * 1000, eachSummary['maxSeconds'] * 1000))
+    print('server: %d requests in %.1fs (%.1f/s), %d KiB in, %d KiB out, statuses %s' % (
+        stats['requests'], stats['elapsed'], stats['requestsPerSecond'], stats['bytesIn'] // 1024, stats['bytesOut'] // 1024,
+        ', '.join(status + ': ' + str(count) for status, count in stats['statuses'].items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark RuleUpdater commands end to end against a local mock PAPI')
+    parser.add_argument('--properties', type=int, default=10)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--fanout', type=int, default=5)
+    parser.add_argument('--behaviors', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.02, help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--rateLimit', type=float, default=0, help='Requests per second of the mock, 0 for no limit')
+    parser.add_argument('--throttleRate', type=float, default=0.0, help='Share of requests answered with 429')
+    parser.add_argument('--errorRate', type=float, default=0.0, help='Share of requests answered with a 5xx status')
+    parser.add_argument('--workers', type=int, default=8, help='Workers of the batch run')
+    parser.add_argument('--no-cache', action='store_true', help='Run the commands with --no-cache')
+    parser.add_argument('--keep', action='store_true', help='Keep the scratch directory (logs, cache)')
+    parser.add_argument('--output', default='endtoend-benchmark.json', help='Results file')
+    args = parser.parse_args()
+
+    papi = MockPapi(args.properties, args.depth, args.fanout, args.behaviors, args.latency, args.jitter, args.rateLimit,
+                    args.throttleRate, args.errorRate)
+    server = startServer(papi)
+    workDir = tempfile.mkdtemp(prefix='ruleupdater-e2e-')
+    prepareWorkDir(workDir, server.url)
+    environment = dict(os.environ, AKAMAI_EDGERC=os.path.join(workDir, '.edgerc'), AKAMAI_CLI_CACHE_DIR=os.path.join(workDir, 'cache'))
+    extraArgs = ['--edgerc', os.path.join(workDir, '.edgerc')] + (['--no-cache'] if args.no_cache else [])
+    print('Mock PAPI on ' + server.url + ' with ' + str(args.properties) + ' properties, scratch directory ' + workDir)
+
+    results = {'settings': vars(args), 'stages': {}}
+    failures = []
+    try:
+        #Commands one at a time, as a user would run them
+        papi.resetStats()
+        latencies = {eachName: [] for eachName, _ in SCENARIO}
+        for eachProperty in papi.propertyNames():
+            for eachName, eachArgv in SCENARIO:
+                argv = [eachPart.format(property=eachProperty) for eachPart in eachArgv]
+                seconds, returncode, output = runCommand(workDir, argv, extraArgs, environment)
+                latencies[eachName].append(seconds)
+                if returncode != 0:
+                    failures.append((eachName, eachProperty, output.strip().splitlines()[-1:]))
+        commandStats = {eachName: summarize(eachLatencies) for eachName, eachLatencies in latencies.items()}
+        commandStats['all'] = summarize([eachLatency for eachLatencies in latencies.values() for eachLatency in eachLatencies])
+        stats = serverReport(papi.statsSnapshot())
+        results['stages']['commands'] = {'commands': commandStats, 'server': stats}
+        printStage('Commands, one process each', commandStats, stats)
+
+        #One batch run over all properties
+        manifest = {'defaults': {'version': 'LATEST', 'checkoutNewVersion': 'YES', 'comment': 'Benchmark batch'},
+                    'properties': [{'property': eachProperty, 'operation': 'addBehavior', 'fromFile': 'samplerules/behavior.json',
+                                    'ruleName': 'Rule 1.4'} for eachProperty in papi.propertyNames()]}
+        with open(os.path.join(workDir, 'manifest.json'), 'w') as manifestHandler:
+            json.dump(manifest, manifestHandler)
+        papi.resetStats()
+        seconds, returncode, output = runCommand(workDir, ['batch', '--manifest', 'manifest.json', '--workers', str(args.workers)],
+                                                 extraArgs, environment)
+        if returncode != 0:
+            failures.append(('batch', '', output.strip().splitlines()[-1:]))
+        commandStats = {'batch': summarize([seconds])}
+        stats = serverReport(papi.statsSnapshot())
+        stats['propertiesPerSecond'] = args.properties / max(seconds, 1e-9)
+        results['stages']['batch'] = {'commands': commandStats, 'server': stats}
+        printStage('Batch of ' + str(args.properties) + ' properties, ' + str(args.workers) + ' workers', commandStats, stats)
+    finally:
+        server.shutdown()
+        if not args.keep:
+            shutil.rmtree(workDir, ignore_errors=True)
+
+    results['failures'] = [{'command': eachName, 'property': eachProperty, 'output': eachOutput}
+                           for eachName, eachProperty, eachOutput in failures]
+    for eachName, eachProperty, eachOutput in failures:
+        print('FAILED ' + eachName + ' ' + eachProperty + ': ' + ' '.join(eachOutput))
+    with open(args.output, 'w') as outputHandler:
+        json.dump(results, outputHandler, indent=4)
+    print('\nResults written to ' + args.output)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""
+Copyright 2021 Akamai Technologies, Inc. All Rights Reserved.
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+
+"""
+Time and peak memory of the helper tree operations (getRule, insertRule,
+deleteRules, addBehaviorToRule, deleteBehavior, getAllRules) on synthetic
+trees from about 100 to 50,000 rules, wide and deep. Results are written as
+JSON; with --baseline an earlier results file is compared against and slower
+operations are flagged.
+python3 benchmarks/helpers.py --output helpers.json
+python3 benchmarks/helpers.py --shape 3x36x3 --baseline helpers.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import helper
+from synthetic import syntheticRules, countRules
+
+
+#DEPTHxFANOUTxBEHAVIORS, from ~100 to ~50,000 rules and from wide to deep
+SHAPES = ['1x99x3', '3x10x3', '4x10x3', '4x10x6', '3x36x3', '8x2x3', '13x2x3']
+
+NEW_RULE = {'name': 'Benchmark rule', 'children': [], 'behaviors': [{'name': 'gzipResponse', 'options': {'behavior': 'ALWAYS'}}],
+            'criteria': [], 'criteriaMustSatisfy': 'all', 'options': {}}
+NEW_BEHAVIOR = {'name': 'allowPost', 'options': {'enabled': True, 'allowWithoutContentLength': False}}
+
+
+def lastRuleName(rules):
+    """
+    Function to name the last rule in document order, the worst case for a search
+    """
+    rule = rules
+    while rule.get('children'):
+        rule = rule['children'][-1]
+    return rule['name']
+
+
+#Each operation takes a fresh default rule and the name of the rule to work on
+OPERATIONS = {
+    'getRule': lambda rules, ruleName: helper.getRule([rules], ruleName),
+    'insertRule': lambda rules, ruleName: helper.insertRule([rules], dict(NEW_RULE), ruleName, 'insertAfter'),
+    'deleteRules': lambda rules, ruleName: helper.deleteRules([rules], ruleName),
+    'addBehaviorToRule': lambda rules, ruleName: helper.addBehaviorToRule([rules], dict(NEW_BEHAVIOR), ruleName),
+    'deleteBehavior': lambda rules, ruleName: helper.deleteBehavior([rules], {'name': 'gzipResponse'}),
+    'getAllRules': lambda rules, ruleName: helper.getAllRules([rules], []),
+}
+
+
+def parseShape(shape):
+    depth, fanout, behaviors = (int(eachPart) for eachPart in shape.lower().split('x'))
+    return depth, fanout, behaviors
+
+
+def runShape(shape, operations, repeat):
+    """
+    Function to benchmark operations on one synthetic tree
+
+    Parameters
+    ----------
+    shape : <string>
+        DEPTHxFANOUTxBEHAVIORS of the tree
+    operations : <List>
+        Names of OPERATIONS to run
+    repeat : <int>
+        Timed runs per operation, each on a fresh copy of the tree
+
+    Returns
+    -------
+    results : <List> of dicts, one per operation
+    """
+    depth, fanout, behaviors = parseShape(shape)
+    content = json.dumps(syntheticRules(depth, fanout, behaviors)['rules'])
+    rules = json.loads(content)
+    ruleCount = countRules(rules)
+    ruleName = lastRuleName(rules)
+
+    results = []
+    for eachOperation in operations:
+        function = OPERATIONS[eachOperation]
+        timings = []
+        for _ in range(repeat):
+            #Operations edit the tree, every run gets its own copy (not timed)
+            rules = json.loads(content)
+            start = time.perf_counter()
+            function(rules, ruleName)
+            timings.append(time.perf_counter() - start)
+        #Memory is traced in a separate run, tracing slows the operation down
+        rules = json.loads(content)
+        tracemalloc.start()
+        function(rules, ruleName)
+        peakBytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results.append({
+            'shape': shape,
+            'depth': depth,
+            'fanout': fanout,
+            'behaviorsPerRule': behaviors,
+            'rules': ruleCount,
+            'operation': eachOperation,
+            'minSeconds': min(timings),
+            'medianSeconds': statistics.median(timings),
+            'peakBytes': peakBytes
+        })
+    return results
+
+
+def compare(results, baselineFile, threshold):
+    """
+    Function to print the operations that got slower than in a baseline results file
+
+    Returns
+    -------
+    regressions : <int> number of operations slower by more than threshold
+    """
+    with open(baselineFile) as baselineHandler:
+        baseline = {(eachResult['shape'], eachResult['operation']): eachResult
+                    for eachResult in json.load(baselineHandler)['results']}
+    regressions = 0
+    print('\n%-10s %-18s %9s %9s %7s' % ('shape', 'operation', 'base ms', 'now ms', 'ratio'))
+    for eachResult in results:
+        previous = baseline.get((eachResult['shape'], eachResult['operation']))
+        if previous is None:
+            continue
+        ratio = eachResult['minSeconds'] / max(previous['minSeconds'], 1e-9)
+        flag = ''
+        if ratio > threshold:
+            regressions += 1
+            flag = '  SLOWER'
+        print('%-10s %-18s %9.2f %9.2f %6.2fx%s' % (eachResult['shape'], eachResult['operation'], previous['minSeconds'] * 1000,
+                                                 eachResult['minSeconds'] * 1000, ratio, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the helper rule tree operations on synthetic trees')
+    parser.add_argument('--shape', action='append', help='DEPTHxFANOUTxBEHAVIORS, may be repeated (default: ' + ', '.join(SHAPES) + ')')
+    parser.add_argument('--operation', action='append', choices=sorted(OPERATIONS), help='Operation to run, may be repeated (default: all)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default='helpers-benchmark.json', help='Results file')
+    parser.add_argument('--baseline', help='Earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='Ratio to the baseline reported as slower')
+    args = parser.parse_args()
+
+    operations = args.operation or list(OPERATIONS)
+    results = []
+    print('%-10s %7s %-18s %9s %9s %10s' % ('shape', 'rules', 'operation', 'min ms', 'median ms', 'peak KiB'))
+    for eachShape in args.shape or SHAPES:
+        for eachResult in runShape(eachShape, operations, args.repeat):
+            results.append(eachResult)
+            print('%-10s %7d %-18s %9.2f %9.2f %10d' % (eachShape, eachResult['rules'], eachResult['operation'],
+                                                        eachResult['minSeconds'] * 1000, eachResult['medianSeconds'] * 1000,
+                                                        eachResult['peakBytes'] // 1024))
+
+    with open(args.output, 'w') as outputHandler:
+        json.dump({
+            'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'results': results
+        }, outputHandler, indent=4)
+    print('\nResults written to ' + args.output)
+
+    if args.baseline and compare(results, args.baseline, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,552 @@
+"""
+Copyright 2021 Akamai Technologies, Inc. All Rights Reserved.
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+
+"""
+Local stand-in for the PAPI endpoints used by PapiWrapper, for end-to-end
+benchmarks without an Akamai account: contracts, groups, products and the
+properties listing (for papi.py -setup), property search, versions (list,
+latest, detail, create), rules (GET with etags, PUT, PATCH), activations,
+hostnames and edge hostnames. Every property starts with one version holding
+a synthetic rule tree (benchmarks/synthetic.py). Responses can be delayed,
+requests beyond a rate limit get 429 with Retry-After, and a share of the
+requests can be answered with 429 or 5xx. Authentication is not checked.
+
+Point an .edgerc section at it, PapiWrapper accepts a host with a scheme:
+    host = http://127.0.0.1:8080
+python3 benchmarks/mockpapi.py --port 8080 --properties 50 --latency 0.05
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import rulepatch
+from synthetic import syntheticRules
+
+
+__all__=['MockPapi', 'MockPapiServer', 'startServer']
+
+CONTRACT_ID = 'ctr_1-MOCK'
+GROUP_ID = 'grp_1'
+PROPERTY_PATH = r'/papi/v[01]/properties/(prp_\d+)'
+
+#(method, path pattern, endpoint name), first match wins
+ROUTES = [
+    ('GET', r'/papi/v[01]/contracts/?$', 'getContracts'),
+    ('GET', r'/papi/v[01]/groups/?$', 'getGroups'),
+    ('GET', r'/papi/v[01]/products/?$', 'listProducts'),
+    ('GET', r'/papi/v[01]/properties/?$', 'getAllProperties'),
+    ('POST', r'/papi/v[01]/search/find-by-value/?$', 'searchProperty'),
+    ('GET', PROPERTY_PATH + r'/versions/latest/?$', 'getVersion'),
+    ('GET', PROPERTY_PATH + r'/versions/?$', 'listVersions'),
+    ('POST', PROPERTY_PATH + r'/versions/?$', 'createVersion'),
+    ('GET', PROPERTY_PATH + r'/versions/(\d+)/rules/?$', 'getPropertyRules'),
+    ('PUT', PROPERTY_PATH + r'/versions/(\d+)/rules/?$', 'uploadRules'),
+    ('PATCH', PROPERTY_PATH + r'/versions/(\d+)/rules/?$', 'patchRules'),
+    ('GET', PROPERTY_PATH + r'/versions/(\d+)/hostnames/?$', 'listHostnames'),
+    ('GET', PROPERTY_PATH + r'/versions/(\d+)/?$', 'getVersionDetail'),
+    ('POST', PROPERTY_PATH + r'/activations/?$', 'activateConfiguration'),
+    ('GET', PROPERTY_PATH + r'/activations/(atv_\d+)/?$', 'getActivation'),
+    ('GET', r'/papi/v[01]/edgehostnames/?$', 'listEdgeHostnames'),
+]
+
+
+def stripEtag(etag):
+    if etag is None:
+        return None
+    if etag.startswith('W/'):
+        etag = etag[2:]
+    return etag.strip('"')
+
+
+class MockPapi(object):
+    """
+    State and request handling of the mock PAPI, independent of HTTP.
+    Properties are named www.mockN.example.com, IDs prp_N.
+    """
+
+    def __init__(self, properties=10, depth=3, fanout=5, behaviors=3, latency=0.0, jitter=0.0, rateLimit=0,
+                 throttleRate=0.0, errorRate=0.0, activationSeconds=2.0, seed=1):
+        self.latency = latency
+        self.jitter = jitter
+        self.rateLimit = rateLimit
+        self.throttleRate = throttleRate
+        self.errorRate = errorRate
+        self.activationSeconds = activationSeconds
+        self.random = random.Random(seed)
+        self.lock = threading.RLock()
+        self.tokens = float(rateLimit)
+        self.updated = time.monotonic()
+
+        rules = syntheticRules(depth, fanout, behaviors, seed)['rules']
+        self.properties = {}
+        for position in range(1, properties + 1):
+            propertyId = 'prp_' + str(position)
+            self.properties[propertyId] = {
+                'propertyId': propertyId,
+                'propertyName': 'www.mock' + str(position) + '.example.com',
+                'versions': {},
+                'versionsEtag': ''
+            }
+            self.addVersion(propertyId, json.loads(json.dumps(rules)), 'Initial version')
+        self.activations = {}
+        self.resetStats()
+
+    def resetStats(self):
+        with self.lock:
+            self.stats = {'requests': 0, 'bytesIn': 0, 'bytesOut': 0, 'statuses': Counter(), 'endpoints': Counter(),
+                          'started': time.time()}
+
+    def statsSnapshot(self):
+        """
+        Function to read the counters since the last resetStats
+
+        Returns
+        -------
+        stats : <dict> requests, bytesIn, bytesOut, statuses and endpoints (counts by name), elapsed seconds
+        """
+        with self.lock:
+            return {
+                'requests': self.stats['requests'],
+                'bytesIn': self.stats['bytesIn'],
+                'bytesOut': self.stats['bytesOut'],
+                'statuses': {str(status): count for status, count in sorted(self.stats['statuses'].items())},
+                'endpoints': dict(sorted(self.stats['endpoints'].items())),
+                'elapsed': time.time() - self.stats['started']
+            }
+
+    def propertyNames(self):
+        return [eachProperty['propertyName'] for eachProperty in self.properties.values()]
+
+    @staticmethod
+    def makeEtag(*parts):
+        return hashlib.sha1(':'.join(str(eachPart) for eachPart in parts).encode('utf-8')).hexdigest()[:16]
+
+    def addVersion(self, propertyId, rules, note):
+        propertyDetails = self.properties[propertyId]
+        version = len(propertyDetails['versions']) + 1
+        propertyDetails['versions'][version] = {
+            'rules': rules,
+            'comments': note,
+            'etag': self.makeEtag(propertyId, version, time.time()),
+            'stagingStatus': 'INACTIVE',
+            'productionStatus': 'INACTIVE',
+            'updatedDate': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        }
+        self.touchVersions(propertyId)
+        return version
+
+    def touchVersions(self, propertyId):
+        propertyDetails = self.properties[propertyId]
+        propertyDetails['versionsEtag'] = self.makeEtag(propertyId, len(propertyDetails['versions']), time.time(), self.random.random())
+
+    def versionItem(self, propertyId, version):
+        propertyDetails = self.properties[propertyId]
+        versionDetails = propertyDetails['versions'][version]
+        return {
+            'propertyVersion': version,
+            'updatedByUser': 'mock',
+            'updatedDate': versionDetails['updatedDate'],
+            'productionStatus': versionDetails['productionStatus'],
+            'stagingStatus': versionDetails['stagingStatus'],
+            'etag': versionDetails['etag'],
+            'productId': 'prd_Mock',
+            'note': versionDetails['comments']
+        }
+
+    def envelope(self, propertyId, items):
+        return {
+            'propertyId': propertyId,
+            'propertyName': self.properties[propertyId]['propertyName'],
+            'accountId': 'act_1-MOCK',
+            'contractId': CONTRACT_ID,
+            'groupId': GROUP_ID,
+            'versions': {'items': items}
+        }
+
+    def throttled(self):
+        """
+        Function to take a slot of the rate limit, without waiting
+
+        Returns
+        -------
+        throttled : <bool> True when the request is over the limit
+        """
+        if not self.rateLimit:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(float(self.rateLimit), self.tokens + (now - self.updated) * self.rateLimit)
+            self.updated = now
+            if self.tokens < 1:
+                return True
+            self.tokens -= 1
+            return False
+
+    def handle(self, method, url, headers, body):
+        """
+        Function to answer one request
+
+        Parameters
+        ----------
+        method : <string>
+        url : <string>
+            Path and query string
+        headers : <dict like>
+            Request headers
+        body : <bytes>
+            Request body
+
+        Returns
+        -------
+        (status, headers, body) : <int>, <dict>, <bytes>
+        """
+        parsedUrl = urlparse(url)
+        query = {key: values[0] for key, values in parse_qs(parsedUrl.query).items()}
+        endpoint, match = 'unknown', None
+        for routeMethod, pattern, name in ROUTES:
+            match = re.match(pattern, parsedUrl.path)
+            if match and routeMethod == method:
+                endpoint = name
+                break
+            match = None
+
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter)))
+
+        if self.throttled() or (self.throttleRate and self.random.random() < self.throttleRate):
+            status, responseHeaders, document = 429, {'Retry-After': '1'}, {'title': 'Too many requests', 'status': 429}
+        elif self.errorRate and self.random.random() < self.errorRate:
+            status = self.random.choice([500, 502, 503, 504])
+            responseHeaders, document = {}, {'title': 'Injected error', 'status': status}
+        elif match is None:
+            status, responseHeaders, document = 404, {}, {'title': 'Not found', 'detail': method + ' ' + parsedUrl.path}
+        else:
+            try:
+                with self.lock:
+                    status, responseHeaders, document = getattr(self, endpoint)(match.groups(), query, headers, body)
+            except KeyError as e:
+                status, responseHeaders, document = 404, {}, {'title': 'Not found', 'detail': 'unable to locate ' + str(e)}
+
+        content = b'' if document is None else json.dumps(document).encode('utf-8')
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['bytesIn'] += len(body or b'')
+            self.stats['bytesOut'] += len(content)
+            self.stats['statuses'][status] += 1
+            self.stats['endpoints'][endpoint] += 1
+        return status, responseHeaders, content
+
+    def getContracts(self, groups, query, headers, body):
+        return 200, {}, {'accountId': 'act_1-MOCK', 'contracts': {'items': [{'contractId': CONTRACT_ID, 'contractTypeName': 'DIRECT_CUSTOMER'}]}}
+
+    def getGroups(self, groups, query, headers, body):
+        return 200, {}, {'accountId': 'act_1-MOCK', 'groups': {'items': [{'groupId': GROUP_ID, 'groupName': 'Mock group',
+                                                                          'contractIds': [CONTRACT_ID]}]}}
+
+    def listProducts(self, groups, query, headers, body):
+        return 200, {}, {'accountId': 'act_1-MOCK', 'contractId': query.get('contractId', CONTRACT_ID),
+                         'products': {'items': [{'productId': 'prd_Mock', 'productName': 'Mock'}]}}
+
+    def getAllProperties(self, groups, query, headers, body):
+        items = []
+        for propertyId, propertyDetails in self.properties.items():
+            versions = propertyDetails['versions']
+            activeOn = {network: [version for version, details in versions.items() if details[network + 'Status'] == 'ACTIVE']
+                        for network in ('staging', 'production')}
+            items.append({
+                'accountId': 'act_1-MOCK',
+                'contractId': CONTRACT_ID,
+                'groupId': GROUP_ID,
+                'propertyId': propertyId,
+                'propertyName': propertyDetails['propertyName'],
+                'latestVersion': max(versions),
+                'stagingVersion': max(activeOn['staging']) if activeOn['staging'] else None,
+                'productionVersion': max(activeOn['production']) if activeOn['production'] else None,
+                'assetId': 'aid_' + propertyId[4:],
+                'note': versions[max(versions)]['comments']
+            })
+        return 200, {}, {'properties': {'items': items}}
+
+    def searchProperty(self, groups, query, headers, body):
+        search = json.loads(body or b'{}')
+        items = []
+        for propertyId, propertyDetails in self.properties.items():
+            if search.get('propertyName') not in (None, propertyDetails['propertyName']):
+                continue
+            if search.get('hostname') not in (None, propertyDetails['propertyName']):
+                continue
+            if search.get('edgeHostname') not in (None, propertyDetails['propertyName'] + '.edgesuite.net'):
+                continue
+            latest = max(propertyDetails['versions'])
+            items.append({
+                'accountId': 'act_1-MOCK',
+                'contractId': CONTRACT_ID,
+                'groupId': GROUP_ID,
+                'propertyId': propertyId,
+                'propertyName': propertyDetails['propertyName'],
+                'propertyVersion': latest,
+                'productionStatus': propertyDetails['versions'][latest]['productionStatus'],
+                'stagingStatus': propertyDetails['versions'][latest]['stagingStatus'],
+                'updatedDate': propertyDetails['versions'][latest]['updatedDate']
+            })
+        return 200, {}, {'versions': {'items': items}}
+
+    def getVersion(self, groups, query, headers, body):
+        propertyId = groups[0]
+        versions = self.properties[propertyId]['versions']
+        network = query.get('activatedOn')
+        if network:
+            statusKey = network.lower() + 'Status'
+            candidates = [version for version, details in versions.items() if details.get(statusKey) == 'ACTIVE']
+        else:
+            candidates = list(versions)
+        items = [self.versionItem(propertyId, max(candidates))] if candidates else []
+        return 200, {}, self.envelope(propertyId, items)
+
+    def listVersions(self, groups, query, headers, body):
+        propertyId = groups[0]
+        propertyDetails = self.properties[propertyId]
+        etag = propertyDetails['versionsEtag']
+        if stripEtag(headers.get('If-None-Match')) == etag:
+            return 304, {'ETag': '"' + etag + '"'}, None
+        items = [self.versionItem(propertyId, version) for version in sorted(propertyDetails['versions'], reverse=True)]
+        return 200, {'ETag': '"' + etag + '"'}, self.envelope(propertyId, items)
+
+    def createVersion(self, groups, query, headers, body):
+        propertyId = groups[0]
+        baseVersion = int(json.loads(body)['createFromVersion'])
+        baseDetails = self.properties[propertyId]['versions'][baseVersion]
+        version = self.addVersion(propertyId, json.loads(json.dumps(baseDetails['rules'])), '')
+        link = '/papi/v0/properties/' + propertyId + '/versions/' + str(version) + '?contractId=' + CONTRACT_ID + '&groupId=' + GROUP_ID
+        return 201, {'Location': link}, {'versionLink': link}
+
+    def getVersionDetail(self, groups, query, headers, body):
+        propertyId, version = groups[0], int(groups[1])
+        return 200, {}, self.envelope(propertyId, [self.versionItem(propertyId, version)])
+
+    def rulesDocument(self, propertyId, version):
+        versionDetails = self.properties[propertyId]['versions'][version]
+        return {
+            'accountId': 'act_1-MOCK',
+            'contractId': CONTRACT_ID,
+            'groupId': GROUP_ID,
+            'propertyId': propertyId,
+            'propertyName': self.properties[propertyId]['propertyName'],
+            'propertyVersion': version,
+            'etag': versionDetails['etag'],
+            'ruleFormat': 'latest',
+            'rules': versionDetails['rules'],
+            'comments': versionDetails['comments']
+        }
+
+    def getPropertyRules(self, groups, query, headers, body):
+        propertyId, version = groups[0], int(groups[1])
+        etag = self.properties[propertyId]['versions'][version]['etag']
+        if stripEtag(headers.get('If-None-Match')) == etag:
+            return 304, {'ETag': '"' + etag + '"'}, None
+        return 200, {'ETag': '"' + etag + '"'}, self.rulesDocument(propertyId, version)
+
+    def editableVersion(self, propertyId, version, headers):
+        """
+        Function to check that a version can be edited
+
+        Returns
+        -------
+        error : (status, headers, document) or None
+        """
+        versionDetails = self.properties[propertyId]['versions'][version]
+        if versionDetails['stagingStatus'] != 'INACTIVE' or versionDetails['productionStatus'] != 'INACTIVE':
+            return 403, {}, {'title': 'Version is locked', 'detail': 'Activated versions can not be edited'}
+        ifMatch = stripEtag(headers.get('If-Match'))
+        if ifMatch is not None and ifMatch != versionDetails['etag']:
+            return 412, {}, {'title': 'Precondition failed', 'detail': 'The rules were changed since they were read'}
+        return None
+
+    def saveRules(self, propertyId, version, document):
+        versionDetails = self.properties[propertyId]['versions'][version]
+        versionDetails['rules'] = document['rules']
+        versionDetails['comments'] = document.get('comments', versionDetails['comments'])
+        versionDetails['etag'] = self.makeEtag(propertyId, version, time.time(), self.random.random())
+        self.touchVersions(propertyId)
+        etag = versionDetails['etag']
+        return 200, {'ETag': '"' + etag + '"'}, self.rulesDocument(propertyId, version)
+
+    def uploadRules(self, groups, query, headers, body):
+        propertyId, version = groups[0], int(groups[1])
+        error = self.editableVersion(propertyId, version, headers)
+        if error is not None:
+            return error
+        return self.saveRules(propertyId, version, json.loads(body))
+
+    def patchRules(self, groups, query, headers, body):
+        propertyId, version = groups[0], int(groups[1])
+        error = self.editableVersion(propertyId, version, headers)
+        if error is not None:
+            return error
+        document = self.rulesDocument(propertyId, version)
+        try:
+            document = rulepatch.applyPatch({key: document[key] for key in ['rules', 'comments'] if key in document}, json.loads(body))
+        except (KeyError, IndexError, ValueError) as e:
+            return 400, {}, {'title': 'Invalid patch', 'detail': repr(e)}
+        return self.saveRules(propertyId, version, document)
+
+    def listHostnames(self, groups, query, headers, body):
+        propertyId, version = groups[0], int(groups[1])
+        propertyName = self.properties[propertyId]['propertyName']
+        items = [{'cnameType': 'EDGE_HOSTNAME', 'cnameFrom': propertyName, 'cnameTo': propertyName + '.edgesuite.net',
+                  'edgeHostnameId': 'ehn_' + propertyId[4:]}]
+        document = self.envelope(propertyId, [])
+        del document['versions']
+        document['propertyVersion'] = version
+        document['etag'] = self.properties[propertyId]['versions'][version]['etag']
+        document['hostnames'] = {'items': items}
+        return 200, {}, document
+
+    def activateConfiguration(self, groups, query, headers, body):
+        propertyId = groups[0]
+        activation = json.loads(body)
+        version = int(activation['propertyVersion'])
+        network = activation['network']
+        versionDetails = self.properties[propertyId]['versions'][version]
+        if not activation.get('acknowledgeWarnings') and query.get('acknowledgeAllWarnings') != 'true':
+            return 400, {}, {'title': 'Activation warnings', 'detail': 'The following activation warnings must be acknowledged',
+                             'warnings': [{'messageId': 'msg_mock', 'detail': 'Mock warning'}]}
+        if versionDetails[network.lower() + 'Status'] == 'ACTIVE':
+            return 422, {}, {'title': 'Already active', 'detail': 'Property version already activated'}
+        activationId = 'atv_' + str(len(self.activations) + 1)
+        self.activations[activationId] = {'propertyId': propertyId, 'version': version, 'network': network,
+                                          'submitted': time.time(), 'status': 'PENDING'}
+        versionDetails[network.lower() + 'Status'] = 'PENDING'
+        self.touchVersions(propertyId)
+        link = '/papi/v0/properties/' + propertyId + '/activations/' + activationId + '?contractId=' + CONTRACT_ID + '&groupId=' + GROUP_ID
+        return 201, {'Location': link}, {'activationLink': link}
+
+    def getActivation(self, groups, query, headers, body):
+        propertyId, activationId = groups
+        activation = self.activations[activationId]
+        if activation['status'] != 'ACTIVE' and time.time() - activation['submitted'] >= self.activationSeconds:
+            #The previously active version of the network is deactivated
+            for versionDetails in self.properties[propertyId]['versions'].values():
+                if versionDetails[activation['network'].lower() + 'Status'] == 'ACTIVE':
+                    versionDetails[activation['network'].lower() + 'Status'] = 'DEACTIVATED'
+            self.properties[propertyId]['versions'][activation['version']][activation['network'].lower() + 'Status'] = 'ACTIVE'
+            self.touchVersions(propertyId)
+            activation['status'] = 'ACTIVE'
+        item = {'activationId': activationId, 'propertyId': propertyId, 'propertyVersion': activation['version'],
+                'network': activation['network'], 'status': activation['status'], 'activationType': 'ACTIVATE'}
+        return 200, {}, {'activations': {'items': [item]}}
+
+    def listEdgeHostnames(self, groups, query, headers, body):
+        items = [{'edgeHostnameId': 'ehn_' + propertyId[4:], 'edgeHostnameDomain': propertyDetails['propertyName'] + '.edgesuite.net',
+                  'productId': 'prd_Mock', 'domainPrefix': propertyDetails['propertyName'], 'domainSuffix': 'edgesuite.net',
+                  'secure': False, 'ipVersionBehavior': 'IPV4'}
+                 for propertyId, propertyDetails in self.properties.items()]
+        return 200, {}, {'accountId': 'act_1-MOCK', 'contractId': query.get('contractId', CONTRACT_ID),
+                         'groupId': query.get('groupId', GROUP_ID), 'edgeHostnames': {'items': items}}
+
+
+class MockPapiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        status, headers, content = self.server.papi.handle(self.command, self.path, self.headers, body)
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        if content:
+            self.send_header('Content-Type', 'application/problem+json' if status >= 400 else 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = respond
+
+    def log_message(self, format, *args):
+        #Access logs would cost more than the requests
+        pass
+
+
+class MockPapiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, papi):
+        self.papi = papi
+        ThreadingHTTPServer.__init__(self, address, MockPapiHandler)
+
+    @property
+    def url(self):
+        return 'http://' + self.server_address[0] + ':' + str(self.server_address[1])
+
+
+def startServer(papi, host='127.0.0.1', port=0):
+    """
+    Function to serve a MockPapi from a background thread
+
+    Parameters
+    ----------
+    papi : <MockPapi>
+    port : <int>
+        0 picks a free port
+
+    Returns
+    -------
+    server : <MockPapiServer> its url is the host to use in .edgerc, stop it with shutdown()
+    """
+    server = MockPapiServer((host, port), papi)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a local mock of the PAPI endpoints used by PapiWrapper')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--properties', type=int, default=10)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--fanout', type=int, default=5)
+    parser.add_argument('--behaviors', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Latency varies by up to this many seconds')
+    parser.add_argument('--rateLimit', type=float, default=0, help='Requests per second, above it requests get 429 (0 for no limit)')
+    parser.add_argument('--throttleRate', type=float, default=0.0, help='Share of requests answered with 429')
+    parser.add_argument('--errorRate', type=float, default=0.0, help='Share of requests answered with a 5xx status')
+    parser.add_argument('--activationSeconds', type=float, default=2.0, help='Seconds until an activation is ACTIVE')
+    args = parser.parse_args()
+
+    papi = MockPapi(args.properties, args.depth, args.fanout, args.behaviors, args.latency, args.jitter, args.rateLimit,
+                    args.throttleRate, args.errorRate, args.activationSeconds)
+    server = MockPapiServer((args.host, args.port), papi)
+    print('Mock PAPI serving ' + str(args.properties) + ' properties on ' + server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(papi.statsSnapshot(), indent=4))
+
+
+if __name__ == '__main__':
+    main()
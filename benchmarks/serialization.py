@@ -0,0 +1,71 @@
+"""
+Copyright 2021 Akamai Technologies, Inc. All Rights Reserved.
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+
+"""
+Serialization cost of an edit (decode the rules response, encode the upload
+body) on a large synthetic tree, as it was (stdlib json plus the
+json.loads(json.dumps()) copy before uploadRules) and with jsonbackend.
+python3 benchmarks/serialization.py --depth 5 --fanout 6
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import jsonbackend
+from synthetic import syntheticRules, countRules
+
+
+def before(content):
+    completePropertyJson = json.loads(content)
+    #Copy handed to uploadRules, which encoded it again
+    return json.dumps(json.loads(json.dumps(completePropertyJson)))
+
+
+def after(content):
+    completePropertyJson = jsonbackend.loads(content)
+    return jsonbackend.dumpBytes(completePropertyJson)
+
+
+def measure(function, content, repeat):
+    return min(timeit.repeat(lambda: function(content), number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark rules serialization before/after jsonbackend')
+    parser.add_argument('--depth', type=int, default=5)
+    parser.add_argument('--fanout', type=int, default=6)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rulesResponse = syntheticRules(args.depth, args.fanout)
+    content = json.dumps(rulesResponse).encode('utf-8')
+    print('Synthetic tree: ' + str(countRules(rulesResponse['rules'])) + ' rules, ' + str(len(content) // 1024) + ' KiB')
+
+    baseline = measure(before, content, args.repeat)
+    print('%-28s %9.1f ms' % ('before (json + copy)', baseline * 1000))
+    for backendName in ['json', 'orjson']:
+        jsonbackend.setBackend(backendName)
+        if jsonbackend.backendName() != backendName:
+            print('%-28s %12s' % ('after (' + backendName + ')', 'not installed'))
+            continue
+        elapsed = measure(after, content, args.repeat)
+        print('%-28s %9.1f ms  %5.1fx' % ('after (' + backendName + ')', elapsed * 1000, baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Copyright 2021 Akamai Technologies, Inc. All Rights Reserved.
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+
+"""
+Generator of synthetic PAPI rules responses of any size, for benchmarks.
+python3 benchmarks/synthetic.py --depth 5 --fanout 6 > rules.json
+"""
+
+import argparse
+import json
+import random
+
+
+__all__=['syntheticRules', 'countRules']
+
+BEHAVIORS = [
+    ('caching', {'behavior': 'MAX_AGE', 'mustRevalidate': False, 'ttl': '1d'}),
+    ('gzipResponse', {'behavior': 'ALWAYS'}),
+    ('origin', {'originType': 'CUSTOMER', 'hostname': 'origin.example.com', 'forwardHostHeader': 'REQUEST_HOST_HEADER',
+                'cacheKeyHostname': 'ORIGIN_HOSTNAME', 'compress': True, 'enableTrueClientIp': False, 'httpPort': 80}),
+    ('cpCode', {'value': {'id': 12345, 'name': 'synthetic', 'products': ['Fresca']}}),
+    ('modifyOutgoingResponseHeader', {'action': 'ADD', 'standardAddHeaderName': 'OTHER', 'customHeaderName': 'X-Synthetic',
+                                      'newHeaderValue': 'value', 'avoidDuplicateHeaders': True}),
+    ('sureRoute', {'enabled': True, 'type': 'PERFORMANCE', 'testObjectUrl': '/akamai/sureroute-test-object.html',
+                   'toHostStatus': 'INCOMING_HH', 'raceStatTtl': '30m', 'forceSslForward': False}),
+]
+CRITERIA = [
+    ('path', {'matchOperator': 'MATCHES_ONE_OF', 'values': ['/static/*', '/assets/*'], 'matchCaseSensitive': False}),
+    ('fileExtension', {'matchOperator': 'IS_ONE_OF', 'values': ['css', 'js', 'png', 'jpg'], 'matchCaseSensitive': False}),
+    ('requestHeader', {'headerName': 'X-Synthetic', 'matchOperator': 'EXISTS', 'matchWildcardName': False}),
+]
+
+
+def syntheticRule(name, depth, fanout, behaviorsPerRule, generator):
+    behaviors = [{'name': behaviorName, 'options': dict(options)}
+                 for behaviorName, options in generator.sample(BEHAVIORS, behaviorsPerRule)]
+    criteria = [{'name': criteriaName, 'options': dict(options)}
+                for criteriaName, options in generator.sample(CRITERIA, generator.randint(0, 2))]
+    children = []
+    if depth > 0:
+        for position in range(fanout):
+            children.append(syntheticRule(name + '.' + str(position + 1), depth - 1, fanout, behaviorsPerRule, generator))
+    return {
+        'name': name,
+        'children': children,
+        'behaviors': behaviors,
+        'criteria': criteria,
+        'criteriaMustSatisfy': 'all',
+        'options': {},
+        'comments': 'Synthetic rule ' + name
+    }
+
+
+def syntheticRules(depth=4, fanout=6, behaviorsPerRule=3, seed=1):
+    """
+    Function to generate a rules response
+
+    Parameters
+    ----------
+    depth : <int>
+        Levels of child rules below the default rule
+    fanout : <int>
+        Children per rule
+    behaviorsPerRule : <int>
+        Behaviors in every rule
+    seed : <int>
+        Seed of the random generator, the same arguments give the same tree
+
+    Returns
+    -------
+    rulesResponse : <dict> shaped like a GET rules response
+    """
+    generator = random.Random(seed)
+    rules = syntheticRule('Rule 1', depth, fanout, behaviorsPerRule, generator)
+    rules['name'] = 'default'
+    rules['variables'] = [{'name': 'PMUSER_SYNTHETIC', 'value': '', 'description': '', 'hidden': False, 'sensitive': False}]
+    return {
+        'accountId': 'act_1-SYNTH',
+        'contractId': 'ctr_1-SYNTH',
+        'groupId': 'grp_1',
+        'propertyId': 'prp_1',
+        'propertyVersion': 1,
+        'etag': 'synthetic',
+        'ruleFormat': 'latest',
+        'rules': rules,
+        'comments': 'Synthetic rules'
+    }
+
+
+def countRules(rules):
+    count = 0
+    stack = [rules]
+    while stack:
+        rule = stack.pop()
+        count += 1
+        stack.extend(rule.get('children', []))
+    return count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write a synthetic PAPI rules response to stdout')
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--fanout', type=int, default=6)
+    parser.add_argument('--behaviors', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    print(json.dumps(syntheticRules(args.depth, args.fanout, args.behaviors, args.seed), indent=4))
@@ -0,0 +1,395 @@
+"""
+Copyright 2021 Akamai Technologies, Inc. All Rights Reserved.
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+
+"""
+Local caches used by RuleUpdater to avoid repeating PAPI calls across runs.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+__all__=['MetadataCache', 'RuleTreeCache']
+
+#Property IDs practically never change, version lists change with every edit
+PROPERTY_TTL = 7 * 24 * 3600
+VERSION_TTL = 300
+RULETREE_MAX_SIZE = 256 * 1024 * 1024
+
+RULETREE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trees (
+    treeKey TEXT PRIMARY KEY,
+    etag TEXT,
+    hash TEXT NOT NULL,
+    locked INTEGER NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS treesByHash ON trees (hash);
+CREATE INDEX IF NOT EXISTS treesByUse ON trees (used);
+CREATE TABLE IF NOT EXISTS totals (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals VALUES ('size', 0);
+"""
+
+
+class MetadataCache(object):
+    """
+    On-disk cache of property IDs (propertyId/contractId/groupId) and version
+    lists. Entries expire after their TTL and are invalidated explicitly
+    after writes. All RuleUpdater processes and threads share the same file.
+    """
+
+    fileName = 'ruleupdater_metadata.json'
+
+    def __init__(self, cacheDir, enabled=True):
+        self.cacheFile = os.path.join(cacheDir, self.fileName)
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.entries = None
+
+    def load(self):
+        try:
+            with open(self.cacheFile, 'r') as cacheFileHandler:
+                return json.loads(cacheFileHandler.read())
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def save(self):
+        cacheDir = os.path.dirname(self.cacheFile)
+        if cacheDir and not os.path.exists(cacheDir):
+            os.makedirs(cacheDir, exist_ok=True)
+        #Write to a temporary file and rename, so readers never see a partial file
+        tempFile = self.cacheFile + '.' + str(os.getpid()) + '.' + str(threading.get_ident())
+        with open(tempFile, 'w') as cacheFileHandler:
+            cacheFileHandler.write(json.dumps(self.entries))
+        os.replace(tempFile, self.cacheFile)
+
+    def get(self, key):
+        """
+        Function to get a cached value
+
+        Parameters
+        ----------
+        key : <string>
+            Cache key
+
+        Returns
+        -------
+        value : Cached value or None when missing or expired
+        """
+        if not self.enabled:
+            return None
+        with self.lock:
+            if self.entries is None:
+                self.entries = self.load()
+            entry = self.entries.get(key)
+        if entry is None or entry['expires'] < time.time():
+            return None
+        return entry['value']
+
+    def set(self, key, value, ttl):
+        """
+        Function to cache a value
+
+        Parameters
+        ----------
+        key : <string>
+            Cache key
+        value : <json serializable>
+            Value to be cached
+        ttl : <int>
+            Seconds after which the value expires
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            #Merge with what other processes wrote meanwhile
+            self.entries = self.load()
+            self.entries[key] = {'value': value, 'expires': time.time() + ttl}
+            self.purge()
+            self.save()
+
+    def invalidate(self, key):
+        """
+        Function to drop an entry and the entries below it (key:...)
+
+        Parameters
+        ----------
+        key : <string>
+            Cache key, e.g. the versions key of a property after a write.
+            versions:account:prp_1 does not drop versions:account:prp_12.
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.entries = self.load()
+            for eachKey in [eachKey for eachKey in self.entries if eachKey == key or eachKey.startswith(key + ':')]:
+                del self.entries[eachKey]
+            self.save()
+
+    def purge(self):
+        now = time.time()
+        for key in [key for key, entry in self.entries.items() if entry['expires'] < now]:
+            del self.entries[key]
+
+    @staticmethod
+    def propertyKey(accountKey, propertyName):
+        return 'property:' + accountKey + ':' + propertyName
+
+    @staticmethod
+    def versionsKey(accountKey, propertyId):
+        return 'versions:' + accountKey + ':' + propertyId
+
+
+class RuleTreeCache(object):
+    """
+    Content-addressed on-disk cache of rule trees. Each distinct tree is
+    stored once under objects/<sha256>, the SQLite database index.db maps
+    propertyId:version to the etag and hash of the tree last seen for it.
+    Trees of activated versions never change and are marked locked. The
+    least recently used trees are evicted once the objects exceed maxSize
+    bytes. Every change of the index is a single transaction, so processes
+    sharing the cache do not lose each other's updates. One connection is
+    shared by all threads of a process.
+    """
+
+    dirName = 'ruletrees'
+
+    def __init__(self, cacheDir, maxSize=RULETREE_MAX_SIZE, enabled=True):
+        self.cacheDir = os.path.join(cacheDir, self.dirName)
+        self.objectsDir = os.path.join(self.cacheDir, 'objects')
+        self.indexFile = os.path.join(self.cacheDir, 'index.db')
+        self.maxSize = maxSize
+        self.enabled = enabled
+        self.lock = threading.RLock()
+        self.connection = None
+
+    def connect(self):
+        """
+        Function to open the index on first use, the cache directory is only created then
+        """
+        with self.lock:
+            if self.connection is None:
+                if not os.path.exists(self.objectsDir):
+                    os.makedirs(self.objectsDir, exist_ok=True)
+                #Transactions are opened explicitly, waiting up to 30s for other processes
+                self.connection = sqlite3.connect(self.indexFile, timeout=30, check_same_thread=False, isolation_level=None)
+                self.connection.execute('PRAGMA journal_mode=WAL')
+                self.connection.executescript(RULETREE_SCHEMA)
+            return self.connection
+
+    @contextlib.contextmanager
+    def transaction(self):
+        with self.lock:
+            connection = self.connect()
+            #IMMEDIATE takes the write lock up front, reads within see the latest state of all processes
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+            except Exception:
+                connection.rollback()
+                raise
+            connection.commit()
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    def objectFile(self, contentHash):
+        return os.path.join(self.objectsDir, contentHash + '.json')
+
+    @staticmethod
+    def treeKey(propertyId, version):
+        return propertyId + ':' + str(version)
+
+    @staticmethod
+    def contentHash(content):
+        return hashlib.sha256(content).hexdigest()
+
+    def contentHashes(self):
+        """
+        Function to list the hashes of all cached trees
+        """
+        if not self.enabled and not os.path.exists(self.indexFile):
+            return set()
+        with self.lock:
+            return {row[0] for row in self.connect().execute('SELECT hash FROM objects')}
+
+    def lookup(self, propertyId, version):
+        """
+        Function to get the index entry (etag, hash, size, locked, used) of a cached tree
+
+        Returns
+        -------
+        entry : <dict> or None when the tree is not cached
+        """
+        if not self.enabled:
+            return None
+        with self.lock:
+            row = self.connect().execute('SELECT trees.etag, trees.hash, objects.size, trees.locked, trees.used FROM trees '
+                                         'JOIN objects ON objects.hash = trees.hash WHERE trees.treeKey = ?',
+                                         (self.treeKey(propertyId, version),)).fetchone()
+        if row is None:
+            return None
+        return {'etag': row[0], 'hash': row[1], 'size': row[2], 'locked': bool(row[3]), 'used': row[4]}
+
+    def get(self, propertyId, version, etag=None):
+        """
+        Function to read a cached rule tree
+
+        Parameters
+        ----------
+        propertyId : <string>
+            Property ID
+        version : <int>
+            Property version number
+        etag : <string>
+            Current etag of the version. Without it only locked (activated)
+            versions are served.
+
+        Returns
+        -------
+        content : <bytes> rules response body, or None when not cached or stale
+        """
+        entry = self.lookup(propertyId, version)
+        if entry is None:
+            return None
+        if (etag is None and not entry['locked']) or (etag is not None and entry['etag'] != etag):
+            return None
+        key = self.treeKey(propertyId, version)
+        try:
+            with open(self.objectFile(entry['hash']), 'rb') as objectFileHandler:
+                content = objectFileHandler.read()
+        except (IOError, OSError):
+            #The object is gone, e.g. evicted by another process, drop every tree pointing at it
+            with self.transaction() as connection:
+                connection.execute('DELETE FROM trees WHERE hash = ?', (entry['hash'],))
+                self.removeObject(connection, entry['hash'])
+            return None
+        with self.lock:
+            self.connect().execute('UPDATE trees SET used = ? WHERE treeKey = ?', (time.time(), key))
+        return content
+
+    def put(self, propertyId, version, etag, content, locked=False):
+        """
+        Function to store a rule tree
+
+        Parameters
+        ----------
+        etag : <string>
+            etag of the version the tree belongs to
+        content : <bytes>
+            rules response body
+        locked : <bool>
+            True when the version was activated and can no longer change
+        """
+        if not self.enabled:
+            return
+        contentHash = self.contentHash(content)
+        self.connect()
+        if not os.path.exists(self.objectFile(contentHash)):
+            tempFile = self.objectFile(contentHash) + '.' + str(os.getpid()) + '.' + str(threading.get_ident())
+            with open(tempFile, 'wb') as objectFileHandler:
+                objectFileHandler.write(content)
+            os.replace(tempFile, self.objectFile(contentHash))
+        key = self.treeKey(propertyId, version)
+        with self.transaction() as connection:
+            previous = connection.execute('SELECT hash FROM trees WHERE treeKey = ?', (key,)).fetchone()
+            self.addObject(connection, contentHash, len(content))
+            connection.execute('INSERT OR REPLACE INTO trees VALUES (?, ?, ?, ?, ?)',
+                               (key, etag, contentHash, bool(locked), time.time()))
+            #The tree replaced may have been the last one using its object
+            evicted = [previous[0]] if previous is not None and self.removeObject(connection, previous[0]) else []
+            evicted += self.evict(connection)
+        self.removeFiles(evicted)
+
+    def invalidate(self, propertyId, version):
+        """
+        Function to drop a tree after its version was modified
+        """
+        if not self.enabled and not os.path.exists(self.indexFile):
+            return
+        key = self.treeKey(propertyId, version)
+        with self.transaction() as connection:
+            row = connection.execute('SELECT hash FROM trees WHERE treeKey = ?', (key,)).fetchone()
+            if row is None:
+                return
+            connection.execute('DELETE FROM trees WHERE treeKey = ?', (key,))
+            removed = self.removeObject(connection, row[0])
+        if removed:
+            self.removeFiles([row[0]])
+
+    @staticmethod
+    def addObject(connection, contentHash, size):
+        if connection.execute('INSERT OR IGNORE INTO objects VALUES (?, ?)', (contentHash, size)).rowcount:
+            connection.execute("UPDATE totals SET value = value + ? WHERE name = 'size'", (size,))
+
+    @staticmethod
+    def removeObject(connection, contentHash):
+        """
+        Function to drop an object from the index once no tree points at it
+
+        Returns
+        -------
+        removed : <bool>
+        """
+        if connection.execute('SELECT 1 FROM trees WHERE hash = ? LIMIT 1', (contentHash,)).fetchone() is not None:
+            return False
+        row = connection.execute('SELECT size FROM objects WHERE hash = ?', (contentHash,)).fetchone()
+        if row is None:
+            return False
+        connection.execute('DELETE FROM objects WHERE hash = ?', (contentHash,))
+        connection.execute("UPDATE totals SET value = value - ? WHERE name = 'size'", (row[0],))
+        return True
+
+    def evict(self, connection):
+        """
+        Function to drop the least recently used trees until the objects fit in maxSize
+
+        Returns
+        -------
+        hashes : <List> of the objects no longer used, their files are removed after the commit
+        """
+        #Identical trees share one object, the total counts each object once
+        totalSize = connection.execute("SELECT value FROM totals WHERE name = 'size'").fetchone()[0]
+        evicted = []
+        while totalSize > self.maxSize:
+            row = connection.execute('SELECT treeKey, hash FROM trees ORDER BY used LIMIT 1').fetchone()
+            if row is None:
+                break
+            connection.execute('DELETE FROM trees WHERE treeKey = ?', (row[0],))
+            if self.removeObject(connection, row[1]):
+                evicted.append(row[1])
+                totalSize = connection.execute("SELECT value FROM totals WHERE name = 'size'").fetchone()[0]
+        return evicted
+
+    def removeFiles(self, hashes):
+        for contentHash in hashes:
+            try:
+                os.remove(self.objectFile(contentHash))
+            except OSError:
+                pass
@@ -6,9 +6,11 @@ Initiators: vbhat@akamai.com and aetsai@akamai.com
 '''
 
 import os
-import json
+import jsonbackend
 import configparser
 import re
+from RuleTree import RuleTree
+from inventory import Inventory, INVENTORY_FILE
 
 #-----------------------------------------------------------#
 #-----Below section contains custom parsing functions-------#
@@ -31,13 +33,9 @@ def addBehaviorToRule(parentRule,behavior,ruleName):
     parentRule : Updated Rule tree
     """
     for eachRule in parentRule:
-        if eachRule['name'] == ruleName:
-            eachRule['behaviors'].append(behavior)
-        #Check whether we have child rules, where in again behavior might be found
-        if len(eachRule['children']) != 0:
-            addBehaviorToRule(eachRule['children'],behavior,ruleName)
-        else:
-            return parentRule    
+        ruleTree = RuleTree(eachRule)
+        for everyMatchingRule in ruleTree.find(ruleName):
+            ruleTree.addBehavior(everyMatchingRule, behavior)
 
     #Awesome, we are done updating behaviors, lets go back
     return parentRule
@@ -59,26 +57,7 @@ def deleteBehavior(parentRule,behavior):
     parentRule : Updated Rule tree
     """
     for eachRule in parentRule:
-        index = 0 
-        for eachbehavior in eachRule['behaviors']:
-            found = False
-            if eachbehavior['name'] == behavior['name']:
-                #Mark for deletion
-                found = True
-                print('Marked for delete')
-            else:
-                #The behavior is not being updated, so move on
-                pass
-
-            if found is True:
-                #Delete the behavior
-                del eachRule['behaviors'][index]
-
-            index = index + 1
-
-        #Check whether we have child rules, where in again behavior might be found
-        if len(eachRule['children']) != 0:
-            deleteBehavior(eachRule['children'],behavior)
+        RuleTree(eachRule).deleteBehavior(behavior['name'])
 
     #Awesome, we are done updating behaviors, lets go back
     return parentRule
@@ -96,13 +75,12 @@ def deleteRules(parentRule,ruleName):
     -------
     parentRule : Updated Rule tree
     """
-    if parentRule[0]['name'] == ruleName:
-        del parentRule[0]      
-
     for eachRule in parentRule:
-        #Check whether we have child rules, where in again behavior might be found            
-        if 'eachRule' in locals() and len(eachRule['children']) != 0:
-            deleteRules(eachRule['children'],ruleName)               
+        ruleTree = RuleTree(eachRule)
+        for everyMatchingRule in ruleTree.find(ruleName):
+            #The default rule itself can not be deleted
+            if ruleTree.parentOf(everyMatchingRule) is not None:
+                ruleTree.delete(everyMatchingRule)
 
     #Awesome, we are done updating rules, lets go back
     return parentRule
@@ -139,8 +117,7 @@ def getAllRules(parentRule,allruleNames=[],isChild='optional',parentRuleName='op
     #Default return of empty dict
     return allruleNames
 
-ruleCount = 0
-def getRule(parentRule,ruleName,ruleContent={}):
+def getRule(parentRule,ruleName,ruleContent=None):
     """
     Function to fetch json content of rule
 
@@ -154,21 +131,22 @@ def getRule(parentRule,ruleName,ruleContent={}):
 
     Returns
     -------
-    rule : Json representation of a rule
+    rule : Json representation of a rule, the number of matching rules and
+        the Merkle hash of the rule as found (rulehash), None when nothing matched
     """
-    #Initialize ruleContent only if its empty
-    global ruleCount
+    #Names are compared case-insensitively
+    matchingRules = []
     for eachRule in parentRule:
-        if eachRule['name'].upper() == ruleName.upper():
-            ruleCount += 1
-            ruleContent = eachRule
-        #Check whether we have child rules, where in again behavior might be found
-        if len(eachRule['children']) != 0:
-            ruleContent = getRule(eachRule['children'],ruleName, ruleContent)['ruleContent']
-    #Default return of empty dict
-    return { 'ruleContent': ruleContent, 'ruleCount': ruleCount }
+        ruleTree = RuleTree(eachRule)
+        matchingRules.extend((ruleTree, eachMatch) for eachMatch in ruleTree.find(ruleName, ignoreCase=True))
+    if len(matchingRules) != 0:
+        ruleContent = matchingRules[-1][1]
+    elif ruleContent is None:
+        #Default return of empty dict, a new one per call
+        ruleContent = {}
+    return { 'ruleContent': ruleContent, 'ruleCount': len(matchingRules),
+             'ruleHash': matchingRules[-1][0].hashOf(ruleContent) if matchingRules else None }
 
-occurances = 0
 def insertRule(completeRuleSet,newRuleSet,ruleName='default',whereTo='insertAfter'):
     """
     Function to fetch json content of rule
@@ -185,41 +163,25 @@ def insertRule(completeRuleSet,newRuleSet,ruleName='default',whereTo='insertAfte
     -------
     rule : Json representation of a rule
     """
-    #global variable to preserve count across recursive calls
-    global occurances
     if ruleName == 'default':
         for everyRule in completeRuleSet:
             everyRule['children'].append(newRuleSet)
-        occurances += 1
-    else:
-        positionsList = []
-        for index, eachRule in enumerate(completeRuleSet):
-            if eachRule['name'] == ruleName:
-                if whereTo == 'insertAfter':
-                    position = index + 1
-                elif whereTo == 'insertBefore':
-                    position = index - 1 if index > 0 else 0
-                elif whereTo == 'replace':
-                    position = index
-                #Append the position/index. This is needed to handle multipl
-                #rules with same name.
-                positionsList.append(position)
-                occurances += 1
-            else:
-                #Check whether we have child rules, where in name can be found
-                if len(eachRule['children']) != 0:
-                    insertRule(eachRule['children'],newRuleSet,ruleName,whereTo)
-
-        #Recursion is fun. This code executes in reverse order from stack
-        #This is the place where rule insertion happens
-        if whereTo != 'replace':
-            for everyPosition in positionsList:
-                completeRuleSet.insert(everyPosition,newRuleSet)
-        else:
-            for everyPosition in positionsList:
-                completeRuleSet[everyPosition] = newRuleSet
-
-    return { 'completeRuleSet' : completeRuleSet, 'occurances' : occurances }
+        return { 'completeRuleSet' : completeRuleSet, 'occurances' : 1 }
+
+    ruleTrees = [RuleTree(everyRule) for everyRule in completeRuleSet]
+    matches = [(ruleTree, matchingRule) for ruleTree in ruleTrees for matchingRule in ruleTree.find(ruleName)]
+    #Rule names are not unique, the rule set is only changed for an unambiguous match
+    if len(matches) == 1:
+        ruleTree, matchingRule = matches[0]
+        if whereTo == 'insertAfter':
+            ruleTree.insertAfter(matchingRule, newRuleSet)
+        elif whereTo == 'insertBefore':
+            ruleTree.insertBefore(matchingRule, newRuleSet)
+        elif whereTo == 'replace':
+            ruleTree.replace(matchingRule, newRuleSet)
+            completeRuleSet[ruleTrees.index(ruleTree)] = ruleTree.rules
+
+    return { 'completeRuleSet' : completeRuleSet, 'occurances' : len(matches) }
 
 def JsonRulesToPlainText(completeRuleSet,fileName):
     """
@@ -344,7 +306,7 @@ def ConfigToJsonConverter(inputFilename,outputFilename,ruleName):
                     childRuleName = eachChildRuleName.strip()
                     print(childRuleName)
                     ruleData = singleRule['children'].append(ConfigToJsonConverter(inputFilename, outputFilename, childRuleName))
-                    print(json.dumps(singleRule, indent=4))
+                    print(jsonbackend.dumps(singleRule, pretty=True))
         if 'behaviors' in config.options(ruleName):
             behaviors = config[ruleName]['behaviors'].replace('[','').replace(']','').replace("'",'').split(',')
             #print(behaviors)
@@ -370,7 +332,7 @@ def ConfigToJsonConverter(inputFilename,outputFilename,ruleName):
                     behaviorDetails['options'][eachOptionOfBehavior.split('.')[2]] = optionValue
                 rulebehaviorList.append(behaviorDetails)
             singleRule['behaviors'] = rulebehaviorList
-        #print(json.dumps(singleRule, indent=4))
+        #print(jsonbackend.dumps(singleRule, pretty=True))
 
         return outputRule
 
@@ -386,4 +348,26 @@ def addVariables(existingVariables, newVariables):
     for everyVariable in newVariables:
         existingVariables.append(everyVariable)
 
-    return existingVariables
\ No newline at end of file
+    return existingVariables
+
+def getPropertyDetailsFromLocalStore(propertyName, inventoryFile=INVENTORY_FILE):
+    """
+    Function to find the IDs of a property in the inventory written by papi.py -setup
+
+    Parameters
+    ----------
+    propertyName : <String>
+        Name of the property
+
+    inventoryFile : <String>
+        Path of the inventory database
+
+    Returns
+    -------
+    propertyDetails : <Dictionary> with propertyName, propertyId, contractId and groupId, or None when not found
+    """
+    inventory = Inventory(inventoryFile)
+    try:
+        return inventory.findProperty(propertyName)
+    finally:
+        inventory.close()
@@ -0,0 +1,297 @@
+"""
+Copyright 2021 Akamai Technologies, Inc. All Rights Reserved.
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+
+"""
+Local inventory of an account (contracts, groups, properties, property
+hostnames and edge hostnames) written by papi.py -setup. It is a single
+SQLite database, property name, hostname and edge hostname lookups are
+answered from indexes.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+
+__all__=['Inventory', 'INVENTORY_FILE']
+
+INVENTORY_FILE = os.path.join('setup', 'inventory.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS contracts (
+    contractId TEXT PRIMARY KEY,
+    contractTypeName TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS groups (
+    groupId TEXT NOT NULL,
+    contractId TEXT NOT NULL,
+    groupName TEXT,
+    parentGroupId TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (groupId, contractId)
+);
+CREATE TABLE IF NOT EXISTS products (
+    productId TEXT NOT NULL,
+    contractId TEXT NOT NULL,
+    productName TEXT,
+    PRIMARY KEY (productId, contractId)
+);
+CREATE TABLE IF NOT EXISTS properties (
+    propertyId TEXT PRIMARY KEY,
+    propertyName TEXT NOT NULL,
+    contractId TEXT NOT NULL,
+    groupId TEXT NOT NULL,
+    latestVersion INTEGER,
+    stagingVersion INTEGER,
+    productionVersion INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS propertiesByName ON properties (propertyName);
+CREATE TABLE IF NOT EXISTS hostnames (
+    cnameFrom TEXT NOT NULL,
+    propertyId TEXT NOT NULL,
+    propertyVersion INTEGER,
+    cnameTo TEXT,
+    edgeHostnameId TEXT,
+    PRIMARY KEY (propertyId, cnameFrom)
+);
+CREATE INDEX IF NOT EXISTS hostnamesByName ON hostnames (cnameFrom);
+CREATE INDEX IF NOT EXISTS hostnamesByEdgeHostname ON hostnames (cnameTo);
+CREATE TABLE IF NOT EXISTS edgehostnames (
+    edgeHostnameId TEXT NOT NULL,
+    contractId TEXT NOT NULL,
+    edgeHostnameDomain TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (edgeHostnameId, contractId)
+);
+CREATE INDEX IF NOT EXISTS edgehostnamesByDomain ON edgehostnames (edgeHostnameDomain);
+"""
+
+#Lookups return the same keys as RuleUpdater's property search
+PROPERTY_COLUMNS = 'propertyName, propertyId, contractId, groupId'
+
+
+class Inventory(object):
+    """
+    SQLite inventory of one account. One connection is shared by all
+    threads of a process, writes are grouped in transactions with
+    'with inventory:'.
+    """
+
+    def __init__(self, inventoryFile=INVENTORY_FILE, create=False):
+        self.inventoryFile = inventoryFile
+        self.lock = threading.RLock()
+        self.connection = None
+        if create:
+            folder = os.path.dirname(inventoryFile)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+        if create or os.path.exists(inventoryFile):
+            #Transactions are opened explicitly by 'with inventory:'
+            self.connection = sqlite3.connect(inventoryFile, check_same_thread=False, isolation_level=None)
+            self.connection.row_factory = sqlite3.Row
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        self.lock.acquire()
+        self.connection.execute('BEGIN')
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        try:
+            if excType is None:
+                self.connection.commit()
+            else:
+                self.connection.rollback()
+        finally:
+            self.lock.release()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def query(self, statement, parameters=()):
+        if self.connection is None:
+            return []
+        with self.lock:
+            return self.connection.execute(statement, parameters).fetchall()
+
+    def isPopulated(self, accountKey=''):
+        """
+        Function to check whether setup has completed for the account
+
+        Parameters
+        ----------
+        accountKey : <string>
+            Account switch key the inventory must have been built with
+
+        Returns
+        -------
+        populated : <bool>
+        """
+        rows = self.query("SELECT value FROM meta WHERE key = 'accountKey'")
+        return len(rows) == 1 and rows[0]['value'] == (accountKey or '')
+
+    def clear(self):
+        for table in ['meta', 'contracts', 'groups', 'products', 'properties', 'hostnames', 'edgehostnames']:
+            self.connection.execute('DELETE FROM ' + table)
+
+    def setMeta(self, key, value):
+        self.connection.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (key, value))
+
+    def getMeta(self, key):
+        rows = self.query('SELECT value FROM meta WHERE key = ?', (key,))
+        return rows[0]['value'] if rows else None
+
+    def addContract(self, contract):
+        self.connection.execute('INSERT OR REPLACE INTO contracts VALUES (?, ?, ?)',
+                                (contract['contractId'], contract.get('contractTypeName'), json.dumps(contract)))
+
+    def addGroup(self, group, contractId):
+        self.connection.execute('INSERT OR REPLACE INTO groups VALUES (?, ?, ?, ?, ?)',
+                                (group['groupId'], contractId, group.get('groupName'), group.get('parentGroupId'), json.dumps(group)))
+
+    def addProducts(self, products, contractId):
+        self.connection.executemany('INSERT OR REPLACE INTO products VALUES (?, ?, ?)',
+                                    [(eachProduct['productId'], contractId, eachProduct.get('productName')) for eachProduct in products])
+
+    def addProperty(self, propertyItem):
+        """
+        Function to store an item of the properties listing of a group
+
+        Parameters
+        ----------
+        propertyItem : <dict>
+            Property as returned by getAllProperties
+        """
+        self.connection.execute('INSERT OR REPLACE INTO properties VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                (propertyItem['propertyId'], propertyItem['propertyName'], propertyItem['contractId'],
+                                 propertyItem['groupId'], propertyItem.get('latestVersion'), propertyItem.get('stagingVersion'),
+                                 propertyItem.get('productionVersion'), json.dumps(propertyItem)))
+
+    def setHostnames(self, propertyId, version, hostnames):
+        """
+        Function to replace the hostnames of a property
+
+        Parameters
+        ----------
+        propertyId : <string>
+            Property ID
+        version : <int>
+            Property version the hostnames were listed from
+        hostnames : <List>
+            Items of the listHostnames response
+        """
+        self.connection.execute('DELETE FROM hostnames WHERE propertyId = ?', (propertyId,))
+        self.connection.executemany('INSERT OR REPLACE INTO hostnames VALUES (?, ?, ?, ?, ?)',
+                                    [(eachHostname['cnameFrom'], propertyId, version, eachHostname.get('cnameTo'),
+                                      eachHostname.get('edgeHostnameId')) for eachHostname in hostnames])
+
+    def addEdgeHostname(self, edgeHostname, contractId):
+        self.connection.execute('INSERT OR REPLACE INTO edgehostnames VALUES (?, ?, ?, ?)',
+                                (edgeHostname['edgeHostnameId'], contractId, edgeHostname.get('edgeHostnameDomain'), json.dumps(edgeHostname)))
+
+    @staticmethod
+    def propertyState(propertyItem):
+        """
+        Function to summarize what a properties listing says about a property.
+        A property whose state is unchanged since the last sync is not refetched.
+        hostnamesPending is set on stored properties whose hostnames could not
+        be fetched, it is never in a listing so they are always refetched.
+        """
+        return tuple(propertyItem.get(key) for key in ['propertyName', 'contractId', 'groupId', 'latestVersion',
+                                                       'stagingVersion', 'productionVersion', 'etag', 'hostnamesPending'])
+
+    def propertyStates(self):
+        """
+        Function to get the state of every stored property
+
+        Returns
+        -------
+        states : <dict> of propertyId to propertyState
+        """
+        return {row['propertyId']: self.propertyState(json.loads(row['data']))
+                for row in self.query('SELECT propertyId, data FROM properties')}
+
+    def clearListings(self):
+        """
+        Function to drop the contracts, groups, products and edge hostnames before
+        they are stored again from fresh listings. Properties and hostnames are kept.
+        """
+        for table in ['meta', 'contracts', 'groups', 'products', 'edgehostnames']:
+            self.connection.execute('DELETE FROM ' + table)
+
+    def deleteProperties(self, propertyIds):
+        for propertyId in propertyIds:
+            self.connection.execute('DELETE FROM hostnames WHERE propertyId = ?', (propertyId,))
+            self.connection.execute('DELETE FROM properties WHERE propertyId = ?', (propertyId,))
+
+    def findProperty(self, propertyName):
+        """
+        Function to find the IDs of a property by name
+
+        Parameters
+        ----------
+        propertyName : <string>
+            Name of the property
+
+        Returns
+        -------
+        propertyDetails : <dict> with propertyName, propertyId, contractId and groupId, or None when not found
+        """
+        rows = self.query('SELECT ' + PROPERTY_COLUMNS + ' FROM properties WHERE propertyName = ?', (propertyName,))
+        return dict(rows[0]) if rows else None
+
+    def findPropertiesByHostname(self, hostname):
+        """
+        Function to find the properties serving a hostname
+
+        Returns
+        -------
+        properties : <List> of property details dicts
+        """
+        return [dict(row) for row in self.query('SELECT ' + PROPERTY_COLUMNS + ' FROM properties WHERE propertyId IN '
+                                                '(SELECT propertyId FROM hostnames WHERE cnameFrom = ?) ORDER BY propertyName',
+                                                (hostname,))]
+
+    def findPropertiesByEdgeHostname(self, edgeHostname):
+        """
+        Function to find the properties whose hostnames point to an edge hostname
+
+        Returns
+        -------
+        properties : <List> of property details dicts
+        """
+        return [dict(row) for row in self.query('SELECT ' + PROPERTY_COLUMNS + ' FROM properties WHERE propertyId IN '
+                                                '(SELECT propertyId FROM hostnames WHERE cnameTo = ?) ORDER BY propertyName',
+                                                (edgeHostname,))]
+
+    def findEdgeHostname(self, edgeHostnameDomain):
+        rows = self.query('SELECT data FROM edgehostnames WHERE edgeHostnameDomain = ?', (edgeHostnameDomain,))
+        return json.loads(rows[0]['data']) if rows else None
+
+    def listProperties(self, contractId=None):
+        if contractId is None:
+            rows = self.query('SELECT data FROM properties ORDER BY propertyName, propertyId')
+        else:
+            rows = self.query('SELECT data FROM properties WHERE contractId = ? ORDER BY propertyName, propertyId', (contractId,))
+        return [json.loads(row['data']) for row in rows]
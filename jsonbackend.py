@@ -0,0 +1,117 @@
+"""
+Copyright 2021 Akamai Technologies, Inc. All Rights Reserved.
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+
+"""
+JSON encoding and decoding of rule trees. orjson is used when it is installed,
+the standard json module otherwise. RULEUPDATER_JSON_BACKEND=json forces the
+standard module.
+"""
+
+import json
+import os
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+__all__=['loads', 'dumps', 'dumpBytes', 'setBackend', 'backendName']
+
+backend = None
+
+
+def setBackend(name):
+    """
+    Function to select the JSON backend
+
+    Parameters
+    ----------
+    name : <string>
+        'orjson' or 'json'. 'orjson' falls back to 'json' when it is not installed.
+    """
+    global backend
+    if name == 'orjson' and orjson is not None:
+        backend = 'orjson'
+    else:
+        backend = 'json'
+
+
+def backendName():
+    return backend
+
+
+def loads(data):
+    """
+    Function to decode JSON
+
+    Parameters
+    ----------
+    data : <bytes> or <string>
+        JSON document, e.g. response.content
+
+    Returns
+    -------
+    value : decoded document
+    """
+    if backend == 'orjson':
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumpBytes(value, default=None):
+    """
+    Function to encode JSON compactly as UTF-8, ready to be sent as a request body
+
+    Parameters
+    ----------
+    value : <json serializable>
+        Document to encode
+    default : <function>
+        Called for objects the encoder does not know, as in json.dumps
+
+    Returns
+    -------
+    data : <bytes>
+    """
+    if backend == 'orjson':
+        return orjson.dumps(value, default=default)
+    return json.dumps(value, default=default, separators=(',', ':')).encode('utf-8')
+
+
+def dumps(value, default=None, pretty=False):
+    """
+    Function to encode JSON as text
+
+    Parameters
+    ----------
+    value : <json serializable>
+        Document to encode
+    default : <function>
+        Called for objects the encoder does not know, as in json.dumps
+    pretty : <bool>
+        Indent by 4 spaces, for files and messages read by people
+
+    Returns
+    -------
+    text : <string>
+    """
+    if pretty:
+        #orjson only indents by 2, keep the layout of the files written so far
+        return json.dumps(value, default=default, indent=4)
+    if backend == 'orjson':
+        return orjson.dumps(value, default=default).decode('utf-8')
+    return json.dumps(value, default=default, separators=(',', ':'))
+
+
+setBackend(os.getenv('RULEUPDATER_JSON_BACKEND', 'orjson'))
@@ -0,0 +1,97 @@
+"""
+Copyright 2021 Akamai Technologies, Inc. All Rights Reserved.
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+
+"""
+Request hooks behind --metrics and --trace. Both are registered with
+PapiWrapper.addRequestHook and receive one record per PapiWrapper call;
+MetricsSummary aggregates them per endpoint, TraceWriter appends them to a
+JSON lines file.
+"""
+
+import json
+import threading
+
+
+__all__=['MetricsSummary', 'TraceWriter']
+
+
+class MetricsSummary(object):
+    """
+    Calls, errors, retries, time and bytes per PapiWrapper endpoint
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def __call__(self, record):
+        with self.lock:
+            endpoint = self.endpoints.setdefault(record['endpoint'], {'calls': 0, 'errors': 0, 'retries': 0, 'seconds': 0.0,
+                                                                      'maxSeconds': 0.0, 'requestBytes': 0, 'responseBytes': 0})
+            endpoint['calls'] += 1
+            if record['status'] is None or record['status'] >= 400:
+                endpoint['errors'] += 1
+            endpoint['retries'] += record['retries']
+            endpoint['seconds'] += record['seconds']
+            endpoint['maxSeconds'] = max(endpoint['maxSeconds'], record['seconds'])
+            endpoint['requestBytes'] += record['requestBytes']
+            endpoint['responseBytes'] += record['responseBytes'] or 0
+
+    def table(self, wallSeconds=None):
+        """
+        Function to format the summary, slowest endpoint first
+
+        Parameters
+        ----------
+        wallSeconds : <float>
+            Duration of the command, to show the share of it spent per endpoint
+
+        Returns
+        -------
+        lines : <List> of strings
+        """
+        with self.lock:
+            endpoints = sorted(self.endpoints.items(), key=lambda item: -item[1]['seconds'])
+        lines = ['%-22s %6s %6s %7s %9s %9s %9s %6s %10s %10s' % ('endpoint', 'calls', 'errors', 'retries', 'total s', 'avg ms',
+                                                               'max ms', 'share', 'sent KiB', 'recv KiB')]
+        totals = {'calls': 0, 'errors': 0, 'retries': 0, 'seconds': 0.0, 'maxSeconds': 0.0, 'requestBytes': 0, 'responseBytes': 0}
+        for name, endpoint in endpoints + [('total', totals)]:
+            if name != 'total':
+                for key in totals:
+                    totals[key] = max(totals[key], endpoint[key]) if key == 'maxSeconds' else totals[key] + endpoint[key]
+            share = ('%5.1f%%' % (100 * endpoint['seconds'] / wallSeconds)) if wallSeconds else '-'
+            lines.append('%-22s %6d %6d %7d %9.2f %9.1f %9.1f %6s %10.1f %10.1f' % (
+                name, endpoint['calls'], endpoint['errors'], endpoint['retries'], endpoint['seconds'],
+                1000 * endpoint['seconds'] / max(endpoint['calls'], 1), 1000 * endpoint['maxSeconds'], share,
+                endpoint['requestBytes'] / 1024, endpoint['responseBytes'] / 1024))
+        return lines
+
+
+class TraceWriter(object):
+    """
+    Writes every record as one JSON line, for offline analysis
+    """
+
+    def __init__(self, traceFile):
+        self.lock = threading.Lock()
+        self.traceFileHandler = open(traceFile, 'a')
+
+    def __call__(self, record):
+        line = json.dumps(record) + '\n'
+        with self.lock:
+            self.traceFileHandler.write(line)
+
+    def close(self):
+        with self.lock:
+            self.traceFileHandler.close()
@@ -7,7 +7,7 @@ Initiators: vbhat@akamai.com and aetsai@akamai.com
 
 import json
 from akamai.edgegrid import EdgeGridAuth
-from PapiWrapper import PapiWrapper
+from PapiWrapper import PapiWrapper, createSession
 import argparse
 import configparser
 import requests
@@ -15,8 +15,9 @@ import os
 import logging
 import re
 import ast
-import shutil
 import helper
+from inventory import Inventory, INVENTORY_FILE
+from concurrent.futures import ThreadPoolExecutor
 
 #Setup logging
 if not os.path.exists('logs'):
@@ -46,8 +47,7 @@ try:
     client_secret = config['papi']['client_secret']
     access_token = config['papi']['access_token']
     access_hostname = config['papi']['host']
-    session = requests.Session()
-    session.auth = EdgeGridAuth(
+    auth = EdgeGridAuth(
                 client_token = client_token,
                 client_secret = client_secret,
                 access_token = access_token
@@ -60,8 +60,12 @@ except (NameError, AttributeError, KeyError):
 parser = argparse.ArgumentParser()
 parser.add_argument("-help",help="Use -h for detailed help options",action="store_true")
 parser.add_argument("-setup",help="Setup a local repository of group and property details",action="store_true")
+parser.add_argument("-sync",help="Update the local repository with the properties changed since the last setup or sync",action="store_true")
 parser.add_argument("-create",help="Create a property",action="store_true")
 
+parser.add_argument("-workers",help="Number of parallel API calls during setup (default 8)",type=int,default=8)
+parser.add_argument("-rateLimit",help="Maximum API calls per second across all workers, 0 for no limit (default 10)",type=float,default=10)
+
 parser.add_argument("-debug",help="DEBUG mode to generate additional logs for troubleshooting",action="store_true")
 
 #Activate related arguments
@@ -75,7 +79,7 @@ parser.add_argument("-notes",help="Enter notes related to changes you made start
 args = parser.parse_args()
 
 
-if not args.setup and not args.create and not args.activate:
+if not args.setup and not args.sync and not args.create and not args.activate:
     rootLogger.info("Use -h for help options")
     exit()
 
@@ -84,165 +88,172 @@ if not args.setup and not args.create and not args.activate:
 if args.debug:
     rootLogger.setLevel(logging.DEBUG)
 
-if args.setup:
-    #Delete the setup folder before we start
-    if os.path.exists('setup'):
-        shutil.rmtree('setup')
-    #Create setup folder if it does not exist
-    if not os.path.exists('setup'):
-        os.makedirs('setup')
-    #Create setup/contracts folder if it does not exist
-    contractsFolder = os.path.join('setup','contracts')
-    if not os.path.exists(contractsFolder):
-        os.makedirs(contractsFolder)
-    papiObject = PapiWrapper(access_hostname)
+#One session shared by the setup workers, its connection pool sized to the workers
+workers = max(1, args.workers)
+session = createSession(auth, poolSize=workers, rateLimit=args.rateLimit)
+
+def fetchProducts(contractId):
+    """
+    Function to fetch the products of a contract, runs in a setup worker
+    """
+    return papiObject.listProducts(session, contractId=contractId)
+
+def fetchGroupDetails(everyGroup, contractId):
+    """
+    Function to fetch the properties and edgehostnames of a group in a contract, runs in a setup worker
+
+    Returns
+    -------
+    (propertiesObject, edgehostnameObject) : responses, edgehostnameObject is None for child groups
+    """
+    propertiesObject = papiObject.getAllProperties(session, contractId, everyGroup['groupId'])
+    edgehostnameObject = None
+    #PAPI edgehostname calls to parent groupIDs also give child groupID edgehostnames. To avoid duplication we are using groupID which has no parents
+    if 'parentGroupId' not in everyGroup:
+        edgehostnameObject = papiObject.listEdgeHostnames(session, contractId=contractId, groupId=everyGroup['groupId'])
+    return propertiesObject, edgehostnameObject
+
+def fetchHostnames(everyProperty):
+    """
+    Function to fetch the hostnames of the latest version of a property, runs in a setup worker
+    """
+    return papiObject.listHostnames(session, everyProperty['propertyId'], everyProperty['latestVersion'],
+                                    everyProperty['contractId'], everyProperty['groupId'])
+
+def crawl(inventory, sync=False):
+    """
+    Function to store the account in the inventory
+
+    Parameters
+    ----------
+    inventory : <Inventory>
+        Empty inventory for a full setup, or the current one to sync
+    sync : <bool>
+        Only refetch the hostnames of properties whose listing changed since the last crawl
+    """
     rootLogger.info('Setting up pre-requisites')
     contractsObject = papiObject.getContracts(session)
-    propertiesList = {}
-    if contractsObject.status_code == 200:
-        with open(os.path.join('setup','contracts','contracts.json'),'w') as contractsFile:
-            contractsFile.write(json.dumps(contractsObject.json(), indent = 4))
-        for eachContract in contractsObject.json()['contracts']['items']:
-            contractsName = eachContract['contractTypeName']
-            contractId = eachContract['contractId']
-            propertiesList[contractId] = []
-            #Create contracts folder
-            contractFolder = os.path.join('setup','contracts', contractId)
-            if not os.path.exists(contractFolder):
-                os.makedirs(contractFolder)
-
-            #Create groups folder
-            groupsFolder = os.path.join('setup','contracts',contractId,'groups')
-            if not os.path.exists(groupsFolder):
-                os.makedirs(groupsFolder)
-
-            #Let us find out the products in this contract now
-            productsObject = papiObject.listProducts(session, contractId=contractId)
-            if productsObject.status_code == 200:
-                with open(os.path.join('setup','contracts',contractId,'products.json'),'w') as productsFile:
-                    productsFile.write(json.dumps(productsObject.json(), indent = 4))
-            else:
-                rootLogger.info('WARNING: Unable to fetch products for contract ' + contractId)
-
-            #Create master properties.json file under each contract folder
-            with open(os.path.join('setup','contracts',contractId,'properties.json'),'w') as propertiesFileHandler:
-                #Do Nothing
-                pass
-
-            #Create master edgehostname.json file under each contract folder
-            with open(os.path.join('setup','contracts',contractId,'edgehostnames.json'),'w') as edgehostnameFileHandler:
-                #Do Nothing
-                pass
-
-            #Create master edgehostname.json file under each contract folder
-            with open(os.path.join('setup','contracts',contractId,'groups.json'),'w') as GroupsFileHandler:
-                #Do Nothing
-                pass
-    else:
+    if contractsObject.status_code != 200:
         rootLogger.info('Unable to fetch Contract related info, use -debug option to know more')
         rootLogger.debug(json.dumps(contractsObject.json(), indent = 4))
+        exit()
+    contracts = contractsObject.json()['contracts']['items']
+    contractIds = [eachContract['contractId'] for eachContract in contracts]
 
-    #Lets now move towards groups
     #Groups API call does not take contractId, so some advanced logic to parse response
     groupsObject = papiObject.getGroups(session)
-    if groupsObject.status_code == 200:
-        #rootLogger.info(json.dumps(groupsObject.json(), indent = 4))
-        for everyGroup in groupsObject.json()['groups']['items']:
+    if groupsObject.status_code != 200:
+        rootLogger.info('Unable to fetch group related information')
+        exit()
+    groupContracts = []
+    for everyGroup in groupsObject.json()['groups']['items']:
+        if 'contractIds' in everyGroup:
+            for everyContract in everyGroup['contractIds']:
+                if everyContract in contractIds:
+                    groupContracts.append((everyGroup, everyContract))
+        else:
+            rootLogger.info('Ignoring  Group: ' + everyGroup['groupName'] + ' as it is not associated to any Contract' )
+
+    storedStates = inventory.propertyStates() if sync else {}
+    listedPropertyIds = set()
+    failedGroups = False
+    #All calls go through one pooled session, the rate limit is shared by the workers.
+    #Responses are stored by this thread in the order of the groups response
+    rootLogger.info('Fetching ' + str(len(contractIds)) + ' contracts and ' + str(len(groupContracts)) + ' groups with ' + str(workers) + ' workers')
+    with ThreadPoolExecutor(max_workers=workers) as executor, inventory:
+        productsFutures = [executor.submit(fetchProducts, contractId) for contractId in contractIds]
+        groupFutures = [executor.submit(fetchGroupDetails, everyGroup, contractId) for everyGroup, contractId in groupContracts]
+        if sync:
+            inventory.clearListings()
+
+        for eachContract, productsFuture in zip(contracts, productsFutures):
+            inventory.addContract(eachContract)
+            #Let us find out the products in this contract now
+            productsObject = productsFuture.result()
+            if productsObject.status_code == 200:
+                inventory.addProducts(productsObject.json()['products']['items'], eachContract['contractId'])
+            else:
+                rootLogger.info('WARNING: Unable to fetch products for contract ' + eachContract['contractId'])
+
+        hostnameFutures = []
+        for (everyGroup, contractId), groupFuture in zip(groupContracts, groupFutures):
             groupName = everyGroup['groupName']
             groupId = everyGroup['groupId']
-            rootLogger.info('-------------- *************** --------------')
-            rootLogger.info('Processing group: ' + groupName)
-            if 'contractIds' in everyGroup:
-                for everyContract in everyGroup['contractIds']:
-                    #Logic to extract group info and move it to right contract folder
-                    contractId = everyContract
-                    try:
-                        #Update the master groups file
-                        with open(os.path.join('setup','contracts',contractId,'groups.json'),'a') as GroupsFileHandler:
-                            GroupsFileHandler.write(json.dumps(everyGroup, indent = 4))
-                        #Create individual groups file
-                        groupFile = groupName + '.json'
-                        with open(os.path.join('setup','contracts',contractId,'groups',groupFile), 'w') as groupFileHandler:
-                            groupFileHandler.write(json.dumps(everyGroup, indent = 4))
-                    except FileNotFoundError:
-                        rootLogger.info('Unable to write file ' + groupName + '.json')
-
-                    #Lets now move to create properties folder
-                    #Logic to extract properties info and move it to right contract folder
-                    propertiesFolder = os.path.join('setup','contracts',contractId,'properties')
-                    if not os.path.exists(propertiesFolder):
-                        os.makedirs(propertiesFolder)
-                    rootLogger.info('Fetching Properties info of group: ' + groupName)
-                    propertiesObject = papiObject.getAllProperties(session, contractId, groupId)
-
-                    if propertiesObject.status_code == 200:
-                        #Remove the unwanted data
-                        for everyProperty in propertiesObject.json()['properties']['items']:
-                            if 'accountId' in everyProperty: del everyProperty['accountId']
-                            if 'latestVersion' in everyProperty: del everyProperty['latestVersion']
-                            if 'stagingVersion' in everyProperty: del everyProperty['stagingVersion']
-                            if 'productionVersion' in everyProperty: del everyProperty['productionVersion']
-                            if 'note' in everyProperty: del everyProperty['note']
-
-                            propertyName = everyProperty['propertyName']
-                            propertyFile = everyProperty['propertyName'] + '.json'
-                            try:
-                                with open(os.path.join(propertiesFolder,propertyFile), 'w') as propertyFileHandler:
-                                    propertyFileHandler.write(json.dumps(everyProperty, indent = 4))
-                            except FileNotFoundError:
-                                rootLogger.info('Unable to write file ' + propertyName + '.json')
-                            #Update the propertiesList list with property details
-                            propertiesList[contractId].append(everyProperty)
-                    else:
-                        rootLogger.info('Unable to fetch properties info for group: ' + groupId + ' contract: ' + contractId)
-
-                    #Let us now focus on edgehostnames
-                    edgehostnamesFolder = os.path.join('setup','contracts',contractId,'edgehostnames')
-                    #PAPI edgehostname calls to parent groupIDs also give child groupID edgehostnames. To avoid duplication we are using groupID which has no parents   
-                    if 'parentGroupId' not in everyGroup:
-                        print ("Master groupID is ",groupId)
-                        if not os.path.exists(edgehostnamesFolder):
-                            os.makedirs(edgehostnamesFolder)
-                        rootLogger.info('Fetching EdgeHostname details under group: ' + groupName)
-                        edgehostnameObject = papiObject.listEdgeHostnames(session, contractId=contractId, groupId=groupId)
-                        if edgehostnameObject.status_code == 200:
-                            for everyEdgeHostNameDetail in edgehostnameObject.json()['edgeHostnames']['items']:
-                                edgeHostnameDomain = everyEdgeHostNameDetail['edgeHostnameDomain']
-                                edgehostnameFile = everyEdgeHostNameDetail['edgeHostnameDomain'] + '.json'
-                                try:
-                                    edgehostnamesFile = groupName + '.json'
-                                    with open(os.path.join(edgehostnamesFolder,edgehostnameFile), 'w') as edgehostnameFileHandler:
-                                        edgehostnameFileHandler.write(json.dumps(everyEdgeHostNameDetail, indent = 4))
-                                except FileNotFoundError:
-                                    rootLogger.info('Unable to write file ' + edgeHostnameDomain + '.json')
-                                #Update the master edgehostname.json file under each contract
-                                with open(os.path.join('setup','contracts',contractId,'edgehostnames.json'),'a') as edgehostnamesFileHandler:
-                                    edgehostnamesFileHandler.write(',')
-                                    edgehostnamesFileHandler.write(json.dumps(everyEdgeHostNameDetail, indent = 4))
-                                    edgehostnamesFileHandler.write(',')
-                        else:
-                            rootLogger.info('Unable to retrieve edgehostname details under group: ' + groupName + ' contract: ' + contractId)
+            rootLogger.info('Processing group: ' + groupName + ' contract: ' + contractId)
+            inventory.addGroup(everyGroup, contractId)
+
+            propertiesObject, edgehostnameObject = groupFuture.result()
+            if propertiesObject.status_code == 200:
+                for everyProperty in propertiesObject.json()['properties']['items']:
+                    everyProperty.pop('accountId', None)
+                    listedPropertyIds.add(everyProperty['propertyId'])
+                    if storedStates.get(everyProperty['propertyId']) == inventory.propertyState(everyProperty):
+                        continue
+                    #A property is stored once its hostnames are, so its state only matches when both are current
+                    if everyProperty.get('latestVersion'):
+                        hostnameFutures.append((everyProperty, executor.submit(fetchHostnames, everyProperty)))
                     else:
-                        rootLogger.info('Couldnt find master group ID')        
-                rootLogger.info('-------------- *************** --------------\n\n')
+                        inventory.addProperty(everyProperty)
             else:
-                rootLogger.info('Ignoring  Group: ' + groupName + ' as it is not associated to any Contract' )
+                failedGroups = True
+                rootLogger.info('Unable to fetch properties info for group: ' + groupId + ' contract: ' + contractId)
+
+            if edgehostnameObject is None:
+                continue
+            if edgehostnameObject.status_code == 200:
+                for everyEdgeHostNameDetail in edgehostnameObject.json()['edgeHostnames']['items']:
+                    inventory.addEdgeHostname(everyEdgeHostNameDetail, contractId)
+            else:
+                rootLogger.info('Unable to retrieve edgehostname details under group: ' + groupName + ' contract: ' + contractId)
+
+        rootLogger.info('Fetching hostnames of ' + str(len(hostnameFutures)) + ' properties')
+        for everyProperty, hostnameFuture in hostnameFutures:
+            hostnameObject = hostnameFuture.result()
+            if hostnameObject.status_code == 200:
+                inventory.setHostnames(everyProperty['propertyId'], everyProperty['latestVersion'], hostnameObject.json()['hostnames']['items'])
+                inventory.addProperty(everyProperty)
+            else:
+                rootLogger.info('Unable to fetch hostnames of property: ' + everyProperty['propertyName'])
+                #Stored as pending, its state differs from the listing and the next sync fetches the hostnames again
+                inventory.addProperty(dict(everyProperty, hostnamesPending=True))
+
+        if sync:
+            #A group that could not be listed does not mean its properties were deleted
+            removedPropertyIds = [] if failedGroups else sorted(set(storedStates) - listedPropertyIds)
+            inventory.deleteProperties(removedPropertyIds)
+            rootLogger.info(str(len(hostnameFutures)) + ' properties added or changed, ' + str(len(removedPropertyIds)) + ' removed, '
+                            + str(len(listedPropertyIds) - len(hostnameFutures)) + ' unchanged')
+        #Marks the inventory as complete
+        inventory.setMeta('accountKey', '')
+
+if args.setup or args.sync:
+    papiObject = PapiWrapper(access_hostname)
 
-        #Update the master propeties.json file under each contract
-        for contractItem in propertiesList:
-            with open(os.path.join('setup','contracts',contractItem,'properties.json'),'w') as propertiesFileHandler:
-                propertiesFileHandler.write(json.dumps(propertiesList[contractItem], indent = 4))
+if args.sync and os.path.exists(INVENTORY_FILE):
+    inventory = Inventory(INVENTORY_FILE)
+    if inventory.isPopulated():
+        crawl(inventory, sync=True)
+        inventory.close()
+        rootLogger.info('Sync complete, inventory updated in ' + INVENTORY_FILE)
     else:
-        rootLogger.info('Unable to fetch group related information')
+        inventory.close()
+        rootLogger.info('Inventory is incomplete, running a full setup')
+        args.setup = True
+elif args.sync:
+    rootLogger.info('No inventory found, running a full setup')
+    args.setup = True
 
-    #Remove the last comma in the master files
-    for (dirPath, dirNames, filenames) in os.walk(os.getcwd()):
-        for everyFilename in filenames:
-            if everyFilename == 'properties.json' or everyFilename == 'edgehostname.json':
-                with open(os.path.join('setup','contracts',contractId,everyFilename),'r+') as masterFileHandler:
-                    masterFileContent = masterFileHandler.read().rstrip(',')
-                    masterFileContent = masterFileHandler.read().lstrip(',')
-                    masterFileHandler.write(masterFileContent)
+if args.setup:
+    #The inventory is built next to the current one and swapped in when complete,
+    #an interrupted setup leaves the previous inventory usable
+    newInventoryFile = INVENTORY_FILE + '.new'
+    if os.path.exists(newInventoryFile):
+        os.remove(newInventoryFile)
+    inventory = Inventory(newInventoryFile, create=True)
+    crawl(inventory)
+    inventory.close()
+    os.replace(newInventoryFile, INVENTORY_FILE)
+    rootLogger.info('Setup complete, inventory written to ' + INVENTORY_FILE)
 
 if args.create:
     try:
@@ -332,7 +343,7 @@ if args.create:
 
 #Property Activation Code
 if args.activate:
-    if not os.path.exists('setup'):
+    if not os.path.exists(INVENTORY_FILE):
         rootLogger.info('Please run -setup before activating a config')
         exit()
 
@@ -0,0 +1,218 @@
+"""
+Copyright 2021 Akamai Technologies, Inc. All Rights Reserved.
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+
+"""
+CPU and memory profile of one command, behind --profile. cProfile records the
+calling thread, a sampling thread records the stacks of all threads for a
+collapsed-stack (flamegraph) file, and tracemalloc records allocations, with
+a snapshot taken whenever traced memory reaches a new peak.
+
+Samples and allocations are put in phases by the innermost frame that lies in
+one of the functions (or classes, modules) listed for a phase; anything else
+is the default phase.
+"""
+
+import cProfile
+import inspect
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+
+__all__=['CommandProfiler']
+
+#Innermost frames of threads blocked on a lock or queue, their samples are left out
+IDLE_FRAMES = ['threading.py:wait', 'threading.py:_wait_for_tstate_lock', 'queue.py:get']
+
+
+class CommandProfiler(object):
+    """
+    Profiles the code run between start() and stop(), write() saves
+    NAME.pstats, NAME.collapsed and NAME.txt (phases and top allocations)
+    """
+
+    def __init__(self, phases, defaultPhase='other', interval=0.005, top=25, traceFrames=32):
+        """
+        Parameters
+        ----------
+        phases : <dict>
+            Phase name to a list of functions, classes or modules making up the phase
+        defaultPhase : <string>
+            Phase of the code in none of them
+        interval : <float>
+            Seconds between stack samples
+        top : <int>
+            Number of allocation sites and functions listed in the report
+        traceFrames : <int>
+            Frames kept by tracemalloc per allocation
+        """
+        self.defaultPhase = defaultPhase
+        self.phaseNames = list(phases) + [defaultPhase]
+        self.interval = interval
+        self.top = top
+        self.traceFrames = traceFrames
+        self.ranges = {}
+        for phase, objects in phases.items():
+            for eachObject in objects:
+                eachObject = inspect.unwrap(eachObject)
+                try:
+                    lines, start = inspect.getsourcelines(eachObject)
+                    fileName = os.path.realpath(inspect.getsourcefile(eachObject))
+                except (OSError, TypeError):
+                    continue
+                self.ranges.setdefault(fileName, []).append((max(start, 1), max(start, 1) + len(lines) - 1, phase))
+        self.realpaths = {}
+        self.profile = cProfile.Profile()
+        self.stopped = threading.Event()
+        self.samples = Counter()
+        self.phaseSeconds = Counter()
+        self.phaseGrowth = Counter()
+        self.peakSnapshot = None
+        self.peakSize = 0
+        self.ticks = 0
+        self.sampler = None
+
+    def phaseOf(self, fileName, lineNumber):
+        """
+        Function to find the phase of a code location, None when it is in no phase
+        """
+        if fileName not in self.realpaths:
+            self.realpaths[fileName] = os.path.realpath(fileName)
+        #The innermost (shortest) matching range wins, e.g. a method within a listed class
+        match = None
+        for start, end, phase in self.ranges.get(self.realpaths[fileName], []):
+            if start <= lineNumber <= end and (match is None or end - start < match[1] - match[0]):
+                match = (start, end, phase)
+        return match[2] if match else None
+
+    def framePhase(self, frames):
+        """
+        Function to find the phase of a stack, frames are (fileName, lineNumber) innermost first
+        """
+        for fileName, lineNumber in frames:
+            phase = self.phaseOf(fileName, lineNumber)
+            if phase is not None:
+                return phase
+        return self.defaultPhase
+
+    def start(self):
+        self.thread = threading.get_ident()
+        self.started = time.time()
+        tracemalloc.start(self.traceFrames)
+        self.lastTraced = tracemalloc.get_traced_memory()[0]
+        self.sampler = threading.Thread(target=self.sample, name='profiler', daemon=True)
+        self.sampler.start()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self.stopped.set()
+        self.sampler.join()
+        self.elapsed = time.time() - self.started
+        self.endSnapshot = tracemalloc.take_snapshot()
+        self.peakTraced = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    def sample(self):
+        samplerThread = threading.get_ident()
+        lastTick = time.perf_counter()
+        while not self.stopped.wait(self.interval):
+            self.ticks += 1
+            #A sample stands for the time since the previous one, which is longer than the
+            #interval when a C call (e.g. JSON decoding) held the GIL
+            now = time.perf_counter()
+            weight = now - lastTick
+            lastTick = now
+            threadPhase = self.defaultPhase
+            for thread, frame in sys._current_frames().items():
+                if thread == samplerThread:
+                    continue
+                names = []
+                locations = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(os.path.basename(code.co_filename) + ':' + code.co_name)
+                    locations.append((code.co_filename, frame.f_lineno))
+                    frame = frame.f_back
+                if names and names[0] in IDLE_FRAMES:
+                    continue
+                phase = self.framePhase(locations)
+                self.samples[phase + ';' + ';'.join(reversed(names))] += weight
+                self.phaseSeconds[phase] += weight
+                if thread == self.thread:
+                    threadPhase = phase
+            #Memory growth goes to the phase of the profiled thread
+            current = tracemalloc.get_traced_memory()[0]
+            if current > self.lastTraced:
+                self.phaseGrowth[threadPhase] += current - self.lastTraced
+            self.lastTraced = current
+            #Snapshot the allocations of a new peak, at most one per 10% of growth
+            if current > max(1024 * 1024, self.peakSize * 1.1):
+                self.peakSnapshot = tracemalloc.take_snapshot()
+                self.peakSize = current
+
+    def allocationLines(self, snapshot, title):
+        lines = ['', title, '%10s %9s  %-10s %s' % ('KiB', 'blocks', 'phase', 'allocated at (innermost first)')]
+        if snapshot is None:
+            return lines + ['  none']
+        #Leave out the allocations of the profiler itself
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)])
+        for statistic in snapshot.statistics('traceback')[:self.top]:
+            frames = [(eachFrame.filename, eachFrame.lineno) for eachFrame in reversed(statistic.traceback)]
+            lines.append('%10.1f %9d  %-10s %s' % (statistic.size / 1024, statistic.count, self.framePhase(frames),
+                                                   ' <- '.join(os.path.basename(fileName) + ':' + str(lineNumber)
+                                                               for fileName, lineNumber in frames[:4])))
+        return lines
+
+    def write(self, baseName):
+        """
+        Function to write the profile files
+
+        Parameters
+        ----------
+        baseName : <string>
+            Path and name of the files without extension
+
+        Returns
+        -------
+        files : <List> of the files written
+        """
+        self.profile.dump_stats(baseName + '.pstats')
+
+        with open(baseName + '.collapsed', 'w') as collapsedFileHandler:
+            #Weights are written in milliseconds
+            for stack, seconds in sorted(self.samples.items()):
+                collapsedFileHandler.write(stack + ' ' + str(max(1, int(round(seconds * 1000)))) + '\n')
+
+        totalSeconds = max(sum(self.phaseSeconds.values()), 1e-9)
+        lines = ['Profile of %.2fs, %d samples of all threads, peak traced memory %.1f MiB'
+                 % (self.elapsed, self.ticks, self.peakTraced / 1024 / 1024),
+                 '', '%-10s %9s %7s %12s' % ('phase', 'seconds', 'share', 'growth MiB')]
+        for phase in self.phaseNames:
+            lines.append('%-10s %9.2f %6.1f%% %12.1f' % (phase, self.phaseSeconds[phase], 100.0 * self.phaseSeconds[phase] / totalSeconds,
+                                                       self.phaseGrowth[phase] / 1024 / 1024))
+        lines.extend(self.allocationLines(self.peakSnapshot, 'Top ' + str(self.top) + ' allocations at peak'))
+        lines.extend(self.allocationLines(self.endSnapshot, 'Top ' + str(self.top) + ' allocations still held at the end'))
+
+        statsStream = io.StringIO()
+        pstats.Stats(self.profile, stream=statsStream).sort_stats('cumulative').print_stats(self.top)
+        lines.extend(['', 'Top ' + str(self.top) + ' functions by cumulative time (profiled thread)', statsStream.getvalue()])
+        with open(baseName + '.txt', 'w') as reportFileHandler:
+            reportFileHandler.write('\n'.join(lines) + '\n')
+        return [baseName + '.pstats', baseName + '.collapsed', baseName + '.txt']
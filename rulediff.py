@@ -0,0 +1,232 @@
+"""
+Copyright 2021 Akamai Technologies, Inc. All Rights Reserved.
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+
+"""
+Structural diff of two rule trees, used by the diff command. Rules are
+matched by their path of names from the default rule (siblings sharing a name
+are told apart by their occurrence, 'Name#2'). Identical subtrees are
+recognized by their Merkle hash (rulehash) and skipped. A rule that disappears in one place and
+appears in another, with the same content or the same unique name, is
+reported as moved.
+"""
+
+import json
+from RuleTree import RuleTree
+from rulehash import canonicalJson
+
+
+__all__=['diffRules', 'formatChanges']
+
+PATH_SEPARATOR = ' --> '
+
+
+def keyedByName(items):
+    """
+    Function to key rules, behaviors or variables by name, repeated names get #2, #3 ...
+
+    Returns
+    -------
+    items : <dict> of key to item, in the order of the list
+    """
+    keyed = {}
+    counts = {}
+    for eachItem in items:
+        name = eachItem.get('name', '')
+        counts[name] = counts.get(name, 0) + 1
+        keyed[name if counts[name] == 1 else name + '#' + str(counts[name])] = eachItem
+    return keyed
+
+
+def flatten(value, prefix=''):
+    """
+    Function to flatten nested options into dotted keys, lists are compared as a whole
+    """
+    if isinstance(value, dict):
+        flat = {}
+        for key, eachValue in value.items():
+            flat.update(flatten(eachValue, prefix + key + '.'))
+        return flat
+    return {prefix.rstrip('.'): value}
+
+
+def valueChanges(label, oldValue, newValue):
+    """
+    Function to list the differences of two option objects
+
+    Returns
+    -------
+    details : <List> of (sign, text) with sign '+', '-' or '~'
+    """
+    oldFlat = flatten(oldValue) if oldValue is not None else {}
+    newFlat = flatten(newValue) if newValue is not None else {}
+    details = []
+    for key in list(oldFlat) + [key for key in newFlat if key not in oldFlat]:
+        name = label + ('.' + key if key else '')
+        if key not in newFlat:
+            details.append(('-', name + ': ' + json.dumps(oldFlat[key])))
+        elif key not in oldFlat:
+            details.append(('+', name + ': ' + json.dumps(newFlat[key])))
+        #Compared as canonical JSON, as the subtree hashes are: true is not 1
+        elif canonicalJson(oldFlat[key]) != canonicalJson(newFlat[key]):
+            details.append(('~', name + ': ' + json.dumps(oldFlat[key]) + ' -> ' + json.dumps(newFlat[key])))
+    return details
+
+
+def featureChanges(kind, oldFeatures, newFeatures):
+    """
+    Function to list the differences of the behaviors or criteria of a rule
+    """
+    oldKeyed = keyedByName(oldFeatures)
+    newKeyed = keyedByName(newFeatures)
+    details = []
+    for key in list(oldKeyed) + [key for key in newKeyed if key not in oldKeyed]:
+        if key not in newKeyed:
+            details.append(('-', kind + ' ' + key))
+        elif key not in oldKeyed:
+            details.append(('+', kind + ' ' + key))
+        else:
+            details.extend(valueChanges(kind + ' ' + key, oldKeyed[key].get('options'), newKeyed[key].get('options')))
+    if not details and [eachFeature['name'] for eachFeature in oldFeatures] != [eachFeature['name'] for eachFeature in newFeatures]:
+        details.append(('~', kind + ' order'))
+    return details
+
+
+def ruleChanges(oldRule, newRule):
+    """
+    Function to list the differences of two rules, not looking at their children
+    """
+    details = featureChanges('criteria', oldRule.get('criteria', []), newRule.get('criteria', []))
+    details.extend(featureChanges('behavior', oldRule.get('behaviors', []), newRule.get('behaviors', [])))
+    if 'variables' in oldRule or 'variables' in newRule:
+        oldVariables = keyedByName(oldRule.get('variables', []))
+        newVariables = keyedByName(newRule.get('variables', []))
+        for key in list(oldVariables) + [key for key in newVariables if key not in oldVariables]:
+            details.extend(valueChanges('variable ' + key, oldVariables.get(key), newVariables.get(key)))
+    for key in list(oldRule) + [key for key in newRule if key not in oldRule]:
+        if key in ('name', 'children', 'behaviors', 'criteria', 'variables'):
+            continue
+        details.extend(valueChanges(key, oldRule.get(key), newRule.get(key)))
+    return details
+
+
+def diffRules(oldRules, newRules):
+    """
+    Function to diff two rule trees
+
+    Parameters
+    ----------
+    oldRules : <dict>
+        Default rule of the old version
+    newRules : <dict>
+        Default rule of the new version
+
+    Returns
+    -------
+    changes : <List> of dicts with change (added, removed, moved or modified),
+        path, oldPath for moved rules and details, a list of (sign, text)
+    """
+    return diffTrees(oldRules, newRules, RuleTree(oldRules), RuleTree(newRules))
+
+
+def diffTrees(oldRules, newRules, oldTree, newTree):
+    """
+    Function to diff two rule trees, oldTree and newTree keep the subtree
+    hashes of both once computed
+    """
+    changes = []
+    removed = []
+    added = []
+
+    stack = [(oldRules, newRules, [newRules['name']])]
+    while stack:
+        oldRule, newRule, path = stack.pop()
+        if oldTree.hashOf(oldRule) == newTree.hashOf(newRule):
+            continue
+        details = ruleChanges(oldRule, newRule)
+        oldChildren = keyedByName(oldRule.get('children', []))
+        newChildren = keyedByName(newRule.get('children', []))
+        common = [key for key in oldChildren if key in newChildren]
+        if common != [key for key in newChildren if key in oldChildren]:
+            details.append(('~', 'children order'))
+        if details:
+            changes.append({'change': 'modified', 'path': PATH_SEPARATOR.join(path), 'details': details})
+        for key in oldChildren:
+            if key not in newChildren:
+                removed.append((oldChildren[key], path + [key]))
+        for key in newChildren:
+            if key not in oldChildren:
+                added.append((newChildren[key], path + [key]))
+        for key in reversed(common):
+            stack.append((oldChildren[key], newChildren[key], path + [key]))
+
+    #A removed rule that shows up elsewhere was moved, first match identical subtrees, then unique names
+    removedByHash = {}
+    for eachRemoved in removed:
+        removedByHash.setdefault(oldTree.hashOf(eachRemoved[0]), []).append(eachRemoved)
+    moves = []
+    remainingAdded = []
+    for newRule, newPath in added:
+        candidates = removedByHash.get(newTree.hashOf(newRule))
+        if candidates:
+            oldRule, oldPath = candidates.pop(0)
+            moves.append((oldRule, oldPath, newRule, newPath))
+        else:
+            remainingAdded.append((newRule, newPath))
+    movedIds = {id(eachMove[0]) for eachMove in moves}
+    remainingRemoved = [eachRemoved for eachRemoved in removed if id(eachRemoved[0]) not in movedIds]
+    removedNames = [eachRemoved[0]['name'] for eachRemoved in remainingRemoved]
+    addedNames = [eachAdded[0]['name'] for eachAdded in remainingAdded]
+    for newRule, newPath in list(remainingAdded):
+        if addedNames.count(newRule['name']) == 1 and removedNames.count(newRule['name']) == 1:
+            oldRule, oldPath = remainingRemoved[removedNames.index(newRule['name'])]
+            moves.append((oldRule, oldPath, newRule, newPath))
+    movedIds = {id(eachMove[0]) for eachMove in moves} | {id(eachMove[2]) for eachMove in moves}
+
+    for oldRule, oldPath, newRule, newPath in moves:
+        details = []
+        if oldTree.hashOf(oldRule) != newTree.hashOf(newRule):
+            #Compare the moved subtree in its new place
+            for eachChange in diffTrees(oldRule, newRule, oldTree, newTree):
+                eachChange['path'] = PATH_SEPARATOR.join(newPath[:-1] + [eachChange['path']])
+                if 'oldPath' in eachChange:
+                    eachChange['oldPath'] = PATH_SEPARATOR.join(oldPath[:-1] + [eachChange['oldPath']])
+                changes.append(eachChange)
+        changes.append({'change': 'moved', 'path': PATH_SEPARATOR.join(newPath), 'oldPath': PATH_SEPARATOR.join(oldPath), 'details': details})
+    for oldRule, oldPath in removed:
+        if id(oldRule) not in movedIds:
+            changes.append({'change': 'removed', 'path': PATH_SEPARATOR.join(oldPath), 'details': []})
+    for newRule, newPath in added:
+        if id(newRule) not in movedIds:
+            changes.append({'change': 'added', 'path': PATH_SEPARATOR.join(newPath), 'details': []})
+    return changes
+
+
+def formatChanges(changes):
+    """
+    Function to print changes one per line, details indented below their rule
+
+    Returns
+    -------
+    lines : <List> of strings
+    """
+    signs = {'added': '+', 'removed': '-', 'modified': '~', 'moved': '>'}
+    lines = []
+    for eachChange in changes:
+        if eachChange['change'] == 'moved':
+            lines.append('> ' + eachChange['oldPath'] + '  =>  ' + eachChange['path'])
+        else:
+            lines.append(signs[eachChange['change']] + ' ' + eachChange['path'])
+        for sign, text in eachChange['details']:
+            lines.append('    ' + sign + ' ' + text)
+    return lines
@@ -0,0 +1,109 @@
+"""
+Copyright 2021 Akamai Technologies, Inc. All Rights Reserved.
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+
+"""
+Canonical serialization and Merkle hashes of rule trees. The canonical form
+of a value sorts object keys, writes integral numbers the same whether they
+came as 1 or 1.0 and normalizes text to Unicode NFC, so two rules that PAPI
+treats alike serialize alike whatever order or backend produced them.
+
+The hash of a rule covers its own keys in canonical form followed by the
+hashes of its children in order, so two rules (of any property or version)
+are the same, children included, exactly when their hashes are. RuleTree.hashOf
+hashes a tree bottom-up, each rule serialized once, and keeps the hashes with
+its index until an edit through the tree changes the rule.
+"""
+
+import hashlib
+import json
+import unicodedata
+from collections.abc import Mapping
+
+
+__all__=['canonical', 'canonicalJson', 'hashSubtree', 'ruleHash']
+
+
+def canonical(value):
+    """
+    Function to normalize a value of a rule tree: nodes become dicts, integral
+    floats become ints and strings are NFC normalized
+    """
+    if isinstance(value, Mapping):
+        return {unicodedata.normalize('NFC', key): canonical(eachValue) for key, eachValue in value.items()}
+    if isinstance(value, list):
+        return [canonical(eachValue) for eachValue in value]
+    if isinstance(value, str):
+        return unicodedata.normalize('NFC', value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def canonicalJson(value):
+    """
+    Function to serialize a rule (or any part of a rule tree) canonically
+
+    Returns
+    -------
+    json : <bytes> UTF-8, sorted keys and no whitespace
+    """
+    #The standard module is used whatever jsonbackend is set to, so hashes do not depend on it
+    return json.dumps(canonical(value), sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def hashSubtree(rule, hashes):
+    """
+    Function to hash a rule with its children, bottom-up in a single pass
+
+    Parameters
+    ----------
+    rule : <dict>
+        Rule, a dict or a RuleNode
+    hashes : <dict>
+        id(rule) to hash of the rules hashed already, which are not hashed
+        again. The hashes of the rules below rule are added to it.
+
+    Returns
+    -------
+    hash : <string> hex digest of the rule with all its children
+    """
+    #Post-order walk, a rule is hashed once all its children are
+    stack = [(rule, False)]
+    while stack:
+        eachRule, childrenDone = stack.pop()
+        if id(eachRule) in hashes:
+            continue
+        children = eachRule.get('children', [])
+        if not childrenDone:
+            stack.append((eachRule, True))
+            stack.extend((eachChild, False) for eachChild in children)
+            continue
+        digest = hashlib.sha1(canonicalJson({key: eachRule[key] for key in eachRule if key != 'children'}))
+        for eachChild in children:
+            digest.update(bytes.fromhex(hashes[id(eachChild)]))
+        hashes[id(eachRule)] = digest.hexdigest()
+    return hashes[id(rule)]
+
+
+def ruleHash(rule):
+    """
+    Function to hash one rule with its children
+
+    Returns
+    -------
+    hash : <string> hex digest, None for an empty rule
+    """
+    if not rule:
+        return None
+    return hashSubtree(rule, {})
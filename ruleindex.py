@@ -0,0 +1,279 @@
+"""
+Copyright 2021 Akamai Technologies, Inc. All Rights Reserved.
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+
+"""
+Inverted index of the rule trees in the rule tree cache, used by the search
+command. Each distinct tree (by content hash, as in RuleTreeCache) is indexed
+once: every rule name, behavior and criteria name and flattened
+(behavior/criteria, option, value) of a rule becomes a posting pointing to
+the rule's position in the tree. Queries of rulequery are answered with
+index lookups instead of walking the tree.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import jsonbackend
+from rulequery import optionValues, isWildcard
+
+
+__all__=['RuleIndex']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trees (
+    treeHash TEXT PRIMARY KEY,
+    ruleCount INTEGER NOT NULL,
+    indexed REAL
+);
+CREATE TABLE IF NOT EXISTS rules (
+    treeHash TEXT NOT NULL,
+    rulePos INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (treeHash, rulePos)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postings (
+    kind TEXT NOT NULL,
+    name TEXT,
+    option TEXT,
+    value TEXT,
+    treeHash TEXT NOT NULL,
+    rulePos INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS postingsByTree ON postings (treeHash, kind, name);
+CREATE INDEX IF NOT EXISTS postingsByName ON postings (kind, name, option, value);
+CREATE INDEX IF NOT EXISTS postingsByValue ON postings (value);
+CREATE TABLE IF NOT EXISTS versions (
+    propertyId TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    propertyName TEXT,
+    treeHash TEXT NOT NULL,
+    PRIMARY KEY (propertyId, version)
+);
+CREATE INDEX IF NOT EXISTS versionsByTree ON versions (treeHash);
+"""
+
+#Rule paths are written as by the search command
+PATH_SEPARATOR = ' --> '
+
+
+def match(column, pattern):
+    """
+    Function to form the SQL condition matching a lower case pattern, wildcards use GLOB
+    """
+    if isWildcard(pattern):
+        return column + ' GLOB ?', [pattern]
+    return column + ' = ?', [pattern]
+
+
+def termCondition(node):
+    """
+    Function to translate a parsed rulequery term into a condition on postings
+
+    Returns
+    -------
+    (condition, parameters) : SQL condition and its parameters
+    """
+    _, kind, name, option, value = node
+    conditions = []
+    parameters = []
+
+    def add(condition):
+        conditions.append(condition[0])
+        parameters.extend(condition[1])
+
+    if kind == 'any':
+        nameCondition = match('name', name)
+        valueCondition = match('value', name)
+        return ("((option IS NULL AND " + nameCondition[0] + ") OR (option IS NOT NULL AND " + valueCondition[0] + "))",
+                nameCondition[1] + valueCondition[1])
+    if kind in ('rule', 'behavior', 'criteria'):
+        add(('kind = ?', [kind]))
+    else:
+        add(("kind IN ('behavior', 'criteria')", []))
+    if name is not None:
+        add(match('name', name))
+    if option is None and value is None:
+        conditions.append('option IS NULL')
+    else:
+        conditions.append('option IS NOT NULL')
+        if option is not None:
+            add(match('option', option))
+        if value is not None:
+            add(match('value', value))
+    return ' AND '.join(conditions), parameters
+
+
+def rulePostings(rule):
+    """
+    Function to list the postings of one rule, without its children
+
+    Returns
+    -------
+    postings : <set> of (kind, name, option, value), all lower case
+    """
+    postings = {('rule', rule['name'].lower(), None, None)}
+    for kind, key in (('behavior', 'behaviors'), ('criteria', 'criteria')):
+        for eachFeature in rule.get(key, []):
+            featureName = eachFeature['name'].lower()
+            postings.add((kind, featureName, None, None))
+            for option, value in optionValues(eachFeature.get('options', {})):
+                postings.add((kind, featureName, option.lower(), value.lower()))
+    return postings
+
+
+class RuleIndex(object):
+    """
+    SQLite inverted index of rule trees, stored next to the rule tree cache.
+    One connection is shared by all threads of a process.
+    """
+
+    fileName = 'ruleindex.db'
+
+    def __init__(self, cacheDir):
+        self.indexFile = os.path.join(cacheDir, self.fileName)
+        self.lock = threading.RLock()
+        if cacheDir and not os.path.exists(cacheDir):
+            os.makedirs(cacheDir)
+        self.connection = sqlite3.connect(self.indexFile, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def query(self, statement, parameters=()):
+        with self.lock:
+            return self.connection.execute(statement, parameters).fetchall()
+
+    def hasTree(self, treeHash):
+        return len(self.query('SELECT 1 FROM trees WHERE treeHash = ?', (treeHash,))) == 1
+
+    def addTree(self, treeHash, content):
+        """
+        Function to index a tree unless it is indexed already
+
+        Parameters
+        ----------
+        treeHash : <string>
+            Content hash of the tree, as used by RuleTreeCache
+        content : <bytes>
+            Rules response body
+        """
+        if self.hasTree(treeHash):
+            return
+        rules = []
+        postings = []
+        #Pre-order walk, the position of a rule is its place in that order
+        stack = [(jsonbackend.loads(content)['rules'], [])]
+        while stack:
+            rule, path = stack.pop()
+            path = path + [rule['name']]
+            rulePos = len(rules)
+            rules.append((treeHash, rulePos, PATH_SEPARATOR.join(path)))
+            postings.extend(posting + (treeHash, rulePos) for posting in rulePostings(rule))
+            for eachChild in reversed(rule.get('children', [])):
+                stack.append((eachChild, path))
+        with self.lock:
+            if self.hasTree(treeHash):
+                return
+            self.connection.execute('BEGIN')
+            try:
+                self.connection.executemany('INSERT INTO rules VALUES (?, ?, ?)', rules)
+                self.connection.executemany('INSERT INTO postings VALUES (?, ?, ?, ?, ?, ?)', postings)
+                self.connection.execute('INSERT INTO trees VALUES (?, ?, ?)', (treeHash, len(rules), time.time()))
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                raise
+
+    def setVersion(self, propertyId, version, propertyName, treeHash):
+        """
+        Function to record which tree a property version has
+        """
+        with self.lock:
+            self.connection.execute('INSERT OR REPLACE INTO versions VALUES (?, ?, ?, ?)',
+                                    (propertyId, int(version), propertyName, treeHash))
+
+    def versionTree(self, propertyId, version):
+        rows = self.query('SELECT treeHash FROM versions WHERE propertyId = ? AND version = ?', (propertyId, int(version)))
+        return rows[0][0] if rows else None
+
+    def evaluate(self, node, treeHash):
+        """
+        Function to evaluate a parsed rulequery query on one tree
+
+        Returns
+        -------
+        positions : <set> of the positions of the matching rules
+        """
+        if node[0] == 'term':
+            condition, parameters = termCondition(node)
+            return {row[0] for row in self.query('SELECT rulePos FROM postings WHERE treeHash = ? AND ' + condition,
+                                                 [treeHash] + parameters)}
+        if node[0] == 'not':
+            ruleCount = self.query('SELECT ruleCount FROM trees WHERE treeHash = ?', (treeHash,))[0][0]
+            return set(range(ruleCount)) - self.evaluate(node[1], treeHash)
+        positions = self.evaluate(node[1][0], treeHash)
+        for eachOperand in node[1][1:]:
+            if node[0] == 'and':
+                if not positions:
+                    break
+                positions = positions & self.evaluate(eachOperand, treeHash)
+            else:
+                positions = positions | self.evaluate(eachOperand, treeHash)
+        return positions
+
+    def search(self, query, treeHash):
+        """
+        Function to find the rules of an indexed tree matching a query
+
+        Parameters
+        ----------
+        query : <tuple>
+            Query parsed by rulequery.parseQuery
+        treeHash : <string>
+            Content hash of the tree
+
+        Returns
+        -------
+        paths : <List> of the paths of the matching rules, in tree order
+        """
+        positions = sorted(self.evaluate(query, treeHash))
+        paths = {}
+        #Positions are fetched in chunks to stay below the SQLite parameter limit
+        for start in range(0, len(positions), 500):
+            chunk = positions[start:start + 500]
+            paths.update(self.query('SELECT rulePos, path FROM rules WHERE treeHash = ? AND rulePos IN (' + ','.join('?' * len(chunk)) + ')',
+                                    [treeHash] + chunk))
+        return [paths[position] for position in positions]
+
+    def prune(self, treeHashes):
+        """
+        Function to drop the trees that are no longer in the rule tree cache
+
+        Parameters
+        ----------
+        treeHashes : <set>
+            Hashes of the trees to keep
+        """
+        with self.lock:
+            stale = [row[0] for row in self.connection.execute('SELECT treeHash FROM trees') if row[0] not in treeHashes]
+            if not stale:
+                return
+            self.connection.execute('BEGIN')
+            for treeHash in stale:
+                for table in ['postings', 'rules', 'versions', 'trees']:
+                    self.connection.execute('DELETE FROM ' + table + ' WHERE treeHash = ?', (treeHash,))
+            self.connection.commit()
@@ -0,0 +1,160 @@
+"""
+Copyright 2021 Akamai Technologies, Inc. All Rights Reserved.
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+
+"""
+RFC 6902 JSON Patch between two versions of a rules document, so that small
+edits can be uploaded with PATCH instead of a PUT of the complete tree.
+"""
+
+import copy
+from collections.abc import Mapping
+
+
+__all__=['makePatch', 'applyPatch']
+
+
+def escapePointer(key):
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def unescapePointer(token):
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def sameValue(source, target):
+    """
+    Function to compare two JSON values the way JSON does: True == 1 and
+    1 == 1.0 in python, but not in the document PAPI stores
+    """
+    #Values that differ for python differ for JSON as well, only equal ones are walked
+    if source != target:
+        return False
+    stack = [(source, target)]
+    while stack:
+        source, target = stack.pop()
+        #Rules may be plain dicts or RuleNode objects
+        if isinstance(source, Mapping) and isinstance(target, Mapping):
+            stack.extend((source[key], target[key]) for key in source)
+        elif isinstance(source, list) and isinstance(target, list):
+            stack.extend(zip(source, target))
+        elif type(source) != type(target):
+            return False
+    return True
+
+
+def makePatch(source, target, path=''):
+    """
+    Function to compute the JSON Patch turning source into target
+
+    Parameters
+    ----------
+    source : <json>
+        Document as fetched
+    target : <json>
+        Edited document
+    path : <string>
+        JSON pointer of source/target within the patched document
+
+    Returns
+    -------
+    patch : <List> of JSON Patch operations
+    """
+    patch = []
+    #Explicit stack instead of recursion, rule trees can be deeply nested
+    stack = [(source, target, path)]
+    while stack:
+        source, target, path = stack.pop()
+        if sameValue(source, target):
+            continue
+        if isinstance(source, Mapping) and isinstance(target, Mapping):
+            for key in source:
+                if key not in target:
+                    patch.append({'op': 'remove', 'path': path + '/' + escapePointer(key)})
+            for key in target:
+                if key not in source:
+                    patch.append({'op': 'add', 'path': path + '/' + escapePointer(key), 'value': target[key]})
+                else:
+                    stack.append((source[key], target[key], path + '/' + escapePointer(key)))
+        elif isinstance(source, list) and isinstance(target, list):
+            patch.extend(listPatch(source, target, path, stack))
+        else:
+            patch.append({'op': 'replace', 'path': path, 'value': target})
+    return patch
+
+
+def listPatch(source, target, path, stack):
+    """
+    Function to compute the operations for a changed list. The common head and
+    tail are kept; a changed middle of the same length is compared element by
+    element (pushed on stack), otherwise its elements are removed and added.
+    """
+    prefix = 0
+    while prefix < len(source) and prefix < len(target) and sameValue(source[prefix], target[prefix]):
+        prefix += 1
+    suffix = 0
+    while suffix < len(source) - prefix and suffix < len(target) - prefix and \
+            sameValue(source[len(source) - 1 - suffix], target[len(target) - 1 - suffix]):
+        suffix += 1
+
+    sourceMiddle = source[prefix:len(source) - suffix]
+    targetMiddle = target[prefix:len(target) - suffix]
+    if len(sourceMiddle) == len(targetMiddle):
+        for offset in range(len(sourceMiddle)):
+            stack.append((sourceMiddle[offset], targetMiddle[offset], path + '/' + str(prefix + offset)))
+        return []
+
+    operations = []
+    #Remove from the back, so the indexes of the remaining elements stay valid
+    for position in reversed(range(prefix, prefix + len(sourceMiddle))):
+        operations.append({'op': 'remove', 'path': path + '/' + str(position)})
+    for offset, value in enumerate(targetMiddle):
+        operations.append({'op': 'add', 'path': path + '/' + str(prefix + offset), 'value': value})
+    return operations
+
+
+def applyPatch(document, patch):
+    """
+    Function to apply a JSON Patch (add, remove, replace) to a copy of document
+
+    Returns
+    -------
+    document : <json> patched copy
+    """
+    document = copy.deepcopy(document)
+    for operation in patch:
+        tokens = [unescapePointer(token) for token in operation['path'].split('/')[1:]]
+        if not tokens:
+            document = copy.deepcopy(operation['value'])
+            continue
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        key = tokens[-1]
+        if isinstance(parent, list):
+            position = len(parent) if key == '-' else int(key)
+            if operation['op'] == 'add':
+                parent.insert(position, copy.deepcopy(operation['value']))
+            elif operation['op'] == 'remove':
+                del parent[position]
+            elif operation['op'] == 'replace':
+                parent[position] = copy.deepcopy(operation['value'])
+        else:
+            #Unlike add, replace needs the member to exist
+            if operation['op'] == 'replace' and key not in parent:
+                raise KeyError(key)
+            if operation['op'] in ('add', 'replace'):
+                parent[key] = copy.deepcopy(operation['value'])
+            elif operation['op'] == 'remove':
+                del parent[key]
+    return document
@@ -0,0 +1,290 @@
+"""
+Copyright 2021 Akamai Technologies, Inc. All Rights Reserved.
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+
+"""
+Queries over the rules of a rule tree, used by the search command.
+
+A query is made of terms combined with and (or just a space), or, not and
+parentheses. Each term is matched against one rule, its own behaviors and
+criteria, never those of its children:
+
+    rule:PATTERN                       rule name
+    behavior:PATTERN                   name of a behavior of the rule
+    behavior:PATTERN.OPTION=VALUE      option of such a behavior
+    criteria:PATTERN[.OPTION=VALUE]    same for criteria
+    option:OPTION=VALUE                option of any behavior or criteria
+    value:VALUE                        option value of any behavior or criteria
+    OPTION=VALUE                       same as option:OPTION=VALUE
+    PATTERN                            any of the above
+
+Patterns are case-insensitive shell wildcards (*, ?), quote them with " when
+they contain spaces or parentheses. Nested options are named with dots
+(e.g. option:cacheKeyQueryParams.behavior=*), list options match if any element
+does and booleans are written true/false.
+
+    behavior:origin.hostname=*.example.com and not rule:default
+"""
+
+import fnmatch
+import re
+
+
+__all__=['parseQuery', 'compileQuery', 'searchRules', 'optionValues', 'isWildcard']
+
+TOKEN = re.compile(r'\(|\)|(?:[^\s()"]|"[^"]*")+')
+FIELDS = ['rule', 'behavior', 'criteria', 'option', 'value']
+
+
+def unquote(text):
+    return text.replace('"', '')
+
+
+def isWildcard(pattern):
+    return any(character in pattern for character in '*?[')
+
+
+def wildcard(pattern):
+    """
+    Function to turn a lower case pattern into a case-insensitive match function
+    """
+    if pattern is None:
+        return None
+    if not isWildcard(pattern):
+        return lambda text: text.lower() == pattern
+    expression = re.compile(fnmatch.translate(pattern))
+    return lambda text: expression.match(text.lower()) is not None
+
+
+def valueText(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if value is None:
+        return 'null'
+    return str(value)
+
+
+def optionValues(options, prefix=''):
+    """
+    Function to flatten the options of a behavior or criteria
+
+    Returns
+    -------
+    options : <generator> of (dotted option name, value as text)
+    """
+    for key, value in options.items():
+        if isinstance(value, dict):
+            yield from optionValues(value, prefix + key + '.')
+        elif isinstance(value, list):
+            for eachValue in value:
+                if isinstance(eachValue, dict):
+                    yield from optionValues(eachValue, prefix + key + '.')
+                else:
+                    yield prefix + key, valueText(eachValue)
+        else:
+            yield prefix + key, valueText(value)
+
+
+def parseTerm(text):
+    """
+    Function to parse one term
+
+    Returns
+    -------
+    term : <tuple> ('term', kind, name, option, value), kind is rule, behavior,
+        criteria, option, value or any. The patterns are unquoted and lower
+        case, None when the term does not restrict them.
+    """
+    field, separator, pattern = text.partition(':')
+    if not separator or field.lower() not in FIELDS:
+        field, pattern = None, text
+    field = field.lower() if field else None
+    pattern = unquote(pattern).lower()
+    optionPart, equals, valuePart = pattern.partition('=')
+    value = valuePart if equals else None
+
+    if field == 'rule':
+        return ('term', 'rule', pattern, None, None)
+    if field in ('behavior', 'criteria'):
+        #Behavior names have no dots, anything after the first dot names an option
+        name, dot, option = optionPart.partition('.')
+        return ('term', field, name, option if dot else None, value)
+    if field == 'value':
+        return ('term', 'value', None, None, pattern)
+    if field == 'option' or equals:
+        return ('term', 'option', None, optionPart, value)
+    return ('term', 'any', pattern, None, None)
+
+
+def featureTerm(matchName, matchOption, matchValue):
+    """
+    Function to match a behavior or criteria by name and optionally by one option
+    """
+    def matches(feature):
+        if matchName is not None and not matchName(feature['name']):
+            return False
+        if matchOption is None and matchValue is None:
+            return True
+        return any((matchOption is None or matchOption(name)) and (matchValue is None or matchValue(value))
+                   for name, value in optionValues(feature.get('options', {})))
+    return matches
+
+
+def termFunction(node):
+    """
+    Function to turn a parsed term into a function of a rule
+    """
+    _, kind, name, option, value = node
+    if kind == 'rule':
+        matchRule = wildcard(name)
+        return lambda rule: matchRule(rule['name'])
+    if kind in ('behavior', 'criteria'):
+        matches = featureTerm(wildcard(name), wildcard(option), wildcard(value))
+        key = 'behaviors' if kind == 'behavior' else 'criteria'
+        return lambda rule: any(matches(eachFeature) for eachFeature in rule.get(key, []))
+    if kind in ('option', 'value'):
+        matches = featureTerm(None, wildcard(option), wildcard(value))
+        return lambda rule: any(matches(eachFeature) for eachFeature in features(rule))
+    matchAny = wildcard(name)
+    anyValue = featureTerm(None, None, matchAny)
+    return lambda rule: matchAny(rule['name']) or any(matchAny(eachFeature['name']) or anyValue(eachFeature)
+                                                      for eachFeature in features(rule))
+
+
+def features(rule):
+    yield from rule.get('behaviors', [])
+    yield from rule.get('criteria', [])
+
+
+def parseQuery(text):
+    """
+    Function to parse a query
+
+    Parameters
+    ----------
+    text : <string>
+        Query, see the module documentation
+
+    Returns
+    -------
+    query : <tuple> syntax tree of ('and', [operands]), ('or', [operands]),
+        ('not', operand) and terms as returned by parseTerm
+
+    Raises
+    ------
+    ValueError : when the query can not be parsed
+    """
+    tokens = TOKEN.findall(text)
+    position = [0]
+
+    def peek():
+        return tokens[position[0]].lower() if position[0] < len(tokens) else None
+
+    def take():
+        position[0] += 1
+        return tokens[position[0] - 1]
+
+    def parseOr():
+        operands = [parseAnd()]
+        while peek() == 'or':
+            take()
+            operands.append(parseAnd())
+        return operands[0] if len(operands) == 1 else ('or', operands)
+
+    def parseAnd():
+        operands = [parseNot()]
+        while peek() not in (None, 'or', ')'):
+            if peek() == 'and':
+                take()
+            operands.append(parseNot())
+        return operands[0] if len(operands) == 1 else ('and', operands)
+
+    def parseNot():
+        token = peek()
+        if token is None:
+            raise ValueError('Query ends unexpectedly: ' + text)
+        if token == 'not':
+            take()
+            return ('not', parseNot())
+        if token == '(':
+            take()
+            operand = parseOr()
+            if peek() != ')':
+                raise ValueError('Missing ) in query: ' + text)
+            take()
+            return operand
+        if token in (')', 'and', 'or'):
+            raise ValueError('Unexpected ' + token + ' in query: ' + text)
+        return parseTerm(take())
+
+    if not tokens:
+        raise ValueError('Empty query')
+    query = parseOr()
+    if position[0] != len(tokens):
+        raise ValueError('Unexpected ' + tokens[position[0]] + ' in query: ' + text)
+    return query
+
+
+def compileQuery(text):
+    """
+    Function to compile a query
+
+    Parameters
+    ----------
+    text : <string>
+        Query, see the module documentation
+
+    Returns
+    -------
+    matches : <function> taking a rule and returning whether it matches
+
+    Raises
+    ------
+    ValueError : when the query can not be parsed
+    """
+    def compileNode(node):
+        if node[0] == 'term':
+            return termFunction(node)
+        if node[0] == 'not':
+            operand = compileNode(node[1])
+            return lambda rule: not operand(rule)
+        operands = [compileNode(eachOperand) for eachOperand in node[1]]
+        if node[0] == 'and':
+            return lambda rule: all(operand(rule) for operand in operands)
+        return lambda rule: any(operand(rule) for operand in operands)
+    return compileNode(parseQuery(text))
+
+
+def searchRules(rules, matches):
+    """
+    Function to find the rules of a tree matching a query
+
+    Parameters
+    ----------
+    rules : <dict>
+        Default rule of the tree, a dict or a RuleNode
+    matches : <function>
+        Compiled query
+
+    Returns
+    -------
+    hits : <generator> of (rule path, rule) in tree order, the path lists the rule names from the default rule
+    """
+    stack = [(rules, [rules['name']])]
+    while stack:
+        rule, path = stack.pop()
+        if matches(rule):
+            yield path, rule
+        children = rule.get('children', [])
+        for eachChild in reversed(children):
+            stack.append((eachChild, path + [eachChild['name']]))
@@ -0,0 +1,106 @@
+"""
+Copyright 2021 Akamai Technologies, Inc. All Rights Reserved.
+
+ Licensed under the Apache License, Version 2.0 (the "License");
+ you may not use this file except in compliance with the License.
+ You may obtain a copy of the License at
+    http://www.apache.org/licenses/LICENSE-2.0
+ Unless required by applicable law or agreed to in writing, software
+ distributed under the License is distributed on an "AS IS" BASIS,
+ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ See the License for the specific language governing permissions and
+ limitations under the License.
+"""
+
+"""
+Streaming search of a rules response. Only the rules with the searched name
+are built in memory, everything else is parsed and dropped on the fly, so
+memory use does not depend on the size of the property.
+"""
+
+import json
+try:
+    import ijson
+    from ijson.common import ObjectBuilder
+except ImportError:
+    ijson = None
+
+
+__all__=['findRules', 'streamingSupported']
+
+
+def streamingSupported():
+    return ijson is not None
+
+
+def isRulePrefix(prefix):
+    #rules, rules.children.item, rules.children.item.children.item, ...
+    segments = prefix.split('.')
+    if segments[0] != 'rules' or len(segments) % 2 == 0:
+        return False
+    return all(segments[position] == 'children' and segments[position + 1] == 'item'
+               for position in range(1, len(segments), 2))
+
+
+def matchingRules(rule, ruleName):
+    #Rule names are matched case-insensitively, as getRule always did
+    ruleName = ruleName.casefold()
+    stack = [rule]
+    while stack:
+        rule = stack.pop()
+        if isinstance(rule.get('name'), str) and rule['name'].casefold() == ruleName:
+            yield rule
+        stack.extend(reversed(rule.get('children', [])))
+
+
+def findRules(stream, ruleName):
+    """
+    Function to find the rules named ruleName in a rules response
+
+    Parameters
+    ----------
+    stream : <file like object>
+        Rules response body opened for reading (e.g. response.raw), read incrementally
+    ruleName : <string>
+        Name of the rule
+
+    Returns
+    -------
+    rules : generator of the matching rules in document order. Stop iterating
+        once enough rules were found, the rest of the stream is not parsed.
+    """
+    if ijson is None:
+        #Without ijson the response can only be parsed as a whole
+        document = json.loads(stream.read())
+        for eachRule in matchingRules(document['rules'], ruleName):
+            yield eachRule
+        return
+
+    builder = None
+    builderPrefix = None
+    builderName = None
+    for prefix, event, value in ijson.parse(stream, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if builderName is None and event == 'string' and prefix == builderPrefix + '.name':
+                builderName = value
+                if builderName.casefold() != ruleName.casefold():
+                    #Not the rule we look for. Children parsed before its name
+                    #are complete and searched now, the following ones are
+                    #picked up again as separate rules.
+                    for eachRule in matchingRules(builder.value, ruleName):
+                        yield eachRule
+                    builder = None
+            elif event == 'end_map' and prefix == builderPrefix:
+                rule = builder.value
+                builder = None
+                for eachRule in matchingRules(rule, ruleName):
+                    yield eachRule
+            continue
+        if event == 'start_map' and isRulePrefix(prefix):
+            #Build the rule until its name tells whether it is needed, PAPI
+            #sends the name first so this is normally just the map itself
+            builder = ObjectBuilder()
+            builder.event(event, value)
+            builderPrefix = prefix
+            builderName = None
@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+#The modules are scripts at the top of the repository, not a package
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+EDGERC = """[papi]
+client_secret = mock-secret
+host = {host}
+access_token = akab-mock-access-token
+client_token = akab-mock-client-token
+"""
+
+
+class MockAccount(object):
+    """
+    A mock PAPI served from a thread and a scratch directory with an .edgerc
+    pointing at it, to run RuleUpdater.py and papi.py as from the shell
+    """
+
+    def __init__(self, papi, server, workDir):
+        self.papi = papi
+        self.server = server
+        self.workDir = workDir
+        self.edgerc = os.path.join(str(workDir), '.edgerc')
+        with open(self.edgerc, 'w') as edgercHandler:
+            edgercHandler.write(EDGERC.format(host=server.url))
+        self.environment = dict(os.environ, HOME=str(workDir), AKAMAI_CLI_CACHE_DIR=os.path.join(str(workDir), 'cache'))
+
+    def run(self, script, argv):
+        process = subprocess.run([sys.executable, os.path.join(ROOT, script)] + list(argv), cwd=str(self.workDir),
+                                 env=self.environment, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        return process.returncode, process.stdout.decode('utf-8', 'replace')
+
+    def ruleUpdater(self, command, *argv):
+        """
+        Function to run a RuleUpdater command
+
+        Returns
+        -------
+        (returncode, output)
+        """
+        return self.run('RuleUpdater.py', [command, '--edgerc', self.edgerc, '--section', 'papi'] + list(argv))
+
+    def setup(self):
+        returncode, output = self.run('papi.py', ['-setup', '-rateLimit', '0'])
+        assert returncode == 0, output
+        return output
+
+    def rules(self, propertyId, version):
+        return self.papi.properties[propertyId]['versions'][version]['rules']
+
+    def writeFile(self, name, content):
+        path = os.path.join(str(self.workDir), name)
+        if os.path.dirname(path) and not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as fileHandler:
+            fileHandler.write(content)
+        return path
+
+
+@pytest.fixture
+def mockAccount(tmp_path):
+    """
+    Returns a function taking a MockPapi and giving its MockAccount, the
+    servers are shut down after the test
+    """
+    from mockpapi import startServer
+    servers = []
+
+    def serve(papi):
+        server = startServer(papi)
+        servers.append(server)
+        return MockAccount(papi, server, tmp_path)
+
+    yield serve
+    for eachServer in servers:
+        eachServer.shutdown()
@@ -0,0 +1,97 @@
+import json
+import time
+
+from ActivationScheduler import ActivationScheduler
+from mockpapi import MockPapi
+
+
+class FakeResponse(object):
+
+    def __init__(self, status_code, document):
+        self.status_code = status_code
+        self.document = document
+        self.text = json.dumps(document)
+
+    def json(self):
+        return self.document
+
+
+class FakePapi(object):
+    """
+    Answers activateConfiguration with submitResponse, then the statuses in order, one per poll
+    """
+
+    def __init__(self, submitResponse, statuses=()):
+        self.submitResponse = submitResponse
+        self.statuses = list(statuses)
+        self.polls = []
+
+    def activateConfiguration(self, session, version, network, emails, notes, propertyId, contractId, groupId):
+        if isinstance(self.submitResponse, Exception):
+            raise self.submitResponse
+        return self.submitResponse
+
+    def getActivation(self, session, propertyId, activationId, contractId, groupId):
+        self.polls.append(time.time())
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        return FakeResponse(200, {'activations': {'items': [{'activationId': activationId, 'status': status}]}})
+
+
+CREATED = FakeResponse(201, {'activationLink': '/papi/v0/properties/prp_1/activations/atv_7?contractId=ctr_1&groupId=grp_1'})
+
+
+def activation(papiObject):
+    return {'papiObject': papiObject, 'version': 2, 'network': 'STAGING', 'emails': ['me@example.com'], 'notes': 'Test',
+            'propertyDetails': {'propertyName': 'www.example.com', 'propertyId': 'prp_1', 'contractId': 'ctr_1', 'groupId': 'grp_1'}}
+
+
+def test_polls_until_done():
+    papiObject = FakePapi(CREATED, ['PENDING', 'ZONE_1', 'ACTIVE'])
+    result = ActivationScheduler(None, pollInterval=0.01, maxPollInterval=0.01).run([activation(papiObject)])[0]
+    assert result['activationId'] == 'atv_7'
+    assert result['status'] == 'ACTIVE' and result['message'] == ''
+    assert len(papiObject.polls) == 3
+
+
+def test_poll_interval_doubles_while_unchanged():
+    papiObject = FakePapi(CREATED, ['PENDING', 'PENDING', 'PENDING', 'PENDING', 'ACTIVE'])
+    ActivationScheduler(None, pollInterval=0.05, maxPollInterval=0.2).run([activation(papiObject)])
+    gaps = [later - earlier for earlier, later in zip(papiObject.polls, papiObject.polls[1:])]
+    assert len(gaps) == 4
+    #0.1, 0.2 and then capped at 0.2
+    assert 0.09 <= gaps[0] < 0.19 and 0.19 <= gaps[1] and 0.19 <= gaps[2] < 0.35
+
+
+def test_submission_outcomes():
+    alreadyActive = FakePapi(FakeResponse(422, {'detail': 'Property version already activated'}))
+    rejected = FakePapi(FakeResponse(400, {'title': 'Bad request', 'detail': 'Invalid network'}))
+    broken = FakePapi(ConnectionError('connection reset'))
+    results = ActivationScheduler(None, pollInterval=0.01).run([activation(alreadyActive), activation(rejected), activation(broken)])
+    assert [eachResult['status'] for eachResult in results] == ['ACTIVE', 'FAILED', 'FAILED']
+    assert results[1]['message'] == '400 Invalid network'
+    assert 'connection reset' in results[2]['message']
+    assert alreadyActive.polls == rejected.polls == broken.polls == []
+
+
+def test_timeout_reports_the_last_status():
+    papiObject = FakePapi(CREATED, ['PENDING'])
+    result = ActivationScheduler(None, pollInterval=0.01, maxPollInterval=0.01, timeout=0.1).run([activation(papiObject)])[0]
+    assert result['status'] == 'TIMEOUT'
+    assert result['message'] == 'Last status PENDING'
+
+
+def test_activate_command(mockAccount):
+    account = mockAccount(MockPapi(properties=3, depth=1, fanout=1, behaviors=1, activationSeconds=0.2))
+    account.writeFile('release.json', json.dumps({'defaults': {'version': '1'}, 'properties': [
+        {'property': 'www.mock1.example.com'},
+        {'property': 'www.mock2.example.com', 'network': 'PRODUCTION'},
+        {'property': 'www.unknown.example.com'},
+    ]}))
+    returncode, output = account.ruleUpdater('activate', '--manifest', 'release.json', '--network', 'STAGING',
+                                             '--email', 'me@example.com', '--pollInterval', '1')
+    assert returncode == 1, output
+    assert '2 of 3 activations completed' in output
+    assert account.papi.properties['prp_1']['versions'][1]['stagingStatus'] == 'ACTIVE'
+    assert account.papi.properties['prp_2']['versions'][1]['productionStatus'] == 'ACTIVE'
+    assert account.papi.properties['prp_2']['versions'][1]['stagingStatus'] == 'INACTIVE'
+    assert account.papi.properties['prp_3']['versions'][1]['stagingStatus'] == 'INACTIVE'
@@ -0,0 +1,64 @@
+import json
+
+from mockpapi import MockPapi
+
+RULE = {'name': 'Changeset rule', 'children': [], 'behaviors': [], 'criteria': [], 'criteriaMustSatisfy': 'all', 'options': {}}
+BEHAVIOR = {'name': 'allowPost', 'options': {'enabled': True, 'allowWithoutContentLength': False}}
+
+
+def allRules(rules):
+    found = []
+    stack = [rules]
+    while stack:
+        rule = stack.pop()
+        found.append(rule)
+        stack.extend(rule['children'])
+    return found
+
+
+def prepare(mockAccount, operations):
+    account = mockAccount(MockPapi(properties=1, depth=2, fanout=2, behaviors=2))
+    account.writeFile('samplerules/rule.json', json.dumps(RULE))
+    account.writeFile('samplerules/behavior.json', json.dumps(BEHAVIOR))
+    account.writeFile('changes.json', json.dumps(operations))
+    account.papi.resetStats()
+    return account
+
+
+def test_changeset_is_one_version_and_one_upload(mockAccount):
+    account = prepare(mockAccount, [
+        {'operation': 'addRule', 'fromFile': 'samplerules/rule.json', 'insertAfter': True, 'ruleName': 'Rule 1.1'},
+        {'operation': 'deleteRule', 'ruleName': 'Rule 1.2.1'},
+        {'operation': 'addBehavior', 'fromFile': 'samplerules/behavior.json', 'ruleName': 'Changeset rule'},
+        {'operation': 'deleteBehavior', 'behaviorName': 'sureRoute'},
+    ])
+    returncode, output = account.ruleUpdater('applyChanges', '--property', 'www.mock1.example.com', '--version', 'LATEST',
+                                             '--changeset', 'changes.json', '--checkoutNewVersion', 'YES')
+    assert returncode == 0, output
+    endpoints = account.papi.statsSnapshot()['endpoints']
+    assert endpoints.get('createVersion') == 1
+    assert endpoints.get('uploadRules', 0) + endpoints.get('patchRules', 0) == 1
+
+    rules = account.rules('prp_1', 2)
+    assert [eachRule['name'] for eachRule in rules['children']] == ['Rule 1.1', 'Changeset rule', 'Rule 1.2']
+    assert rules['children'][1]['behaviors'] == [BEHAVIOR]
+    names = [eachRule['name'] for eachRule in allRules(rules)]
+    assert 'Rule 1.2.1' not in names
+    assert all(eachBehavior['name'] != 'sureRoute' for eachRule in allRules(rules) for eachBehavior in eachRule['behaviors'])
+    #The notes of all operations make up the version note
+    assert 'Added rule Changeset rule after Rule 1.1 rule' in account.papi.properties['prp_1']['versions'][2]['comments']
+    assert 'Deleted rule Rule 1.2.1' in account.papi.properties['prp_1']['versions'][2]['comments']
+
+
+def test_failed_operation_uploads_nothing(mockAccount):
+    account = prepare(mockAccount, [
+        {'operation': 'addBehavior', 'fromFile': 'samplerules/behavior.json', 'ruleName': 'Rule 1.1'},
+        {'operation': 'deleteRule', 'ruleName': 'No such rule'},
+    ])
+    before = json.dumps(account.rules('prp_1', 1), sort_keys=True)
+    returncode, output = account.ruleUpdater('applyChanges', '--property', 'www.mock1.example.com', '--version', '1',
+                                             '--changeset', 'changes.json', '--checkoutNewVersion', 'YES')
+    endpoints = account.papi.statsSnapshot()['endpoints']
+    assert 'createVersion' not in endpoints and 'uploadRules' not in endpoints and 'patchRules' not in endpoints, output
+    assert sorted(account.papi.properties['prp_1']['versions']) == [1]
+    assert json.dumps(account.rules('prp_1', 1), sort_keys=True) == before
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import os
+import sys
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+import requests
+
+pytest.importorskip('aiohttp')
+from akamai.edgegrid import EdgeGridAuth
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from mockpapi import MockPapi, startServer
+from AsyncPapiWrapper import AsyncPapiWrapper
+from RuleNode import RuleNode
+import jsonbackend
+
+CONTRACT_ID = 'ctr_1-MOCK'
+GROUP_ID = 'grp_1'
+EDGERC = """[papi]
+client_secret = mock-secret
+host = {host}
+access_token = akab-mock-access-token
+client_token = akab-mock-client-token
+"""
+
+
+class RecordingPapi(MockPapi):
+    """MockPapi keeping every request it answered"""
+
+    def __init__(self, *args, **kwargs):
+        MockPapi.__init__(self, *args, **kwargs)
+        self.requests = []
+
+    def handle(self, method, url, headers, body):
+        self.requests.append({'method': method, 'url': url, 'headers': dict(headers), 'body': body})
+        return MockPapi.handle(self, method, url, headers, body)
+
+
+@pytest.fixture(scope='module')
+def server():
+    papi = RecordingPapi(properties=3, depth=2, fanout=2, behaviors=2, activationSeconds=0)
+    server = startServer(papi)
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def papi(server):
+    del server.papi.requests[:]
+    return server.papi
+
+
+@pytest.fixture
+def edgerc(server, tmp_path):
+    edgercFile = tmp_path / '.edgerc'
+    edgercFile.write_text(EDGERC.format(host=server.url))
+    return str(edgercFile)
+
+
+def run(edgerc, coroutine, account_switch_key=''):
+    async def main():
+        async with AsyncPapiWrapper.fromEdgerc(edgerc, 'papi', account_switch_key) as papiObject:
+            return await coroutine(papiObject)
+    return asyncio.run(main())
+
+
+def verifySignature(edgerc, request):
+    """Signs the request as received again with the same timestamp and nonce"""
+    fields = dict(eachField.split('=', 1) for eachField in request['headers']['Authorization'].split(' ', 1)[1].split(';') if eachField)
+    received = requests.Request(request['method'], 'http://' + request['headers']['Host'] + request['url'],
+                                data=request['body'] or None).prepare()
+    expected = EdgeGridAuth.from_edgerc(edgerc, 'papi').ah.make_auth_header(received, fields['timestamp'], fields['nonce'])
+    return request['headers']['Authorization'] == expected
+
+
+def test_search_property(edgerc, papi):
+    response = run(edgerc, lambda papiObject: papiObject.searchProperty(propertyName='www.mock2.example.com'))
+    assert response.status_code == 200
+    assert [eachItem['propertyId'] for eachItem in response.json()['versions']['items']] == ['prp_2']
+    request, = papi.requests
+    assert (request['method'], request['url']) == ('POST', '/papi/v0/search/find-by-value')
+    assert json.loads(request['body']) == {'propertyName': 'www.mock2.example.com'}
+    assert request['headers']['Content-Type'] == 'application/json'
+
+
+def test_version_and_rules_reads(edgerc, papi):
+    async def reads(papiObject):
+        return await asyncio.gather(papiObject.getVersion('LATEST', 'prp_1', CONTRACT_ID, GROUP_ID),
+                                    papiObject.getVersion('STAGING', 'prp_1', CONTRACT_ID, GROUP_ID),
+                                    papiObject.listVersions('prp_1', CONTRACT_ID, GROUP_ID),
+                                    papiObject.getPropertyRules('prp_1', 1, CONTRACT_ID, GROUP_ID),
+                                    papiObject.listHostnames('prp_1', 1, CONTRACT_ID, GROUP_ID),
+                                    papiObject.listEdgeHostnames(CONTRACT_ID, GROUP_ID))
+    latest, staging, versions, rules, hostnames, edgeHostnames = run(edgerc, reads)
+    assert latest.status_code == 200 and latest.json()['versions']['items'][0]['propertyVersion'] >= 1
+    #Nothing of prp_1 is active on staging
+    assert staging.status_code == 200 and staging.json()['versions']['items'] == []
+    assert versions.headers['ETag'] and versions.json()['propertyId'] == 'prp_1'
+    assert rules.json()['rules']['name'] == 'default' and rules.json()['propertyVersion'] == 1
+    assert hostnames.json()['hostnames']['items'][0]['cnameFrom'] == 'www.mock1.example.com'
+    assert len(edgeHostnames.json()['edgeHostnames']['items']) == 3
+    urls = sorted(urlparse(eachRequest['url']).path for eachRequest in papi.requests)
+    assert urls == ['/papi/v0/edgehostnames/', '/papi/v0/properties/prp_1/versions/1/rules/',
+                    '/papi/v0/properties/prp_1/versions/latest', '/papi/v0/properties/prp_1/versions/latest',
+                    '/papi/v1/properties/prp_1/versions/', '/papi/v1/properties/prp_1/versions/1/hostnames']
+    assert any(parse_qs(urlparse(eachRequest['url']).query).get('activatedOn') == ['STAGING'] for eachRequest in papi.requests)
+
+
+def test_create_upload_and_activate(edgerc, papi):
+    async def edit(papiObject):
+        created = await papiObject.createVersion(1, 'prp_3', CONTRACT_ID, GROUP_ID)
+        version = int(created.json()['versionLink'].split('/versions/')[1].split('?')[0])
+        rules = (await papiObject.getPropertyRules('prp_3', version, CONTRACT_ID, GROUP_ID)).json()
+        rules['rules']['behaviors'].append({'name': 'allowPost', 'options': {'enabled': True}})
+        uploaded = await papiObject.uploadRules({'rules': rules['rules']}, version, 'prp_3', CONTRACT_ID, GROUP_ID)
+        activated = await papiObject.activateConfiguration(version, 'staging', ['noreply@example.com'], 'Test', 'prp_3',
+                                                           CONTRACT_ID, GROUP_ID)
+        return created, version, uploaded, activated
+    created, version, uploaded, activated = run(edgerc, edit)
+    assert created.status_code == 201
+    assert uploaded.status_code == 200 and uploaded.json()['rules']['behaviors'][-1]['name'] == 'allowPost'
+    #The mock asks for the warnings to be acknowledged first
+    assert activated.status_code == 201 and 'activationLink' in activated.json()
+    activations = [eachRequest for eachRequest in papi.requests if '/activations/' in eachRequest['url']]
+    assert [json.loads(eachRequest['body']).get('acknowledgeWarnings') for eachRequest in activations] == [None, ['msg_mock']]
+    assert json.loads(activations[0]['body']) == {'propertyVersion': version, 'network': 'STAGING', 'note': 'Test',
+                                                  'notifyEmails': ['noreply@example.com']}
+
+
+@pytest.mark.parametrize('backend', ['json', 'orjson'])
+def test_rule_nodes_are_uploaded_with_the_json_backend(edgerc, papi, backend):
+    if backend == 'orjson':
+        pytest.importorskip('orjson')
+    previous = jsonbackend.backendName()
+    jsonbackend.setBackend(backend)
+    async def edit(papiObject):
+        created = await papiObject.createVersion(1, 'prp_2', CONTRACT_ID, GROUP_ID)
+        version = int(created.json()['versionLink'].split('/versions/')[1].split('?')[0])
+        rules = (await papiObject.getPropertyRules('prp_2', version, CONTRACT_ID, GROUP_ID)).json()
+        #Compact trees, children not accessed are encoded from their kept JSON
+        rules['rules'] = RuleNode(rules['rules'])
+        rules['rules']['behaviors'].append({'name': 'allowPost', 'options': {'enabled': True}})
+        return await papiObject.uploadRules({'rules': rules['rules']}, version, 'prp_2', CONTRACT_ID, GROUP_ID), version
+    try:
+        uploaded, version = run(edgerc, edit)
+    finally:
+        jsonbackend.setBackend(previous)
+    assert uploaded.status_code == 200
+    assert uploaded.json()['rules']['behaviors'][-1] == {'name': 'allowPost', 'options': {'enabled': True}}
+    assert uploaded.json()['rules']['children'] == papi.properties['prp_2']['versions'][1]['rules']['children']
+
+
+def test_requests_are_signed(edgerc, papi):
+    async def calls(papiObject):
+        await papiObject.searchProperty(hostname='www.mock1.example.com')
+        await papiObject.getPropertyRules('prp_1', 1, CONTRACT_ID, GROUP_ID)
+    run(edgerc, calls)
+    assert len(papi.requests) == 2
+    for eachRequest in papi.requests:
+        assert eachRequest['headers']['Authorization'].startswith('EG1-HMAC-SHA256 client_token=akab-mock-client-token;'
+                                                                  'access_token=akab-mock-access-token;')
+        assert verifySignature(edgerc, eachRequest)
+    #A body changed after signing no longer matches
+    tampered = dict(papi.requests[0], body=b'{"hostname": "www.mock2.example.com"}')
+    assert not verifySignature(edgerc, tampered)
+
+
+def test_account_switch_key_is_added_to_every_url(edgerc, papi):
+    async def calls(papiObject):
+        await papiObject.searchProperty(propertyName='www.mock1.example.com')
+        await papiObject.listVersions('prp_1', CONTRACT_ID, GROUP_ID)
+        await papiObject.listEdgeHostnames(CONTRACT_ID, GROUP_ID)
+    run(edgerc, calls, account_switch_key='1-ABCD:1-2345')
+    assert [eachRequest['url'] for eachRequest in papi.requests] == [
+        '/papi/v0/search/find-by-value?accountSwitchKey=1-ABCD:1-2345',
+        '/papi/v1/properties/prp_1/versions/?contractId=ctr_1-MOCK&groupId=grp_1&accountSwitchKey=1-ABCD:1-2345',
+        '/papi/v0/edgehostnames/?contractId=ctr_1-MOCK&groupId=grp_1&accountSwitchKey=1-ABCD:1-2345']
+    for eachRequest in papi.requests:
+        assert verifySignature(edgerc, eachRequest)
+
+
+def test_session_is_opened_once_and_closed(edgerc):
+    async def lifecycle():
+        papiObject = AsyncPapiWrapper.fromEdgerc(edgerc, 'papi')
+        assert papiObject.session is None
+        response = await papiObject.searchProperty(propertyName='www.mock1.example.com')
+        session = papiObject.session
+        await papiObject.open()
+        assert papiObject.session is session
+        await papiObject.close()
+        return response, papiObject.session, session.closed
+    response, session, closed = asyncio.run(lifecycle())
+    assert response.status_code == 200 and response.text.startswith('{')
+    assert session is None and closed
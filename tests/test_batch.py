@@ -0,0 +1,108 @@
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mockpapi import MockPapi
+
+BEHAVIOR = {'name': 'allowPost', 'options': {'enabled': True, 'allowWithoutContentLength': False}}
+RULE = {'name': 'Batch rule', 'children': [], 'behaviors': [], 'criteria': [], 'criteriaMustSatisfy': 'all', 'options': {}}
+
+
+def findRule(rules, ruleName):
+    stack = [rules]
+    while stack:
+        rule = stack.pop()
+        if rule['name'] == ruleName:
+            return rule
+        stack.extend(rule['children'])
+
+
+def behaviorNames(rules):
+    names = []
+    stack = [rules]
+    while stack:
+        rule = stack.pop()
+        names.extend(eachBehavior['name'] for eachBehavior in rule['behaviors'])
+        stack.extend(rule['children'])
+    return names
+
+
+def test_batch_applies_every_entry_in_its_own_version(mockAccount):
+    account = mockAccount(MockPapi(properties=3, depth=2, fanout=2, behaviors=2))
+    account.writeFile('samplerules/behavior.json', json.dumps(BEHAVIOR))
+    account.writeFile('samplerules/rule.json', json.dumps(RULE))
+    deleted = account.rules('prp_2', 1)['behaviors'][0]['name']
+    account.writeFile('manifest.json', json.dumps({
+        'defaults': {'version': 'LATEST', 'checkoutNewVersion': 'YES', 'comment': 'Batch test'},
+        'properties': [
+            {'property': 'www.mock1.example.com', 'operation': 'addBehavior', 'fromFile': 'samplerules/behavior.json', 'ruleName': 'Rule 1.1'},
+            {'property': 'www.mock2.example.com', 'operation': 'deleteBehavior', 'behaviorName': deleted},
+            {'property': 'www.mock3.example.com', 'operation': 'addRule', 'fromFile': 'samplerules/rule.json', 'insertAfter': True,
+             'ruleName': 'Rule 1.2'},
+            {'property': 'www.mock3.example.com', 'operation': 'renameRule'},
+        ]}))
+
+    returncode, output = account.ruleUpdater('batch', '--manifest', 'manifest.json', '--workers', '4')
+    assert returncode == 1, output
+    assert '3 of 4 entries succeeded' in output
+    assert 'Unknown operation: renameRule' in output
+
+    assert findRule(account.rules('prp_1', 2), 'Rule 1.1')['behaviors'][-1] == BEHAVIOR
+    assert deleted not in behaviorNames(account.rules('prp_2', 2))
+    assert [eachRule['name'] for eachRule in account.rules('prp_3', 2)['children']] == ['Rule 1.1', 'Rule 1.2', 'Batch rule']
+    #The versions the edits were based on are unchanged
+    assert findRule(account.rules('prp_1', 1), 'Rule 1.1')['behaviors'][-1] != BEHAVIOR
+    assert deleted in behaviorNames(account.rules('prp_2', 1))
+
+
+def test_batch_without_entries(mockAccount):
+    account = mockAccount(MockPapi(properties=1, depth=1, fanout=1, behaviors=1))
+    account.writeFile('manifest.json', json.dumps({'properties': []}))
+    returncode, output = account.ruleUpdater('batch', '--manifest', 'manifest.json')
+    assert returncode == 0 and 'No entries found in manifest' in output
+
+
+def test_entries_of_one_property_run_in_order(mockAccount):
+    account = mockAccount(MockPapi(properties=2, depth=2, fanout=2, behaviors=2))
+    for eachName in ('allowPost', 'allowPut', 'allowPatch'):
+        account.writeFile(eachName + '.json', json.dumps({'name': eachName, 'options': {'enabled': True}}))
+    account.writeFile('manifest.json', json.dumps({
+        'defaults': {'version': 'LATEST', 'checkoutNewVersion': 'YES', 'comment': 'Batch test', 'operation': 'addBehavior',
+                     'ruleName': 'Rule 1.1'},
+        'properties': [
+            {'property': 'www.mock1.example.com', 'fromFile': 'allowPost.json'},
+            {'property': 'www.mock2.example.com', 'fromFile': 'allowPost.json'},
+            {'property': 'www.mock1.example.com', 'fromFile': 'allowPut.json'},
+            {'property': 'www.mock1.example.com', 'fromFile': 'allowPatch.json'},
+        ]}))
+    returncode, output = account.ruleUpdater('batch', '--manifest', 'manifest.json', '--workers', '4')
+    assert returncode == 0, output
+    #Each entry created its version from the one the previous entry of the property created
+    assert sorted(account.papi.properties['prp_1']['versions']) == [1, 2, 3, 4]
+    added = [eachBehavior['name'] for eachBehavior in account.rules('prp_1', 4)['children'][0]['behaviors']][-3:]
+    assert added == ['allowPost', 'allowPut', 'allowPatch']
+    assert sorted(account.papi.properties['prp_2']['versions']) == [1, 2]
+
+
+def test_shared_objects_are_created_once(monkeypatch, tmp_path):
+    created = []
+
+    class SlowCache(object):
+        def __init__(self, *args, **kwargs):
+            #Long enough for every worker to find the global still unset without the lock
+            time.sleep(0.05)
+            created.append(threading.get_ident())
+
+    #RuleUpdater creates its logs directory when imported
+    monkeypatch.chdir(tmp_path)
+    import RuleUpdater
+    monkeypatch.setenv('AKAMAI_CLI_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(RuleUpdater, 'RuleTreeCache', SlowCache)
+    monkeypatch.setattr(RuleUpdater, 'rule_cache', None)
+    args = argparse.Namespace(no_cache=False)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        caches = list(executor.map(lambda _: RuleUpdater.get_rule_cache(args), range(8)))
+    assert len(created) == 1
+    assert all(eachCache is caches[0] for eachCache in caches)
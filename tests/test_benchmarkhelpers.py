@@ -0,0 +1,46 @@
+import json
+
+import helpers
+from synthetic import countRules, syntheticRules
+
+
+def test_synthetic_trees_are_reproducible():
+    first = syntheticRules(2, 3, 2)
+    assert first == syntheticRules(2, 3, 2)
+    assert first != syntheticRules(2, 3, 2, seed=2)
+    assert countRules(first['rules']) == 1 + 3 + 9
+    assert helpers.lastRuleName(first['rules']) == 'Rule 1.3.3'
+
+
+def test_run_shape_reports_every_operation():
+    results = helpers.runShape('2x3x2', list(helpers.OPERATIONS), 2)
+    assert [eachResult['operation'] for eachResult in results] == list(helpers.OPERATIONS)
+    for eachResult in results:
+        assert eachResult['rules'] == 13
+        assert (eachResult['depth'], eachResult['fanout'], eachResult['behaviorsPerRule']) == (2, 3, 2)
+        assert 0 <= eachResult['minSeconds'] <= eachResult['medianSeconds']
+        assert eachResult['peakBytes'] > 0
+
+
+def test_operations_work_on_the_last_rule():
+    rules = syntheticRules(2, 2, 2)['rules']
+    ruleName = helpers.lastRuleName(rules)
+    helpers.OPERATIONS['addBehaviorToRule'](rules, ruleName)
+    assert rules['children'][-1]['children'][-1]['behaviors'][-1] == helpers.NEW_BEHAVIOR
+    helpers.OPERATIONS['insertRule'](rules, ruleName)
+    assert [eachRule['name'] for eachRule in rules['children'][-1]['children']] == ['Rule 1.2.1', 'Rule 1.2.2', 'Benchmark rule']
+
+
+def test_compare_flags_slower_operations(tmp_path, capsys):
+    baselineFile = str(tmp_path / 'baseline.json')
+    with open(baselineFile, 'w') as baselineHandler:
+        json.dump({'results': [{'shape': '1x2x3', 'operation': 'getRule', 'minSeconds': 0.010},
+                               {'shape': '1x2x3', 'operation': 'deleteBehavior', 'minSeconds': 0.010}]}, baselineHandler)
+    results = [{'shape': '1x2x3', 'operation': 'getRule', 'minSeconds': 0.012},
+               {'shape': '1x2x3', 'operation': 'deleteBehavior', 'minSeconds': 0.020},
+               {'shape': '9x9x9', 'operation': 'getRule', 'minSeconds': 1.0}]
+    assert helpers.compare(results, baselineFile, 1.25) == 1
+    output = capsys.readouterr().out
+    assert 'deleteBehavior' in output and 'SLOWER' in output
+    assert '9x9x9' not in output
+    assert helpers.compare(results, baselineFile, 2.5) == 0
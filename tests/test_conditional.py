@@ -0,0 +1,61 @@
+from mockpapi import MockPapi
+
+
+class RecordingPapi(MockPapi):
+    """
+    Records the status of every rules and versions GET
+    """
+
+    def __init__(self, *args, **kwargs):
+        MockPapi.__init__(self, *args, **kwargs)
+        self.answers = []
+
+    def getPropertyRules(self, groups, query, headers, body):
+        status, responseHeaders, document = MockPapi.getPropertyRules(self, groups, query, headers, body)
+        self.answers.append(('rules', status))
+        return status, responseHeaders, document
+
+    def listVersions(self, groups, query, headers, body):
+        status, responseHeaders, document = MockPapi.listVersions(self, groups, query, headers, body)
+        self.answers.append(('versions', status))
+        return status, responseHeaders, document
+
+
+def test_unchanged_rules_are_revalidated_not_downloaded(mockAccount):
+    account = mockAccount(RecordingPapi(properties=1, depth=2, fanout=2, behaviors=1))
+    returncode, first = account.ruleUpdater('listRules', '--property', 'www.mock1.example.com', '--version', '1')
+    assert returncode == 0, first
+    assert ('rules', 200) in account.papi.answers
+
+    account.papi.answers = []
+    returncode, second = account.ruleUpdater('listRules', '--property', 'www.mock1.example.com', '--version', '1')
+    assert returncode == 0, second
+    assert [answer for answer in account.papi.answers if answer[0] == 'rules'] == [('rules', 304)]
+    assert second.split('Rules are:')[1] == first.split('Rules are:')[1]
+
+
+def test_changed_rules_are_downloaded_again(mockAccount):
+    account = mockAccount(RecordingPapi(properties=1, depth=2, fanout=2, behaviors=1))
+    returncode, output = account.ruleUpdater('listRules', '--property', 'www.mock1.example.com', '--version', '1')
+    assert returncode == 0, output
+    rules = account.rules('prp_1', 1)
+    rules['children'].append({'name': 'Added elsewhere', 'children': [], 'behaviors': [], 'criteria': [],
+                              'criteriaMustSatisfy': 'all', 'options': {}})
+    account.papi.saveRules('prp_1', 1, {'rules': rules})
+
+    account.papi.answers = []
+    returncode, output = account.ruleUpdater('listRules', '--property', 'www.mock1.example.com', '--version', '1')
+    assert returncode == 0, output
+    assert [answer for answer in account.papi.answers if answer[0] == 'rules'] == [('rules', 200)]
+    assert 'Added elsewhere' in output
+
+
+def test_version_list_is_revalidated(mockAccount):
+    account = mockAccount(RecordingPapi(properties=1, depth=1, fanout=1, behaviors=1))
+    returncode, first = account.ruleUpdater('getDetail', '--property', 'www.mock1.example.com')
+    assert returncode == 0, first
+    account.papi.answers = []
+    returncode, second = account.ruleUpdater('getDetail', '--property', 'www.mock1.example.com')
+    assert returncode == 0, second
+    assert account.papi.answers == [('versions', 304)]
+    assert 'v1 : ' in second
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from inventory import Inventory
+
+
+def propertyItem(number, **extra):
+    item = {'propertyId': 'prp_' + str(number), 'propertyName': 'www.site' + str(number) + '.example.com',
+            'contractId': 'ctr_1', 'groupId': 'grp_1', 'latestVersion': 2, 'stagingVersion': 1, 'productionVersion': None}
+    item.update(extra)
+    return item
+
+
+@pytest.fixture
+def inventory(tmp_path):
+    inventory = Inventory(os.path.join(str(tmp_path), 'setup', 'inventory.db'), create=True)
+    with inventory:
+        inventory.setMeta('accountKey', '')
+        inventory.addContract({'contractId': 'ctr_1', 'contractTypeName': 'DIRECT_CUSTOMER'})
+        inventory.addGroup({'groupId': 'grp_1', 'groupName': 'Top'}, 'ctr_1')
+        inventory.addProperty(propertyItem(1))
+        inventory.addProperty(propertyItem(2))
+        inventory.setHostnames('prp_1', 2, [{'cnameFrom': 'www.example.com', 'cnameTo': 'www.example.com.edgekey.net'},
+                                            {'cnameFrom': 'img.example.com', 'cnameTo': 'img.example.com.edgesuite.net'}])
+        inventory.setHostnames('prp_2', 2, [{'cnameFrom': 'www.example.com', 'cnameTo': 'www.example.com.edgekey.net'}])
+        inventory.addEdgeHostname({'edgeHostnameId': 'ehn_1', 'edgeHostnameDomain': 'www.example.com.edgekey.net'}, 'ctr_1')
+    yield inventory
+    inventory.close()
+
+
+def test_lookups(inventory):
+    assert inventory.findProperty('www.site1.example.com') == {'propertyName': 'www.site1.example.com', 'propertyId': 'prp_1',
+                                                               'contractId': 'ctr_1', 'groupId': 'grp_1'}
+    assert inventory.findProperty('www.missing.example.com') is None
+    assert [eachProperty['propertyId'] for eachProperty in inventory.findPropertiesByHostname('www.example.com')] == ['prp_1', 'prp_2']
+    assert [eachProperty['propertyId'] for eachProperty in
+            inventory.findPropertiesByEdgeHostname('img.example.com.edgesuite.net')] == ['prp_1']
+    assert inventory.findEdgeHostname('www.example.com.edgekey.net')['edgeHostnameId'] == 'ehn_1'
+    assert [eachProperty['propertyId'] for eachProperty in inventory.listProperties('ctr_1')] == ['prp_1', 'prp_2']
+    assert inventory.listProperties('ctr_2') == []
+
+
+def test_set_hostnames_replaces_the_previous_ones(inventory):
+    with inventory:
+        inventory.setHostnames('prp_1', 3, [{'cnameFrom': 'new.example.com', 'cnameTo': 'new.example.com.edgekey.net'}])
+    assert inventory.findPropertiesByHostname('img.example.com') == []
+    assert [eachProperty['propertyId'] for eachProperty in inventory.findPropertiesByHostname('www.example.com')] == ['prp_2']
+    assert [eachProperty['propertyId'] for eachProperty in inventory.findPropertiesByHostname('new.example.com')] == ['prp_1']
+
+
+def test_failed_transaction_is_rolled_back(inventory):
+    with pytest.raises(KeyError):
+        with inventory:
+            inventory.addProperty(propertyItem(3))
+            inventory.addProperty({'propertyId': 'prp_4'})
+    assert inventory.findProperty('www.site3.example.com') is None
+
+
+def test_account_key_and_states(inventory):
+    assert inventory.isPopulated('')
+    assert not inventory.isPopulated('1-ABCDE')
+    states = inventory.propertyStates()
+    assert states['prp_1'] == Inventory.propertyState(propertyItem(1))
+    #A stored property waiting for its hostnames never matches a listing
+    with inventory:
+        inventory.addProperty(propertyItem(1, hostnamesPending=True))
+    assert inventory.propertyStates()['prp_1'] != Inventory.propertyState(propertyItem(1))
+
+
+def test_delete_and_clear_listings(inventory):
+    with inventory:
+        inventory.deleteProperties(['prp_1'])
+        inventory.clearListings()
+    assert inventory.findProperty('www.site1.example.com') is None
+    assert [eachProperty['propertyId'] for eachProperty in inventory.findPropertiesByHostname('www.example.com')] == ['prp_2']
+    assert inventory.findEdgeHostname('www.example.com.edgekey.net') is None
+    assert not inventory.isPopulated('')
+
+
+def test_missing_inventory_answers_nothing(tmp_path):
+    inventory = Inventory(os.path.join(str(tmp_path), 'inventory.db'))
+    assert not os.path.exists(os.path.join(str(tmp_path), 'inventory.db'))
+    assert inventory.findProperty('www.site1.example.com') is None
+    assert not inventory.isPopulated()
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+import jsonbackend
+from RuleNode import RuleNode, toPlain
+
+DOCUMENT = {'rules': {'name': 'default', 'children': [], 'behaviors': [{'name': 'caching', 'options': {'ttl': '1d', 'maxAge': 86400}}],
+                      'comments': 'Café – règles'}, 'propertyVersion': 3, 'ratio': 0.5, 'locked': False, 'note': None}
+
+
+@pytest.fixture(params=['json', 'orjson'])
+def backend(request):
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    previous = jsonbackend.backendName()
+    jsonbackend.setBackend(request.param)
+    yield request.param
+    jsonbackend.setBackend(previous)
+
+
+def test_round_trip(backend):
+    assert jsonbackend.backendName() == backend
+    assert jsonbackend.loads(jsonbackend.dumps(DOCUMENT)) == DOCUMENT
+    assert jsonbackend.loads(jsonbackend.dumpBytes(DOCUMENT)) == DOCUMENT
+    assert jsonbackend.loads(json.dumps(DOCUMENT).encode('utf-8')) == DOCUMENT
+
+
+def test_body_is_compact_utf8(backend):
+    data = jsonbackend.dumpBytes(DOCUMENT)
+    assert isinstance(data, bytes)
+    assert json.loads(data.decode('utf-8')) == DOCUMENT
+    assert b': ' not in data and b', ' not in data
+
+
+def test_default_serializes_nodes(backend):
+    document = {'rules': RuleNode(DOCUMENT['rules'])}
+    assert json.loads(jsonbackend.dumps(document, default=toPlain)) == {'rules': DOCUMENT['rules']}
+    assert json.loads(jsonbackend.dumpBytes(document, default=toPlain)) == {'rules': DOCUMENT['rules']}
+
+
+def test_pretty_keeps_four_space_indent(backend):
+    assert jsonbackend.dumps(DOCUMENT, pretty=True) == json.dumps(DOCUMENT, indent=4)
+
+
+def test_falls_back_to_json_without_orjson(monkeypatch):
+    previous = jsonbackend.backendName()
+    monkeypatch.setattr(jsonbackend, 'orjson', None)
+    try:
+        jsonbackend.setBackend('orjson')
+        assert jsonbackend.backendName() == 'json'
+        assert jsonbackend.loads(jsonbackend.dumpBytes(DOCUMENT)) == DOCUMENT
+    finally:
+        jsonbackend.setBackend(previous)
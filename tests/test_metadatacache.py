@@ -0,0 +1,54 @@
+import os
+
+from cache import MetadataCache
+
+
+def test_set_and_get(tmp_path):
+    cache = MetadataCache(str(tmp_path))
+    key = MetadataCache.propertyKey('1-ABC', 'www.example.com')
+    assert cache.get(key) is None
+    cache.set(key, {'propertyId': 'prp_1'}, 60)
+    assert cache.get(key) == {'propertyId': 'prp_1'}
+    #Another process sees the value in the file
+    assert MetadataCache(str(tmp_path)).get(key) == {'propertyId': 'prp_1'}
+
+
+def test_expired_entries_are_not_served(tmp_path):
+    cache = MetadataCache(str(tmp_path))
+    cache.set('versions::prp_1', [1, 2], -1)
+    assert cache.get('versions::prp_1') is None
+
+
+def test_writes_of_other_processes_are_merged(tmp_path):
+    first = MetadataCache(str(tmp_path))
+    second = MetadataCache(str(tmp_path))
+    first.set('a', 1, 60)
+    second.set('b', 2, 60)
+    first.set('c', 3, 60)
+    assert [MetadataCache(str(tmp_path)).get(eachKey) for eachKey in 'abc'] == [1, 2, 3]
+
+
+def test_invalidate_matches_the_whole_key(tmp_path):
+    cache = MetadataCache(str(tmp_path))
+    for eachProperty in ('prp_1', 'prp_12'):
+        cache.set(MetadataCache.versionsKey('', eachProperty), [eachProperty], 60)
+    cache.set(MetadataCache.versionsKey('', 'prp_1') + ':etag', 'x', 60)
+    cache.invalidate(MetadataCache.versionsKey('', 'prp_1'))
+    assert cache.get(MetadataCache.versionsKey('', 'prp_1')) is None
+    assert cache.get(MetadataCache.versionsKey('', 'prp_1') + ':etag') is None
+    assert cache.get(MetadataCache.versionsKey('', 'prp_12')) == ['prp_12']
+
+
+def test_disabled_cache_is_not_touched(tmp_path):
+    cache = MetadataCache(str(tmp_path / 'cache'), enabled=False)
+    cache.set('a', 1, 60)
+    assert cache.get('a') is None
+    cache.invalidate('a')
+    assert not os.path.exists(str(tmp_path / 'cache'))
+
+
+def test_missing_cache_directory_is_created(tmp_path):
+    cache = MetadataCache(str(tmp_path / 'new' / 'cache'))
+    cache.set('a', 1, 60)
+    assert os.path.exists(cache.cacheFile)
+    assert cache.get('a') == 1
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+from akamai.edgegrid import EdgeGridAuth
+
+from metrics import MetricsSummary, TraceWriter
+from mockpapi import MockPapi
+from PapiWrapper import PapiWrapper, addRequestHook, createSession, removeRequestHook
+
+
+def record(endpoint, status=200, retries=0, seconds=0.1, requestBytes=0, responseBytes=100):
+    return {'endpoint': endpoint, 'method': 'GET', 'path': '/papi/v1/x', 'status': status, 'seconds': seconds,
+            'requestBytes': requestBytes, 'responseBytes': responseBytes, 'retries': retries, 'started': 0, 'error': None}
+
+
+def test_summary_aggregates_per_endpoint():
+    summary = MetricsSummary()
+    summary(record('getPropertyRules', seconds=0.2, responseBytes=2048))
+    summary(record('getPropertyRules', status=503, retries=2, seconds=0.4, responseBytes=None))
+    summary(record('uploadRules', seconds=1.0, requestBytes=4096))
+    summary(record('listVersions', status=None, seconds=0.05, responseBytes=None))
+    rules = summary.endpoints['getPropertyRules']
+    assert (rules['calls'], rules['errors'], rules['retries'], rules['responseBytes']) == (2, 1, 2, 2048)
+    assert rules['seconds'] == pytest.approx(0.6) and rules['maxSeconds'] == 0.4
+    assert summary.endpoints['listVersions']['errors'] == 1
+
+    lines = summary.table(wallSeconds=2.0)
+    #Slowest endpoint first, totals last
+    assert [line.split()[0] for line in lines[1:]] == ['uploadRules', 'getPropertyRules', 'listVersions', 'total']
+    assert lines[1].split()[7] == '50.0%'
+    total = lines[-1].split()
+    assert total[1:4] == ['4', '2', '2'] and total[5] == '412.5' and total[6] == '1000.0'
+    assert summary.table()[1].split()[7] == '-'
+
+
+def test_trace_appends_json_lines(tmp_path):
+    traceFile = str(tmp_path / 'trace.jsonl')
+    for eachRecord in (record('getPropertyRules'), record('uploadRules', status=412)):
+        writer = TraceWriter(traceFile)
+        writer(eachRecord)
+        writer.close()
+    with open(traceFile) as traceHandler:
+        assert [json.loads(line)['status'] for line in traceHandler] == [200, 412]
+
+
+class FlakyPapi(MockPapi):
+    """MockPapi answering the first rules request with 503"""
+
+    def __init__(self, *args, **kwargs):
+        MockPapi.__init__(self, *args, **kwargs)
+        self.failed = False
+
+    def getPropertyRules(self, groups, query, headers, body):
+        if not self.failed:
+            self.failed = True
+            return 503, {'Retry-After': '0'}, {'title': 'Unavailable'}
+        return MockPapi.getPropertyRules(self, groups, query, headers, body)
+
+
+def test_hooks_receive_every_call(mockAccount):
+    account = mockAccount(FlakyPapi(properties=1, depth=1, fanout=1, behaviors=1))
+    session = createSession(EdgeGridAuth(client_token='akab-client', client_secret='secret', access_token='akab-access'),
+                            backoffFactor=0)
+    records = []
+    addRequestHook(records.append)
+    try:
+        papiObject = PapiWrapper(account.server.url)
+        response = papiObject.getPropertyRules(session, 'prp_1', 1, 'ctr_1-MOCK', 'grp_1')
+        papiObject.getPropertyRules(session, 'prp_9', 1, 'ctr_1-MOCK', 'grp_1')
+    finally:
+        removeRequestHook(records.append)
+    papiObject.getPropertyRules(session, 'prp_1', 1, 'ctr_1-MOCK', 'grp_1')
+    assert [(eachRecord['endpoint'], eachRecord['status'], eachRecord['retries']) for eachRecord in records] == [
+        ('getPropertyRules', 200, 1), ('getPropertyRules', 404, 0)]
+    assert records[0]['method'] == 'GET' and records[0]['path'] == '/papi/v0/properties/prp_1/versions/1/rules/'
+    assert records[0]['responseBytes'] == len(response.content)
+
+
+def test_command_metrics_and_trace(mockAccount):
+    account = mockAccount(MockPapi(properties=1, depth=1, fanout=2, behaviors=1))
+    returncode, output = account.ruleUpdater('listRules', '--property', 'www.mock1.example.com', '--version', 'LATEST',
+                                             '--metrics', '--trace', 'trace.jsonl')
+    assert returncode == 0, output
+    rows = {line.split()[0]: line.split() for line in output[output.index('endpoint '):].splitlines()[1:] if line.strip()}
+    assert 'getPropertyRules' in rows and 'total' in rows
+    with open(str(account.workDir / 'trace.jsonl')) as traceHandler:
+        records = [json.loads(line) for line in traceHandler]
+    assert sum(eachRecord['endpoint'] == 'getPropertyRules' for eachRecord in records) == 1
+    assert len(records) == int(rows['total'][1])
@@ -0,0 +1,95 @@
+import json
+import urllib.error
+import urllib.request
+
+import rulepatch
+from endtoend import percentile, summarize
+from mockpapi import MockPapi, startServer
+
+RULES = '/papi/v1/properties/prp_1/versions/1/rules?contractId=ctr_1-MOCK&groupId=grp_1'
+VERSIONS = '/papi/v1/properties/prp_1/versions?contractId=ctr_1-MOCK&groupId=grp_1'
+
+
+def request(papi, method, url, headers=None, document=None):
+    body = json.dumps(document).encode('utf-8') if document is not None else b''
+    status, responseHeaders, content = papi.handle(method, url, headers or {}, body)
+    return status, responseHeaders, json.loads(content) if content else None
+
+
+def test_conditional_gets():
+    papi = MockPapi(properties=1, depth=1, fanout=2, behaviors=1)
+    status, headers, document = request(papi, 'GET', RULES)
+    assert status == 200 and headers['ETag'] == '"' + document['etag'] + '"'
+    assert request(papi, 'GET', RULES, {'If-None-Match': headers['ETag']})[0] == 304
+    assert request(papi, 'GET', RULES, {'If-None-Match': 'W/' + headers['ETag']})[0] == 304
+    assert request(papi, 'GET', RULES, {'If-None-Match': '"other"'})[0] == 200
+
+    status, headers, _ = request(papi, 'GET', VERSIONS)
+    assert request(papi, 'GET', VERSIONS, {'If-None-Match': headers['ETag']})[0] == 304
+    request(papi, 'PUT', RULES, document={'rules': document['rules']})
+    assert request(papi, 'GET', VERSIONS, {'If-None-Match': headers['ETag']})[0] == 200
+
+
+def test_uploads_check_if_match_and_locking():
+    papi = MockPapi(properties=1, depth=1, fanout=2, behaviors=1)
+    _, headers, document = request(papi, 'GET', RULES)
+    document['rules']['children'].pop()
+    assert request(papi, 'PUT', RULES, {'If-Match': '"stale"'}, {'rules': document['rules']})[0] == 412
+    status, newHeaders, saved = request(papi, 'PUT', RULES, {'If-Match': headers['ETag']}, {'rules': document['rules']})
+    assert status == 200 and newHeaders['ETag'] != headers['ETag']
+    assert len(saved['rules']['children']) == 1
+
+    patch = rulepatch.makePatch({'rules': saved['rules']}, {'rules': dict(saved['rules'], comments='Patched')})
+    assert request(papi, 'PATCH', RULES, {'If-Match': headers['ETag']}, patch)[0] == 412
+    status, _, patched = request(papi, 'PATCH', RULES, {'If-Match': newHeaders['ETag']}, patch)
+    assert status == 200 and patched['rules']['comments'] == 'Patched'
+
+    papi.properties['prp_1']['versions'][1]['stagingStatus'] = 'ACTIVE'
+    assert request(papi, 'PUT', RULES, document={'rules': document['rules']})[0] == 403
+
+
+def test_rate_limit_and_counters():
+    papi = MockPapi(properties=2, depth=1, fanout=1, behaviors=1, rateLimit=3)
+    statuses = [request(papi, 'GET', VERSIONS)[0] for _ in range(5)]
+    assert statuses == [200, 200, 200, 429, 429]
+    assert request(papi, 'GET', '/papi/v1/nothing')[0] in (404, 429)
+    stats = papi.statsSnapshot()
+    assert stats['requests'] == 6
+    assert stats['statuses']['200'] == 3
+    assert stats['endpoints']['listVersions'] == 5
+    papi.resetStats()
+    assert papi.statsSnapshot()['requests'] == 0
+
+
+def test_unknown_ids_are_not_found():
+    papi = MockPapi(properties=1, depth=1, fanout=1, behaviors=1)
+    assert request(papi, 'GET', '/papi/v1/properties/prp_9/versions')[0] == 404
+    assert request(papi, 'GET', '/papi/v1/properties/prp_1/versions/7/rules')[0] == 404
+
+
+def test_served_over_http():
+    papi = MockPapi(properties=1, depth=1, fanout=1, behaviors=1)
+    server = startServer(papi)
+    try:
+        with urllib.request.urlopen(server.url + VERSIONS) as response:
+            assert response.status == 200
+            assert json.loads(response.read())['versions']['items'][0]['propertyVersion'] == 1
+        try:
+            urllib.request.urlopen(server.url + '/papi/v1/properties/prp_9/versions')
+        except urllib.error.HTTPError as e:
+            assert e.code == 404
+        else:
+            raise AssertionError('unknown property found')
+    finally:
+        server.shutdown()
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile(values, 1.0) == 100
+    assert percentile([3.0, 1.0, 2.0], 0.5) == 2.0
+    assert percentile([7], 0.99) == 7
+    assert percentile([], 0.5) is None
+    assert summarize([0.1, 0.3, 0.2])['p50Seconds'] == 0.2
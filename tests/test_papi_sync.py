@@ -0,0 +1,104 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from mockpapi import MockPapi, startServer
+
+PAPI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'papi.py')
+EDGERC = """[papi]
+client_secret = mock-secret
+host = {host}
+access_token = akab-mock-access-token
+client_token = akab-mock-client-token
+"""
+
+
+class FlakyPapi(MockPapi):
+    """MockPapi failing the hostnames of the properties in failing"""
+
+    def __init__(self, *args, **kwargs):
+        MockPapi.__init__(self, *args, **kwargs)
+        self.failing = set()
+        self.hostnameCalls = []
+
+    def listHostnames(self, groups, query, headers, body):
+        self.hostnameCalls.append(groups[0])
+        if groups[0] in self.failing:
+            #Not a status the session retries
+            return 403, {}, {'title': 'Forbidden'}
+        return MockPapi.listHostnames(self, groups, query, headers, body)
+
+
+@pytest.fixture
+def account(tmp_path):
+    papi = FlakyPapi(properties=3, depth=1, fanout=1, behaviors=1)
+    server = startServer(papi)
+    (tmp_path / '.edgerc').write_text(EDGERC.format(host=server.url))
+    yield papi, tmp_path
+    server.shutdown()
+
+
+def runPapi(workDir, *argv):
+    process = subprocess.run([sys.executable, PAPI] + list(argv) + ['-rateLimit', '0'], cwd=str(workDir),
+                             env=dict(os.environ, HOME=str(workDir)), stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    assert process.returncode == 0, process.stdout.decode()
+    return process.stdout.decode()
+
+
+def hostnames(workDir):
+    connection = sqlite3.connect(str(workDir / 'setup' / 'inventory.db'))
+    try:
+        return dict(connection.execute('SELECT propertyId, cnameFrom FROM hostnames'))
+    finally:
+        connection.close()
+
+
+def test_setup_stores_properties_and_hostnames(account):
+    papi, workDir = account
+    runPapi(workDir, '-setup')
+    assert hostnames(workDir) == {'prp_' + str(position): 'www.mock' + str(position) + '.example.com' for position in (1, 2, 3)}
+    #Nothing changed, nothing is fetched again
+    del papi.hostnameCalls[:]
+    runPapi(workDir, '-sync')
+    assert papi.hostnameCalls == []
+
+
+def test_failed_hostnames_are_fetched_again_by_the_next_sync(account):
+    papi, workDir = account
+    papi.failing.add('prp_2')
+    output = runPapi(workDir, '-setup')
+    assert 'Unable to fetch hostnames of property: www.mock2.example.com' in output
+    assert 'prp_2' not in hostnames(workDir)
+
+    papi.failing.clear()
+    del papi.hostnameCalls[:]
+    runPapi(workDir, '-sync')
+    assert papi.hostnameCalls == ['prp_2']
+    assert hostnames(workDir)['prp_2'] == 'www.mock2.example.com'
+
+    del papi.hostnameCalls[:]
+    runPapi(workDir, '-sync')
+    assert papi.hostnameCalls == []
+
+
+def test_changed_property_keeps_being_retried_until_its_hostnames_are_stored(account):
+    papi, workDir = account
+    runPapi(workDir, '-setup')
+    #A new version of prp_3, its hostnames fail on the first sync
+    papi.addVersion('prp_3', papi.properties['prp_3']['versions'][1]['rules'], 'Second version')
+    papi.failing.add('prp_3')
+    runPapi(workDir, '-sync')
+    papi.failing.clear()
+    del papi.hostnameCalls[:]
+    runPapi(workDir, '-sync')
+    assert papi.hostnameCalls == ['prp_3']
+    connection = sqlite3.connect(str(workDir / 'setup' / 'inventory.db'))
+    try:
+        assert connection.execute("SELECT propertyVersion FROM hostnames WHERE propertyId = 'prp_3'").fetchone() == (2,)
+        assert connection.execute("SELECT latestVersion FROM properties WHERE propertyId = 'prp_3'").fetchone() == (2,)
+    finally:
+        connection.close()
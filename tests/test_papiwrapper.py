@@ -0,0 +1,75 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from akamai.edgegrid import EdgeGridAuth
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from mockpapi import MockPapi, startServer
+from PapiWrapper import PapiWrapper, createSession
+
+CONTRACT_ID = 'ctr_1-MOCK'
+GROUP_ID = 'grp_1'
+
+
+class FlakyPapi(MockPapi):
+    """MockPapi answering the first request of every rules path with 503"""
+
+    def __init__(self, *args, **kwargs):
+        MockPapi.__init__(self, *args, **kwargs)
+        self.failed = set()
+
+    def getPropertyRules(self, groups, query, headers, body):
+        if groups not in self.failed:
+            self.failed.add(groups)
+            return 503, {'Retry-After': '0'}, {'title': 'Unavailable'}
+        return MockPapi.getPropertyRules(self, groups, query, headers, body)
+
+
+@pytest.fixture
+def server():
+    server = startServer(FlakyPapi(properties=4, depth=1, fanout=2, behaviors=1, activationSeconds=0))
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def session():
+    return createSession(EdgeGridAuth(client_token='akab-client', client_secret='secret', access_token='akab-access'),
+                         poolSize=4, backoffFactor=0)
+
+
+def test_form_url_adds_the_account_switch_key():
+    papiObject = PapiWrapper('akab-host.luna.akamaiapis.net', '1-ABC')
+    assert papiObject.baseUrl == 'https://akab-host.luna.akamaiapis.net'
+    assert papiObject.formUrl('https://h/papi/v0/groups/') == 'https://h/papi/v0/groups/?accountSwitchKey=1-ABC'
+    assert papiObject.formUrl('https://h/papi/v0/products/?contractId=c') == 'https://h/papi/v0/products/?contractId=c&accountSwitchKey=1-ABC'
+    assert PapiWrapper('http://127.0.0.1:8080/').baseUrl == 'http://127.0.0.1:8080'
+    assert PapiWrapper('h').formUrl('https://h/x') == 'https://h/x'
+
+
+def test_shared_wrapper_and_session_across_threads(server, session):
+    papiObject = PapiWrapper(server.url)
+    propertyIds = ['prp_' + str(position) for position in range(1, 5)]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        responses = list(executor.map(lambda propertyId: papiObject.getPropertyRules(session, propertyId, 1, CONTRACT_ID, GROUP_ID),
+                                      propertyIds))
+    #Each first attempt got a 503 and was retried
+    assert [response.status_code for response in responses] == [200] * 4
+    assert [response.json()['propertyId'] for response in responses] == propertyIds
+
+
+def test_activation_outcome_is_the_returned_response(server, session):
+    papiObject = PapiWrapper(server.url)
+
+    def activate(propertyId, version):
+        return papiObject.activateConfiguration(session, version, 'staging', ['noreply@example.com'], 'Test',
+                                                propertyId, CONTRACT_ID, GROUP_ID)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        activated, missing = executor.map(activate, ['prp_1', 'prp_2'], [1, 9])
+    #Warnings were acknowledged and the activation created, the unknown version is a 404
+    assert activated.status_code == 201 and 'activationLink' in activated.json()
+    assert missing.status_code == 404
+    assert not hasattr(papiObject, 'final_response')
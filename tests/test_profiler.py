@@ -0,0 +1,84 @@
+import glob
+import inspect
+import os
+import pstats
+import time
+
+from mockpapi import MockPapi
+from profiler import CommandProfiler
+
+
+class Worker(object):
+
+    def spin(self, seconds):
+        end = time.perf_counter() + seconds
+        total = 0
+        while time.perf_counter() < end:
+            total += 1
+        return total
+
+    def allocate(self):
+        return [bytearray(1024) for _ in range(4096)]
+
+
+def idle(seconds):
+    time.sleep(seconds)
+
+
+def test_innermost_phase_wins():
+    profiler = CommandProfiler({'work': [Worker], 'spin': [Worker.spin]})
+    fileName = inspect.getsourcefile(Worker)
+    spinLine = inspect.getsourcelines(Worker.spin)[1] + 2
+    allocateLine = inspect.getsourcelines(Worker.allocate)[1] + 1
+    assert profiler.phaseOf(fileName, spinLine) == 'spin'
+    assert profiler.phaseOf(fileName, allocateLine) == 'work'
+    assert profiler.phaseOf(fileName, 1) is None
+    assert profiler.framePhase([(fileName, 1), (fileName, allocateLine)]) == 'work'
+    assert profiler.framePhase([('elsewhere.py', 3)]) == 'other'
+
+
+def test_profile_files(tmp_path):
+    profiler = CommandProfiler({'spin': [Worker.spin], 'allocate': [Worker.allocate]}, defaultPhase='rest', interval=0.002)
+    profiler.start()
+    worker = Worker()
+    worker.spin(0.3)
+    held = worker.allocate()
+    profiler.stop()
+    assert profiler.phaseSeconds['spin'] > 0.15
+    assert profiler.phaseSeconds['spin'] > profiler.phaseSeconds['rest']
+    assert profiler.phaseGrowth['allocate'] + profiler.phaseGrowth['rest'] >= len(held) * 1024 // 2
+
+    files = profiler.write(str(tmp_path / 'profile'))
+    assert files == [str(tmp_path / eachName) for eachName in ('profile.pstats', 'profile.collapsed', 'profile.txt')]
+    assert any('spin' in function for _, _, function in pstats.Stats(files[0]).stats)
+    with open(files[1]) as collapsedHandler:
+        stacks = [line.rsplit(' ', 1) for line in collapsedHandler]
+    assert stacks and all(int(weight) >= 1 for _, weight in stacks)
+    assert any(stack.startswith('spin;') and stack.endswith('test_profiler.py:spin') for stack, _ in stacks)
+    with open(files[2]) as reportHandler:
+        report = reportHandler.read()
+    assert report.startswith('Profile of ')
+    assert 'allocations still held at the end' in report and 'test_profiler.py' in report
+
+
+def test_idle_threads_are_left_out():
+    profiler = CommandProfiler({'idle': [idle]}, interval=0.002)
+    profiler.start()
+    idle(0.1)
+    profiler.stop()
+    assert profiler.ticks > 0
+    assert profiler.phaseSeconds['idle'] > 0
+    #The sampler thread never samples itself
+    assert not any('profiler.py:sample' in stack for stack in profiler.samples)
+
+
+def test_command_profile(mockAccount):
+    account = mockAccount(MockPapi(properties=1, depth=1, fanout=2, behaviors=1))
+    returncode, output = account.ruleUpdater('listRules', '--property', 'www.mock1.example.com', '--version', 'LATEST', '--profile')
+    assert returncode == 0, output
+    files = sorted(glob.glob(os.path.join(str(account.workDir), 'logs', 'profile-listRules-*')))
+    assert [os.path.splitext(eachFile)[1] for eachFile in files] == ['.collapsed', '.pstats', '.txt']
+    with open(files[2]) as reportHandler:
+        report = reportHandler.read()
+    for phase in ('resolve', 'fetch', 'upload', 'transform'):
+        assert '\n' + phase + ' ' in report
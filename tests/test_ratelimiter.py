@@ -0,0 +1,56 @@
+import threading
+import time
+
+import RateLimiter as ratelimiter
+from RateLimiter import RateLimiter
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_burst_then_one_slot_per_interval(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimiter.time, 'monotonic', clock)
+    limiter = RateLimiter(10, burst=3)
+    assert [limiter.reserve() for _ in range(3)] == [0, 0, 0]
+    #Waiting callers queue up behind each other
+    waits = [limiter.reserve() for _ in range(3)]
+    assert [round(wait, 6) for wait in waits] == [0.1, 0.2, 0.3]
+
+
+def test_tokens_refill_up_to_the_burst(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimiter.time, 'monotonic', clock)
+    limiter = RateLimiter(4, burst=2)
+    limiter.reserve()
+    limiter.reserve()
+    clock.now += 0.25
+    assert limiter.reserve() == 0
+    assert limiter.reserve() == 0.25
+    #A long pause does not save up more than the burst
+    clock.now += 60
+    assert [limiter.reserve() for _ in range(2)] == [0, 0]
+    assert limiter.reserve() > 0
+
+
+def test_default_burst_is_one_second_of_requests():
+    assert RateLimiter(5).capacity == 5
+    assert RateLimiter(0.5).capacity == 1
+
+
+def test_threads_share_the_rate():
+    limiter = RateLimiter(50, burst=1)
+    started = time.monotonic()
+    threads = [threading.Thread(target=limiter.acquire) for _ in range(11)]
+    for eachThread in threads:
+        eachThread.start()
+    for eachThread in threads:
+        eachThread.join()
+    #One request at once, then ten more at 50 per second
+    assert time.monotonic() - started >= 0.19
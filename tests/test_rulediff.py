@@ -0,0 +1,73 @@
+import copy
+
+from rulediff import diffRules, formatChanges
+
+
+def rule(name, behaviors=(), children=(), **extra):
+    value = {'name': name, 'behaviors': list(behaviors), 'criteria': [], 'children': list(children)}
+    value.update(extra)
+    return value
+
+
+def behavior(name, **options):
+    return {'name': name, 'options': options}
+
+
+BASE = rule('default', [behavior('caching', behavior='MAX_AGE', ttl='1d')], [
+    rule('Images', [behavior('gzipResponse', behavior='ALWAYS')], [rule('Offload', [behavior('caching', ttl=1)])]),
+    rule('Performance', [behavior('http2', enabled='')]),
+])
+
+
+def test_identical_trees_have_no_changes():
+    assert diffRules(BASE, copy.deepcopy(BASE)) == []
+
+
+def test_bool_and_int_options_differ():
+    new = copy.deepcopy(BASE)
+    new['children'][0]['children'][0]['behaviors'][0]['options']['ttl'] = True
+    assert diffRules(BASE, new) == [{'change': 'modified', 'path': 'default --> Images --> Offload',
+                                     'details': [('~', 'behavior caching.ttl: 1 -> true')]}]
+
+
+def test_integral_float_is_the_same_number():
+    new = copy.deepcopy(BASE)
+    new['children'][0]['children'][0]['behaviors'][0]['options']['ttl'] = 1.0
+    assert diffRules(BASE, new) == []
+
+
+def test_added_removed_and_option_changes():
+    new = copy.deepcopy(BASE)
+    new['behaviors'][0]['options']['ttl'] = '7d'
+    new['children'][1]['behaviors'].append(behavior('allowPost', enabled=True))
+    del new['children'][0]['children'][0]
+    new['children'].append(rule('Redirects'))
+    changes = {eachChange['path']: eachChange for eachChange in diffRules(BASE, new)}
+    assert changes['default']['details'] == [('~', 'behavior caching.ttl: "1d" -> "7d"')]
+    assert changes['default --> Performance']['details'] == [('+', 'behavior allowPost')]
+    assert changes['default --> Images --> Offload']['change'] == 'removed'
+    assert changes['default --> Redirects']['change'] == 'added'
+
+
+def test_moved_rule_is_reported_once():
+    new = copy.deepcopy(BASE)
+    offload = new['children'][0]['children'].pop()
+    new['children'][1]['children'].append(offload)
+    changes = diffRules(BASE, new)
+    moved = [eachChange for eachChange in changes if eachChange['change'] == 'moved']
+    assert moved == [{'change': 'moved', 'path': 'default --> Performance --> Offload',
+                      'oldPath': 'default --> Images --> Offload', 'details': []}]
+    assert not [eachChange for eachChange in changes if eachChange['change'] in ('added', 'removed')]
+
+
+def test_repeated_names_are_told_apart():
+    old = rule('default', children=[rule('Same', [behavior('a')]), rule('Same', [behavior('b')])])
+    new = copy.deepcopy(old)
+    new['children'][1]['behaviors'][0]['options'] = {'x': 1}
+    assert [eachChange['path'] for eachChange in diffRules(old, new)] == ['default --> Same#2']
+
+
+def test_format_changes():
+    lines = formatChanges([{'change': 'modified', 'path': 'default', 'details': [('+', 'behavior allowPost')]},
+                           {'change': 'moved', 'path': 'default --> B', 'oldPath': 'default --> A --> B', 'details': []}])
+    assert lines == ['~ default', '    + behavior allowPost', '> default --> A --> B  =>  default --> B']
@@ -0,0 +1,106 @@
+import copy
+import json
+
+from RuleNode import RuleNode
+from RuleTree import RuleTree
+from helper import getRule
+from rulehash import canonical, canonicalJson, hashSubtree, ruleHash
+
+
+def rule(name, behaviors=(), children=()):
+    return {'name': name, 'behaviors': [{'name': eachName, 'options': {'enabled': True}} for eachName in behaviors],
+            'criteria': [], 'children': list(children)}
+
+
+TREE = rule('default', ['caching'], [rule('Images', ['gzipResponse'], [rule('Offload')]), rule('Performance', ['http2'])])
+
+
+def test_canonical_form():
+    assert canonicalJson({'b': 1.0, 'a': [2.5, 'é']}) == '{"a":[2.5,"é"],"b":1}'.encode('utf-8')
+    assert canonical({'x': True, 'y': 3.0}) == {'x': True, 'y': 3}
+
+
+def test_hash_ignores_key_order_and_integral_floats():
+    reordered = json.loads(json.dumps(TREE), object_pairs_hook=lambda pairs: dict(reversed(pairs)))
+    assert ruleHash(reordered) == ruleHash(TREE)
+    floats = copy.deepcopy(TREE)
+    floats['behaviors'][0]['options']['ttl'] = 1.0
+    integers = copy.deepcopy(TREE)
+    integers['behaviors'][0]['options']['ttl'] = 1
+    assert ruleHash(floats) == ruleHash(integers)
+
+
+def test_hash_tells_json_types_apart():
+    changed = copy.deepcopy(TREE)
+    changed['behaviors'][0]['options']['enabled'] = 1
+    assert ruleHash(changed) != ruleHash(TREE)
+
+
+def test_child_order_matters():
+    swapped = copy.deepcopy(TREE)
+    swapped['children'].reverse()
+    assert ruleHash(swapped) != ruleHash(TREE)
+
+
+def test_subtree_hashes_change_along_the_edited_path():
+    before = {}
+    hashSubtree(TREE, before)
+    edited = copy.deepcopy(TREE)
+    ruleTree = RuleTree(edited)
+    #One entry per rule, identical content gives identical hashes
+    assert ruleTree.hashOf(edited) == ruleHash(TREE)
+    assert len(before) == len(ruleTree.hashes) == 4
+    assert sorted(before.values()) == sorted(ruleTree.hashes.values())
+    after = dict(ruleTree.hashes)
+
+    images, performance = edited['children']
+    offload = images['children'][0]
+    ruleTree.addBehavior(offload, {'name': 'allowPost', 'options': {}})
+    #Only the hashes covering the edited rule are dropped
+    assert list(ruleTree.hashes) == [id(performance)]
+    assert ruleTree.hashOf(edited) == ruleHash(edited) != after[id(edited)]
+    assert ruleTree.hashOf(images) != after[id(images)]
+    assert ruleTree.hashOf(offload) != after[id(offload)]
+    assert ruleTree.hashOf(performance) == after[id(performance)]
+
+
+def test_every_edit_drops_the_hashes_it_changes():
+    edited = copy.deepcopy(TREE)
+    ruleTree = RuleTree(edited)
+    images, performance = edited['children']
+    edits = [lambda: ruleTree.insertAfter(images, rule('Added')),
+             lambda: ruleTree.replace(ruleTree.find('Added')[0], rule('Replaced', ['http2'])),
+             lambda: ruleTree.delete(ruleTree.find('Replaced')[0]),
+             lambda: ruleTree.deleteBehavior('gzipResponse'),
+             lambda: ruleTree.append(performance, rule('Last'))]
+    for eachEdit in edits:
+        ruleTree.hashOf(edited)
+        eachEdit()
+        assert ruleTree.hashOf(edited) == ruleHash(edited)
+    #Edits made on the rules directly are only seen once dropHashes is called
+    ruleTree.hashOf(edited)
+    performance['criteria'].append({'name': 'path', 'options': {'values': ['/api']}})
+    assert ruleTree.hashOf(edited) != ruleHash(edited)
+    ruleTree.dropHashes(performance)
+    assert ruleTree.hashOf(edited) == ruleHash(edited)
+
+
+def test_rule_node_hashes_like_the_dict():
+    assert ruleHash(RuleNode.fromJson(json.dumps(TREE))) == ruleHash(TREE)
+
+
+def test_empty_rule_has_no_hash():
+    assert ruleHash({}) is None
+
+
+def test_get_rule_returns_the_hash_of_the_match():
+    found = getRule([TREE], 'images')
+    assert found['ruleCount'] == 1 and found['ruleContent'] is TREE['children'][0]
+    assert found['ruleHash'] == ruleHash(TREE['children'][0])
+
+
+def test_get_rule_default_is_not_shared():
+    missing = getRule([TREE], 'Missing')
+    assert missing == {'ruleContent': {}, 'ruleCount': 0, 'ruleHash': None}
+    missing['ruleContent']['name'] = 'changed'
+    assert getRule([TREE], 'Missing')['ruleContent'] == {}
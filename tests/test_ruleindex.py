@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from ruleindex import PATH_SEPARATOR, RuleIndex
+from rulequery import compileQuery, parseQuery, searchRules
+from test_rulequery import RULES
+
+QUERIES = ['rule:images', 'rule:"static *"', 'behavior:caching', 'behavior:caching.behavior=no_store',
+           'behavior:origin.hostname=*.example.com', 'criteria:fileExtension.values=JS', 'option:compress=false',
+           'value:site_defender', 'option:value.id=12345', 'origin', '"API (v2)"', 'behavior:origin and not rule:default',
+           'rule:images or behavior:caching.behavior=no_store', 'behavior:caching and (ttl=7d or rule:api*)',
+           'not (behavior:caching or behavior:origin)', 'not rule:default', '*', 'behavior:nothing']
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = RuleIndex(str(tmp_path / 'ruletrees'))
+    index.addTree('hash1', json.dumps({'rules': RULES}).encode('utf-8'))
+    yield index
+    index.close()
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_index_agrees_with_walking_the_tree(index, query):
+    expected = [PATH_SEPARATOR.join(path) for path, _ in searchRules(RULES, compileQuery(query))]
+    assert index.search(parseQuery(query), 'hash1') == expected
+
+
+def test_trees_are_indexed_once(index):
+    ruleCount = index.query('SELECT COUNT(*) FROM rules')[0][0]
+    index.addTree('hash1', json.dumps({'rules': {'name': 'other', 'children': []}}).encode('utf-8'))
+    assert index.query('SELECT COUNT(*) FROM rules')[0][0] == ruleCount == 4
+    assert index.hasTree('hash1') and not index.hasTree('hash2')
+
+
+def test_versions_and_prune(index):
+    index.addTree('hash2', json.dumps({'rules': {'name': 'default', 'children': []}}).encode('utf-8'))
+    index.setVersion('prp_1', 1, 'www.example.com', 'hash1')
+    index.setVersion('prp_1', '2', 'www.example.com', 'hash2')
+    assert index.versionTree('prp_1', '1') == 'hash1'
+    assert index.versionTree('prp_1', 2) == 'hash2'
+    assert index.versionTree('prp_1', 3) is None
+
+    index.prune({'hash2'})
+    assert not index.hasTree('hash1')
+    assert index.versionTree('prp_1', 1) is None
+    assert index.query('SELECT COUNT(*) FROM postings WHERE treeHash = ?', ('hash1',))[0][0] == 0
+    assert index.search(parseQuery('rule:default'), 'hash2') == ['default']
+
+
+def test_index_is_kept_between_processes(tmp_path):
+    index = RuleIndex(str(tmp_path))
+    index.addTree('hash1', json.dumps({'rules': RULES}).encode('utf-8'))
+    index.close()
+    reopened = RuleIndex(str(tmp_path))
+    assert reopened.search(parseQuery('rule:images'), 'hash1') == ['default --> Static Content --> Images']
+    reopened.close()
@@ -0,0 +1,84 @@
+import json
+
+from RuleNode import FeatureNode, RuleNode, dumps, toPlain
+from RuleTree import RuleTree
+
+RULES = {
+    'name': 'default',
+    'children': [
+        {'name': 'Performance', 'children': [
+            {'name': 'Compression', 'children': [], 'behaviors': [{'name': 'gzipResponse', 'options': {'behavior': 'ALWAYS'}}],
+             'criteria': [], 'criteriaMustSatisfy': 'all'},
+        ], 'behaviors': [], 'criteria': [], 'criteriaMustSatisfy': 'all', 'comments': 'Speed'},
+        {'name': 'Offload', 'children': [], 'behaviors': [{'name': 'caching', 'options': {'behavior': 'MAX_AGE', 'ttl': '1d'},
+                                                            'uuid': 'abc'}],
+         'criteria': [{'name': 'fileExtension', 'options': {'values': ['css']}}], 'criteriaMustSatisfy': 'any'},
+    ],
+    'behaviors': [{'name': 'origin', 'options': {'hostname': 'origin.example.com'}}],
+    'options': {'is_secure': True},
+    'variables': [],
+}
+
+
+def test_round_trip_keeps_document_and_key_order():
+    rule = RuleNode.fromJson(json.dumps(RULES))
+    assert rule.toJson() == json.dumps(RULES, separators=(',', ':'))
+    assert rule.toDict() == RULES
+    assert list(rule) == list(RULES)
+
+
+def test_children_are_parsed_on_first_access_only():
+    rule = RuleNode(RULES)
+    assert not rule.isLoaded()
+    #Serializing leaves untouched children as text
+    rule.toJson()
+    assert not rule.isLoaded()
+    children = rule['children']
+    assert rule.isLoaded()
+    assert [eachChild['name'] for eachChild in children] == ['Performance', 'Offload']
+    assert isinstance(children[0], RuleNode) and not children[0].isLoaded()
+    assert isinstance(children[1]['behaviors'][0], FeatureNode)
+    assert children[1]['behaviors'][0]['uuid'] == 'abc'
+
+
+def test_behaves_like_a_dict():
+    rule = RuleNode(RULES)
+    assert rule.get('comments') is None
+    assert rule.setdefault('comments', 'Top') == 'Top'
+    rule['name'] = 'renamed'
+    del rule['variables']
+    assert 'variables' not in rule
+    assert list(rule)[-1] == 'comments'
+    expected = dict(RULES, name='renamed', comments='Top')
+    del expected['variables']
+    assert json.loads(dumps(rule)) == expected
+    try:
+        rule['missing']
+    except KeyError:
+        pass
+    else:
+        raise AssertionError('missing key found')
+    del rule['children']
+    assert 'children' not in rule and rule.get('children', []) == []
+
+
+def test_edits_through_rule_tree_serialize_like_plain_rules():
+    plain = json.loads(json.dumps(RULES))
+    compact = RuleNode(RULES)
+    for rules in (plain, compact):
+        ruleTree = RuleTree(rules)
+        ruleTree.addBehavior(ruleTree.find('Compression')[0], {'name': 'allowPost', 'options': {'enabled': True}})
+        ruleTree.delete(ruleTree.find('Offload')[0])
+        ruleTree.insertAfter(ruleTree.find('Performance')[0], {'name': 'New', 'children': [], 'behaviors': []})
+    assert json.loads(dumps({'rules': compact})) == {'rules': plain}
+    assert json.loads(json.dumps({'rules': compact}, default=toPlain)) == {'rules': plain}
+
+
+def test_names_and_option_keys_are_shared():
+    first = RuleNode(json.loads(json.dumps(RULES)))
+    second = RuleNode(json.loads(json.dumps(RULES)))
+    assert first['children'][0]['name'] is second['children'][0]['name']
+    firstOptions = first['children'][1]['behaviors'][0]['options']
+    secondOptions = second['children'][1]['behaviors'][0]['options']
+    assert [key for key in firstOptions][0] is [key for key in secondOptions][0]
+    assert first.keyOrder is second.keyOrder
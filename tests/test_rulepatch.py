@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from mockpapi import MockPapi
+from rulepatch import makePatch, applyPatch
+
+
+def test_equal_documents_give_no_operations():
+    document = {'rules': {'name': 'default', 'children': [], 'behaviors': [{'name': 'caching', 'options': {'ttl': '1d'}}]}}
+    assert makePatch(document, {'rules': {'name': 'default', 'children': [],
+                                          'behaviors': [{'name': 'caching', 'options': {'ttl': '1d'}}]}}) == []
+
+
+@pytest.mark.parametrize('old, new', [(1, True), (0, False), (1, 1.0), ('1', 1), (None, False)])
+def test_scalars_are_compared_by_json_type(old, new):
+    assert makePatch({'x': old}, {'x': new}) == [{'op': 'replace', 'path': '/x', 'value': new}]
+
+
+def test_nested_type_change_is_found():
+    source = {'behaviors': [{'name': 'allowPost', 'options': {'enabled': 1}}]}
+    target = {'behaviors': [{'name': 'allowPost', 'options': {'enabled': True}}]}
+    assert makePatch(source, target) == [{'op': 'replace', 'path': '/behaviors/0/options/enabled', 'value': True}]
+
+
+def test_keys_are_added_and_removed():
+    patch = makePatch({'a': 1, 'b': 2}, {'b': 2, 'c/d': 3})
+    assert {'op': 'remove', 'path': '/a'} in patch
+    assert {'op': 'add', 'path': '/c~1d', 'value': 3} in patch
+    assert len(patch) == 2
+
+
+def test_list_insert_keeps_common_head_and_tail():
+    patch = makePatch({'children': ['a', 'b', 'c']}, {'children': ['a', 'x', 'b', 'c']})
+    assert patch == [{'op': 'add', 'path': '/children/1', 'value': 'x'}]
+
+
+def test_list_removal_from_the_back():
+    patch = makePatch(['a', 'b', 'c', 'd'], ['a', 'd'])
+    assert patch == [{'op': 'remove', 'path': '/2'}, {'op': 'remove', 'path': '/1'}]
+
+
+@pytest.mark.parametrize('source, target', [
+    ({'rules': {'children': [{'name': 'a'}, {'name': 'b'}], 'options': {'is_secure': False}}},
+     {'rules': {'children': [{'name': 'b', 'criteria': []}], 'options': {'is_secure': True}}}),
+    ({'x': [1, 2, 3]}, {'x': [True, 2, 3.0], 'y': {'z': None}}),
+    ([{'name': 'a'}], [{'name': 'a'}, {'name': 'b'}, {'name': 'a~/b'}]),
+])
+def test_patch_applied_gives_the_target(source, target):
+    patched = applyPatch(source, makePatch(source, target))
+    assert patched == target
+    assert makePatch(patched, target) == []
+
+
+def test_replace_of_a_missing_member_is_rejected():
+    with pytest.raises(KeyError):
+        applyPatch({'rules': {}}, [{'op': 'replace', 'path': '/comments', 'value': 'note'}])
+
+
+class NoCommentsPapi(MockPapi):
+    """
+    Rule trees without version notes, PAPI leaves comments out when there are none
+    """
+
+    def rulesDocument(self, propertyId, version):
+        document = MockPapi.rulesDocument(self, propertyId, version)
+        del document['comments']
+        return document
+
+
+def test_rules_without_comments_are_patched(mockAccount):
+    account = mockAccount(NoCommentsPapi(properties=1, depth=2, fanout=2, behaviors=2))
+    account.writeFile('behavior.json', json.dumps({'name': 'allowPost', 'options': {'enabled': True}}))
+    account.papi.resetStats()
+    returncode, output = account.ruleUpdater('addBehavior', '--property', 'www.mock1.example.com', '--version', '1',
+                                             '--fromFile', 'behavior.json', '--ruleName', 'Rule 1.1', '--comment', 'Allow POST',
+                                             '--checkoutNewVersion', 'NO')
+    assert returncode == 0, output
+    assert account.papi.statsSnapshot()['endpoints'].get('patchRules') == 1
+    assert 'uploadRules' not in account.papi.statsSnapshot()['endpoints']
+    assert 'allowPost' in [eachBehavior['name'] for eachBehavior in account.rules('prp_1', 1)['children'][0]['behaviors']]
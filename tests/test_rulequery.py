@@ -0,0 +1,80 @@
+import pytest
+
+from RuleNode import RuleNode
+from rulequery import compileQuery, optionValues, parseQuery, searchRules
+
+RULES = {
+    'name': 'default',
+    'behaviors': [{'name': 'origin', 'options': {'hostname': 'origin.example.com', 'httpPort': 80, 'compress': True}},
+                  {'name': 'cpCode', 'options': {'value': {'id': 12345, 'products': ['Fresca', 'Site_Defender']}}}],
+    'criteria': [],
+    'children': [
+        {'name': 'Static Content', 'behaviors': [{'name': 'caching', 'options': {'behavior': 'MAX_AGE', 'ttl': '7d'}}],
+         'criteria': [{'name': 'fileExtension', 'options': {'values': ['css', 'js']}}],
+         'children': [
+             {'name': 'Images', 'behaviors': [{'name': 'origin', 'options': {'hostname': 'images.example.net', 'compress': False}}],
+              'criteria': [], 'children': []},
+         ]},
+        {'name': 'API (v2)', 'behaviors': [{'name': 'caching', 'options': {'behavior': 'NO_STORE'}}], 'criteria': [],
+         'children': []},
+    ],
+}
+
+
+def names(query, rules=RULES):
+    return [path[-1] for path, _ in searchRules(rules, compileQuery(query))]
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('rule:images', ['Images']),
+    ('rule:"static *"', ['Static Content']),
+    ('behavior:caching', ['Static Content', 'API (v2)']),
+    ('behavior:caching.behavior=no_store', ['API (v2)']),
+    ('behavior:origin.hostname=*.example.com', ['default']),
+    ('criteria:fileExtension.values=JS', ['Static Content']),
+    ('option:compress=false', ['Images']),
+    ('compress=true', ['default']),
+    ('value:site_defender', ['default']),
+    ('option:value.id=12345', ['default']),
+    ('origin', ['default', 'Images']),
+    ('"API (v2)"', ['API (v2)']),
+])
+def test_terms(query, expected):
+    assert names(query) == expected
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('behavior:origin and not rule:default', ['Images']),
+    ('behavior:origin not rule:default', ['Images']),
+    ('rule:images or behavior:caching.behavior=no_store', ['Images', 'API (v2)']),
+    ('behavior:caching and (ttl=7d or rule:api*)', ['Static Content', 'API (v2)']),
+    ('not (behavior:caching or behavior:origin)', []),
+    ('NOT rule:default AND NOT behavior:caching', ['Images']),
+])
+def test_operators(query, expected):
+    assert names(query) == expected
+
+
+def test_terms_do_not_match_children():
+    #The default rule has no caching behavior of its own
+    assert 'default' not in names('behavior:caching')
+
+
+def test_searches_compact_trees():
+    assert names('behavior:origin.compress=false', RuleNode(RULES)) == ['Images']
+
+
+def test_paths_are_in_tree_order():
+    assert [path for path, _ in searchRules(RULES, compileQuery('*'))] == [
+        ['default'], ['default', 'Static Content'], ['default', 'Static Content', 'Images'], ['default', 'API (v2)']]
+
+
+@pytest.mark.parametrize('query', ['', 'rule:a and', '(rule:a', 'rule:a)', 'or rule:a', 'not'])
+def test_invalid_queries(query):
+    with pytest.raises(ValueError):
+        parseQuery(query)
+
+
+def test_option_values_are_flattened():
+    assert sorted(optionValues({'a': {'b': [1, 2], 'c': None}, 'd': [{'e': True}]})) == [
+        ('a.b', '1'), ('a.b', '2'), ('a.c', 'null'), ('d.e', 'true')]
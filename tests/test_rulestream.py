@@ -0,0 +1,39 @@
+import io
+import json
+
+import pytest
+
+import rulestream
+
+
+RULES = {'rules': {'name': 'default', 'behaviors': [], 'children': [
+    {'name': 'Images', 'behaviors': [{'name': 'caching'}], 'children': [
+        {'name': 'Offload', 'children': [], 'behaviors': []}]},
+    {'children': [], 'name': 'offload', 'behaviors': [{'name': 'gzipResponse'}]}]}}
+
+
+@pytest.fixture(params=['ijson', 'json'])
+def stream(request, monkeypatch):
+    if request.param == 'json':
+        monkeypatch.setattr(rulestream, 'ijson', None)
+    elif not rulestream.streamingSupported():
+        pytest.skip('ijson is not installed')
+    return io.BytesIO(json.dumps(RULES).encode('utf-8'))
+
+
+def test_finds_rules_in_document_order(stream):
+    rules = list(rulestream.findRules(stream, 'Offload'))
+    assert [eachRule['behaviors'] for eachRule in rules] == [[], [{'name': 'gzipResponse'}]]
+
+
+def test_names_match_case_insensitively(stream):
+    assert [eachRule['name'] for eachRule in rulestream.findRules(stream, 'IMAGES')] == ['Images']
+
+
+def test_matching_rule_is_returned_whole(stream):
+    rule = next(rulestream.findRules(stream, 'images'))
+    assert rule == RULES['rules']['children'][0]
+
+
+def test_no_match(stream):
+    assert list(rulestream.findRules(stream, 'Missing')) == []
@@ -0,0 +1,119 @@
+import copy
+import time
+
+import pytest
+
+from RuleTree import RuleTree
+
+
+def rule(name, behaviors=(), children=()):
+    return {'name': name, 'behaviors': [{'name': eachName, 'options': {}} for eachName in behaviors],
+            'criteria': [], 'children': list(children)}
+
+
+def sample():
+    return rule('default', ['caching'], [
+        rule('Images', ['gzipResponse'], [rule('Offload', ['caching', 'caching'])]),
+        rule('images', ['http2']),
+        rule('Performance', [], [rule('Offload', ['gzipResponse'])]),
+    ])
+
+
+def names(rules):
+    return [eachRule['name'] for eachRule in rules]
+
+
+def test_iterates_in_document_order():
+    tree = RuleTree(sample())
+    assert names(tree) == ['default', 'Images', 'Offload', 'images', 'Performance', 'Offload']
+    assert len(tree) == 6
+
+
+def test_find_by_name_path_and_behavior():
+    tree = RuleTree(sample())
+    assert names(tree.find('Images')) == ['Images']
+    assert names(tree.find('IMAGES', ignoreCase=True)) == ['Images', 'images']
+    assert tree.getByPath(['default', 'Performance', 'Offload'])[0]['behaviors'][0]['name'] == 'gzipResponse'
+    #A rule holding a behavior twice is listed once
+    assert [tree.pathOf(eachRule) for eachRule in tree.findByBehavior('caching')] == [('default',), ('default', 'Images', 'Offload')]
+
+
+def test_pointer_of_follows_edits():
+    tree = RuleTree(sample())
+    offload = tree.getByPath(['default', 'Performance', 'Offload'])[0]
+    assert tree.pointerOf(offload) == '/children/2/children/0'
+    tree.insertBefore(tree.find('Images')[0], rule('First'))
+    assert tree.pointerOf(offload) == '/children/3/children/0'
+    tree.delete(tree.find('images')[0])
+    assert tree.pointerOf(offload) == '/children/2/children/0'
+
+
+def test_positions_survive_edits_made_outside_the_tree():
+    tree = RuleTree(sample())
+    performance = tree.find('Performance')[0]
+    assert tree.positionOf(performance, tree.rules['children']) == 2
+    tree.rules['children'].reverse()
+    assert tree.positionOf(performance, tree.rules['children']) == 0
+    with pytest.raises(ValueError):
+        tree.positionOf(rule('Elsewhere'), tree.rules['children'])
+
+
+def test_insert_replace_and_delete_update_the_index():
+    tree = RuleTree(sample())
+    images = tree.find('Images')[0]
+    tree.insertAfter(images, rule('New', ['allowPost'], [rule('Child')]))
+    assert names(tree.rules['children']) == ['Images', 'New', 'images', 'Performance']
+    assert tree.pathOf(tree.find('Child')[0]) == ('default', 'New', 'Child')
+    assert names(tree.findByBehavior('allowPost')) == ['New']
+
+    tree.replace(images, rule('Replaced'))
+    assert tree.find('Images') == [] and tree.find('Offload') == tree.getByPath(['default', 'Performance', 'Offload'])
+    assert names(tree.findByBehavior('gzipResponse')) == ['Offload']
+
+    tree.delete(tree.find('Performance')[0])
+    assert tree.find('Offload') == [] and tree.findByBehavior('gzipResponse') == []
+    assert names(tree) == ['default', 'Replaced', 'New', 'Child', 'images']
+    assert len(tree) == 5
+
+
+def test_replace_default_rule():
+    tree = RuleTree(sample())
+    tree.replace(tree.rules, rule('default', [], [rule('Only')]))
+    assert names(tree) == ['default', 'Only']
+    assert tree.parentOf(tree.find('Only')[0]) is tree.rules
+
+
+def test_add_and_delete_behavior():
+    tree = RuleTree(sample())
+    tree.addBehavior(tree.find('images')[0], {'name': 'caching', 'options': {}})
+    assert len(tree.findByBehavior('caching')) == 3
+    assert tree.deleteBehavior('caching', tree.find('Offload')[0]) == 2
+    assert names(tree.findByBehavior('caching')) == ['default', 'images']
+    assert tree.deleteBehavior('caching') == 2
+    assert tree.findByBehavior('caching') == []
+    assert tree.rules['behaviors'] == []
+    assert tree.deleteBehavior('caching') == 0
+
+
+def test_delete_behavior_is_linear():
+    #A wide tree where every rule holds the behavior, was quadratic
+    def wide(count):
+        return rule('default', ['caching'], [rule('Rule ' + str(position), ['caching', 'gzipResponse']) for position in range(count)])
+
+    def seconds(count):
+        tree = RuleTree(wide(count))
+        start = time.perf_counter()
+        assert tree.deleteBehavior('caching') == count + 1
+        return time.perf_counter() - start
+
+    small = min(seconds(2000) for _ in range(3))
+    large = min(seconds(16000) for _ in range(3))
+    assert large < small * 8 * 3
+
+
+def test_edits_do_not_change_a_copy():
+    rules = sample()
+    original = copy.deepcopy(rules)
+    tree = RuleTree(copy.deepcopy(rules))
+    tree.delete(tree.find('Performance')[0])
+    assert rules == original
@@ -0,0 +1,127 @@
+import json
+import os
+import time
+
+from cache import RuleTreeCache
+
+
+def tree(name, size=100):
+    return json.dumps({'rules': {'name': name, 'padding': 'x' * size}}).encode('utf-8')
+
+
+def test_put_and_get_by_etag(tmp_path):
+    cache = RuleTreeCache(str(tmp_path))
+    cache.put('prp_1', 3, '"etag-a"', tree('a'))
+    assert cache.get('prp_1', 3, '"etag-a"') == tree('a')
+    assert cache.get('prp_1', 3, '"etag-b"') is None
+    #Editable versions are only served when the etag is known
+    assert cache.get('prp_1', 3) is None
+    assert cache.get('prp_1', 4, '"etag-a"') is None
+    entry = cache.lookup('prp_1', 3)
+    assert entry['etag'] == '"etag-a"' and entry['hash'] == RuleTreeCache.contentHash(tree('a'))
+    assert entry['size'] == len(tree('a')) and entry['locked'] is False
+
+
+def test_locked_versions_are_served_without_etag(tmp_path):
+    cache = RuleTreeCache(str(tmp_path))
+    cache.put('prp_1', 1, '"etag"', tree('a'), locked=True)
+    assert cache.get('prp_1', 1) == tree('a')
+
+
+def test_identical_trees_share_one_object(tmp_path):
+    cache = RuleTreeCache(str(tmp_path))
+    cache.put('prp_1', 1, '"a"', tree('same'))
+    cache.put('prp_2', 7, '"b"', tree('same'))
+    assert os.listdir(cache.objectsDir) == [RuleTreeCache.contentHash(tree('same')) + '.json']
+    assert cache.contentHashes() == {RuleTreeCache.contentHash(tree('same'))}
+
+
+def test_invalidate(tmp_path):
+    cache = RuleTreeCache(str(tmp_path))
+    cache.put('prp_1', 1, '"a"', tree('a'), locked=True)
+    cache.put('prp_1', 12, '"b"', tree('b'), locked=True)
+    cache.invalidate('prp_1', 1)
+    assert cache.lookup('prp_1', 1) is None
+    assert cache.get('prp_1', 12) == tree('b')
+
+
+def test_replaced_and_invalidated_trees_leave_no_objects(tmp_path):
+    cache = RuleTreeCache(str(tmp_path), maxSize=250)
+    for eachEtag in range(5):
+        cache.put('prp_1', 1, '"e' + str(eachEtag) + '"', tree(str(eachEtag), 60))
+    #Only the live tree is kept and counted, it is not evicted by the ones it replaced
+    assert cache.get('prp_1', 1, '"e4"') == tree('4', 60)
+    assert cache.contentHashes() == {RuleTreeCache.contentHash(tree('4', 60))}
+    assert os.listdir(cache.objectsDir) == [RuleTreeCache.contentHash(tree('4', 60)) + '.json']
+    cache.put('prp_1', 1, '"e5"', tree('4', 60))
+    assert cache.get('prp_1', 1, '"e5"') == tree('4', 60)
+    cache.invalidate('prp_1', 1)
+    cache.invalidate('prp_1', 1)
+    assert cache.contentHashes() == set() and os.listdir(cache.objectsDir) == []
+    cache.put('prp_2', 1, '"a"', tree('a', 200))
+    assert cache.get('prp_2', 1, '"a"') == tree('a', 200)
+
+
+def test_least_recently_used_trees_are_evicted(tmp_path):
+    size = len(tree('a', 1000))
+    cache = RuleTreeCache(str(tmp_path), maxSize=3 * size)
+    for eachName in 'abc':
+        cache.put('prp_' + eachName, 1, '"e"', tree(eachName, 1000), locked=True)
+        time.sleep(0.01)
+    #Reading a refreshes its use, b is now the oldest
+    assert cache.get('prp_a', 1) is not None
+    cache.put('prp_d', 1, '"e"', tree('d', 1000), locked=True)
+    assert cache.lookup('prp_b', 1) is None
+    assert [cache.get('prp_' + eachName, 1) is not None for eachName in 'acd'] == [True, True, True]
+    assert not os.path.exists(cache.objectFile(RuleTreeCache.contentHash(tree('b', 1000))))
+
+
+def test_shared_object_is_kept_while_used(tmp_path):
+    cache = RuleTreeCache(str(tmp_path), maxSize=len(tree('shared', 1000)) + len(tree('other', 1000)))
+    cache.put('prp_1', 1, '"e"', tree('shared', 1000), locked=True)
+    cache.put('prp_2', 1, '"e"', tree('shared', 1000), locked=True)
+    cache.put('prp_3', 1, '"e"', tree('other', 1000), locked=True)
+    #Two objects fit, nothing is evicted
+    assert all(cache.lookup('prp_' + str(eachProperty), 1) for eachProperty in (1, 2, 3))
+    cache.put('prp_4', 1, '"e"', tree('new', 1000), locked=True)
+    #prp_1 and prp_2 went together with their object, the others stay
+    assert cache.lookup('prp_1', 1) is None and cache.lookup('prp_2', 1) is None
+    assert cache.get('prp_3', 1) is not None and cache.get('prp_4', 1) is not None
+
+
+def test_missing_object_is_dropped(tmp_path):
+    cache = RuleTreeCache(str(tmp_path))
+    cache.put('prp_1', 1, '"e"', tree('a'), locked=True)
+    os.remove(cache.objectFile(RuleTreeCache.contentHash(tree('a'))))
+    assert cache.get('prp_1', 1) is None
+    assert cache.lookup('prp_1', 1) is None and cache.contentHashes() == set()
+
+
+def test_updates_of_other_processes_are_kept(tmp_path):
+    first = RuleTreeCache(str(tmp_path))
+    second = RuleTreeCache(str(tmp_path))
+    first.put('prp_1', 1, '"a"', tree('a'))
+    second.put('prp_2', 1, '"b"', tree('b'))
+    first.put('prp_3', 1, '"c"', tree('c'))
+    for eachCache in (first, second):
+        assert [eachCache.lookup('prp_' + str(eachProperty), 1)['etag'] for eachProperty in (1, 2, 3)] == ['"a"', '"b"', '"c"']
+    second.invalidate('prp_1', 1)
+    assert first.lookup('prp_1', 1) is None
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = RuleTreeCache(str(tmp_path), enabled=False)
+    cache.put('prp_1', 1, '"a"', tree('a'), locked=True)
+    assert cache.get('prp_1', 1) is None and cache.lookup('prp_1', 1) is None
+    cache.invalidate('prp_1', 1)
+    assert cache.contentHashes() == set()
+    assert not os.path.exists(os.path.join(str(tmp_path), 'ruletrees'))
+
+
+def test_many_trees_stay_fast(tmp_path):
+    cache = RuleTreeCache(str(tmp_path))
+    start = time.perf_counter()
+    for eachVersion in range(2000):
+        cache.put('prp_1', eachVersion, '"e"', tree(str(eachVersion), 10), locked=True)
+        assert cache.get('prp_1', eachVersion) is not None
+    assert time.perf_counter() - start < 30
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from mockpapi import MockPapi, startServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EDGERC = """[papi]
+client_secret = mock-secret
+host = {host}
+access_token = akab-mock-access-token
+client_token = akab-mock-client-token
+"""
+
+
+class BrokenRulesPapi(MockPapi):
+    """MockPapi answering the rules of the properties in broken without a rules object"""
+
+    def __init__(self, *args, **kwargs):
+        MockPapi.__init__(self, *args, **kwargs)
+        self.broken = set()
+
+    def getPropertyRules(self, groups, query, headers, body):
+        if groups[0] in self.broken:
+            return 200, {}, {'propertyId': groups[0]}
+        return MockPapi.getPropertyRules(self, groups, query, headers, body)
+
+
+@pytest.fixture
+def account(tmp_path):
+    papi = BrokenRulesPapi(properties=3, depth=2, fanout=2, behaviors=1)
+    server = startServer(papi)
+    (tmp_path / '.edgerc').write_text(EDGERC.format(host=server.url))
+    environment = dict(os.environ, HOME=str(tmp_path), AKAMAI_CLI_CACHE_DIR=str(tmp_path / 'cache'))
+    setup = subprocess.run([sys.executable, os.path.join(ROOT, 'papi.py'), '-setup', '-rateLimit', '0'], cwd=str(tmp_path),
+                           env=environment, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    assert setup.returncode == 0, setup.stdout.decode()
+    yield papi, tmp_path, environment
+    server.shutdown()
+
+
+def search(workDir, environment, *argv):
+    process = subprocess.run([sys.executable, os.path.join(ROOT, 'RuleUpdater.py'), 'search', '--edgerc', str(workDir / '.edgerc'),
+                              '--section', 'papi'] + list(argv), cwd=str(workDir), env=environment,
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    return process.returncode, process.stdout.decode()
+
+
+def test_search_lists_matching_rules_of_every_property(account):
+    papi, workDir, environment = account
+    returncode, output = search(workDir, environment, '--query', 'rule:"Rule 1.2"')
+    assert returncode == 0, output
+    for position in (1, 2, 3):
+        assert 'www.mock' + str(position) + '.example.com v1: default --> Rule 1.2' in output
+    assert '3 matching rules in 3 of 3 properties' in output
+
+
+def test_failed_property_is_reported_with_its_error(account):
+    papi, workDir, environment = account
+    papi.broken.add('prp_2')
+    returncode, output = search(workDir, environment, '--query', 'rule:default')
+    assert returncode == 1
+    assert "Unable to search www.mock2.example.com: KeyError('rules')" in output
+    assert 'Unable to search 1 properties: www.mock2.example.com' in output
+    assert '2 matching rules in 2 of 3 properties' in output
@@ -0,0 +1,46 @@
+from VersionResolver import VersionResolver
+
+VERSIONS = {'versions': {'items': [
+    {'propertyVersion': 5, 'stagingStatus': 'INACTIVE', 'productionStatus': 'INACTIVE', 'note': 'Five'},
+    {'propertyVersion': 4, 'stagingStatus': 'ACTIVE', 'productionStatus': 'INACTIVE', 'note': 'Four'},
+    {'propertyVersion': 3, 'stagingStatus': 'DEACTIVATED', 'productionStatus': 'ACTIVE'},
+    {'propertyVersion': 2, 'stagingStatus': 'INACTIVE', 'productionStatus': 'PENDING', 'note': 'Two'},
+    {'propertyVersion': 1, 'stagingStatus': 'INACTIVE', 'productionStatus': 'INACTIVE', 'note': 'One'},
+]}}
+
+
+def test_resolves_aliases_in_any_case():
+    resolver = VersionResolver(VERSIONS)
+    assert resolver.resolve('LATEST') == 5
+    assert resolver.resolve('latest') == 5
+    assert resolver.resolve('Staging') == 4
+    assert resolver.resolve('PRODUCTION') == 3
+    assert resolver.activeVersion('staging') == 4
+
+
+def test_resolves_numbers_only_when_they_exist():
+    resolver = VersionResolver(VERSIONS)
+    assert resolver.resolve('2') == 2
+    assert resolver.resolve(1) == 1
+    assert resolver.resolve('6') is None
+    assert resolver.resolve('v2') is None
+    assert resolver.exists(3) and not resolver.exists(0)
+
+
+def test_nothing_active():
+    resolver = VersionResolver({'versions': {'items': [{'propertyVersion': 1, 'stagingStatus': 'INACTIVE',
+                                                        'productionStatus': 'INACTIVE'}]}})
+    assert resolver.resolve('STAGING') is None
+    assert resolver.resolve('PRODUCTION') is None
+    assert VersionResolver({'versions': {'items': []}}).resolve('LATEST') is None
+
+
+def test_locked_versions():
+    resolver = VersionResolver(VERSIONS)
+    assert [version for version in range(1, 7) if resolver.isLocked(version)] == [2, 3, 4]
+
+
+def test_notes_since():
+    resolver = VersionResolver(VERSIONS)
+    assert resolver.notesSince(3) == [(5, 'Five'), (4, 'Four'), (3, '')]
+    assert resolver.item('4')['note'] == 'Four'
@@ -5,7 +5,7 @@
 Initiators: vbhat@akamai.com and aetsai@akamai.com
 '''
 
-import json
+import jsonbackend
 from akamai.edgegrid import EdgeGridAuth
 from PapiWrapper import PapiWrapper
 import argparse
@@ -81,7 +81,7 @@ if args.jsonToConfig:
 
     with open(os.path.join('samplerules',args.inputFile),'r') as fileContentHandler:
         fileJson = fileContentHandler.read()
-        JsonRepresentation = json.loads(fileJson)
+        JsonRepresentation = jsonbackend.loads(fileJson)
     completeRuleSet = JsonRepresentation['rules']
     outputFilename = os.path.join('samplerules',args.outputFile)
     with open(outputFilename,'w') as textFileHandler: